@@ -1,28 +1,45 @@
 """
 Admin API
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, insert, or_, and_
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timedelta
+import csv
+import io
 import uuid
-import os
-import httpx
 import json
-import re
+import asyncio
 
-from app.database import get_db
+from app.database import get_db, async_session
 from app.models.user import User
 from app.models.module import Module
 from app.models.lesson import Lesson
 from app.models.quiz import Quiz, Question
-from app.models.payment import Payment
 from app.models.progress import UserProgress
 from app.models.audio import AudioCategory, Audio
 from app.models.book import BookCategory, Book
+from app.models.quiz_job import QuizGenJob
 from app.api.deps import get_current_admin
+from app.services.quiz_generator import generate_questions, QuizGenerationError
+from app.services.quiz_jobs import quiz_job_queue, job_dict, TERMINAL_STATUSES
+from app.tasks.explanation_tasks import fill_missing_explanations
+from app.services.uploads import save_upload
+from app.tasks.media_tasks import collect_media_garbage
+from app.tasks.purge_tasks import purge_deleted_content
+from app.services.transcode_queue import transcode_queue
+from app.services.media_metadata import get_metadata
+from app.services.premium_expiry import premium_expiry
+from app.services.revenue import record_premium, csv_cell
+from app.core.entitlement import has_premium
+from app.services.dashboard_stats import dashboard_stats
+from app.services.notifications import notification_stats
+from app.services.course_package import (
+    PackageError, iter_package_lines, parse_package, import_package, iter_course_jsonl, iter_course_zip
+)
 
 router = APIRouter()
 
@@ -116,103 +133,164 @@ class BookCreate(BaseModel):
 # Dashboard
 @router.get("/stats")
 async def get_dashboard_stats(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    admin: User = Depends(get_current_admin)
 ):
-    """Dashboard statistikasi"""
-    # Users count
-    result = await db.execute(select(func.count(User.id)))
-    total_users = result.scalar() or 0
-    
-    result = await db.execute(
-        select(func.count(User.id))
-        .where(User.is_premium == True)
-    )
-    premium_users = result.scalar() or 0
-    
-    # Today's active users
-    today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
-    result = await db.execute(
-        select(func.count(User.id))
-        .where(User.last_activity >= today_start)
-    )
-    active_today = result.scalar() or 0
-    
-    # Content stats
-    result = await db.execute(select(func.count(Module.id)))
-    total_modules = result.scalar() or 0
-    
-    result = await db.execute(select(func.count(Lesson.id)))
-    total_lessons = result.scalar() or 0
-    
-    result = await db.execute(select(func.count(Quiz.id)))
-    total_quizzes = result.scalar() or 0
-    
-    # Payments
-    result = await db.execute(
-        select(func.count(Payment.id))
-        .where(Payment.status == "pending")
-    )
-    pending_payments = result.scalar() or 0
-    
-    result = await db.execute(
-        select(func.sum(Payment.amount))
-        .where(Payment.status == "approved")
-    )
-    total_revenue = result.scalar() or 0
-    
+    """Dashboard statistikasi (xotiradagi snapshot)"""
+    return await dashboard_stats.snapshot()
+
+
+# Users management
+USER_EXPORT_BATCH = 1000
+USER_COLUMNS = (
+    User.id, User.telegram_id, User.username, User.full_name, User.total_xp, User.level,
+    User.is_premium, User.premium_until, User.is_admin, User.is_active, User.last_activity, User.created_at,
+)
+
+
+def _like_escape(term: str) -> str:
+    """LIKE maxsus belgilari (% _) oddiy belgi sifatida qidiriladi"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def user_filters(
+    q: Optional[str] = None,
+    premium: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+    active: Optional[bool] = None,
+    level_min: Optional[int] = None,
+    level_max: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> list:
+    """
+    Ro'yxat va eksport uchun umumiy filtrlar
+    q: raqam - id/telegram_id, @ bilan - username boshi, aks holda ism/username ichida
+    """
+    conditions = []
+    if q and q.strip():
+        term = q.strip()
+        if term.isdigit():
+            conditions.append(or_(User.id == int(term), User.telegram_id == int(term)))
+        elif term.startswith("@"):
+            conditions.append(User.username.like(f"{_like_escape(term[1:])}%", escape="\\"))
+        else:
+            pattern = f"%{_like_escape(term)}%"
+            conditions.append(or_(
+                User.full_name.ilike(pattern, escape="\\"),
+                User.username.ilike(pattern, escape="\\"),
+            ))
+    if premium is not None:
+        conditions.append(User.is_premium == premium)
+    if is_admin is not None:
+        conditions.append(User.is_admin == is_admin)
+    if active is not None:
+        conditions.append(User.is_active == active)
+    if level_min is not None:
+        conditions.append(User.level >= level_min)
+    if level_max is not None:
+        conditions.append(User.level <= level_max)
+    if created_from is not None:
+        conditions.append(User.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(User.created_at < created_to)
+    return conditions
+
+
+def _user_row(row) -> dict:
     return {
-        "users": {
-            "total": total_users,
-            "premium": premium_users,
-            "free": total_users - premium_users,
-            "active_today": active_today
-        },
-        "content": {
-            "modules": total_modules,
-            "lessons": total_lessons,
-            "quizzes": total_quizzes
-        },
-        "payments": {
-            "pending": pending_payments,
-            "total_revenue": total_revenue
-        }
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row._mapping.items()
     }
 
 
-# Users management
+@router.get("/notifications/stats")
+async def get_notification_stats(admin: User = Depends(get_current_admin)):
+    """Bot xabarlari yetkazilishi - tur/status bo'yicha va oxirgi xatolar"""
+    return await notification_stats()
+
+
 @router.get("/users")
 async def get_users(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 50,
+    conditions: list = Depends(user_filters),
     admin: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Foydalanuvchilar ro'yxati"""
-    result = await db.execute(
-        select(User)
-        .order_by(desc(User.created_at))
-        .offset(skip)
-        .limit(limit)
+    """
+    Foydalanuvchilar ro'yxati (yangidan eskiga, keyset pagination)
+    cursor - oldingi javobdagi next_cursor
+    """
+    limit = max(1, min(limit, 200))
+    query = (
+        select(*USER_COLUMNS)
+        .where(*conditions)
+        .order_by(User.created_at.desc(), User.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        try:
+            created_at, user_id = cursor.rsplit("_", 1)
+            created_at, user_id = datetime.fromisoformat(created_at), int(user_id)
+        except ValueError:
+            raise HTTPException(400, "Noto'g'ri cursor")
+        query = query.where(or_(
+            User.created_at < created_at,
+            and_(User.created_at == created_at, User.id < user_id)
+        ))
+
+    result = await db.execute(query)
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [_user_row(row) for row in rows],
+        "next_cursor": f"{rows[-1].created_at.isoformat()}_{rows[-1].id}" if has_more else None
+    }
+
+
+@router.get("/users/export")
+async def export_users(
+    format: str = "csv",
+    conditions: list = Depends(user_filters),
+    admin: User = Depends(get_current_admin)
+):
+    """Filtrlangan foydalanuvchilar - CSV yoki JSONL (stream, server-side cursor)"""
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(400, "format: csv yoki jsonl")
+
+    async def rows():
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([column.key for column in USER_COLUMNS])
+            yield buffer.getvalue()
+
+        query = (
+            select(*USER_COLUMNS)
+            .where(*conditions)
+            .order_by(User.id)
+            .execution_options(yield_per=USER_EXPORT_BATCH)
+        )
+        async with async_session() as session:
+            result = await session.stream(query)
+            async for partition in result.partitions():
+                if format == "jsonl":
+                    yield "".join(json.dumps(_user_row(row), ensure_ascii=False) + "\n" for row in partition)
+                    continue
+                buffer.seek(0)
+                buffer.truncate()
+                for row in partition:
+                    writer.writerow(csv_cell(value) for value in _user_row(row).values())
+                yield buffer.getvalue()
+
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
     )
-    users = result.scalars().all()
-    
-    return [
-        {
-            "id": u.id,
-            "telegram_id": u.telegram_id,
-            "username": u.username,
-            "full_name": u.full_name,
-            "total_xp": u.total_xp,
-            "level": u.level,
-            "is_premium": u.is_premium,
-            "premium_until": u.premium_until.isoformat() if u.premium_until else None,
-            "is_admin": u.is_admin,
-            "is_active": u.is_active,
-            "created_at": u.created_at.isoformat()
-        }
-        for u in users
-    ]
 
 
 @router.post("/users/{user_id}/grant-premium")
@@ -229,9 +307,16 @@ async def grant_premium(
     if not user:
         raise HTTPException(404, "User topilmadi")
     
+    now = datetime.utcnow()
+    renewed = has_premium(user, now)
+    was_flagged = user.is_premium
     user.is_premium = True
-    user.premium_until = datetime.utcnow() + timedelta(days=data.days)
+    user.premium_until = now + timedelta(days=data.days)
+    await record_premium(db, activated=0 if renewed else 1, renewed=1 if renewed else 0, when=now)
     await db.commit()
+    if not was_flagged:
+        dashboard_stats.bump(users_premium=1)
+    premium_expiry.schedule(user.id, user.premium_until)
     
     return {
         "success": True,
@@ -253,9 +338,15 @@ async def revoke_premium(
     if not user:
         raise HTTPException(404, "User topilmadi")
     
+    churned = has_premium(user)
+    was_flagged = user.is_premium
     user.is_premium = False
     user.premium_until = None
+    await record_premium(db, churned=1 if churned else 0)
     await db.commit()
+    if was_flagged:
+        dashboard_stats.bump(users_premium=-1)
+    premium_expiry.cancel(user.id)
     
     return {"success": True, "message": "Premium bekor qilindi"}
 
@@ -298,6 +389,7 @@ async def create_module(
     db.add(module)
     await db.commit()
     await db.refresh(module)
+    dashboard_stats.bump(modules=1)
     
     return {"id": module.id, "title": module.title}
 
@@ -309,7 +401,7 @@ async def get_all_modules(
 ):
     """Barcha modullar"""
     result = await db.execute(
-        select(Module).order_by(Module.order_index)
+        select(Module).where(Module.deleted_at.is_(None)).order_by(Module.order_index)
     )
     modules = result.scalars().all()
     
@@ -329,18 +421,25 @@ async def get_all_modules(
 @router.delete("/modules/{module_id}")
 async def delete_module(
     module_id: int,
+    background_tasks: BackgroundTasks,
     admin: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Modulni o'chirish"""
-    result = await db.execute(select(Module).where(Module.id == module_id))
+    """Modulni o'chirish (darhol yashiriladi, darslar/quizlar/progress fonda o'chiriladi)"""
+    result = await db.execute(
+        select(Module).where(Module.id == module_id, Module.deleted_at.is_(None))
+    )
     module = result.scalar_one_or_none()
     
     if not module:
         raise HTTPException(404, "Modul topilmadi")
     
-    await db.delete(module)
+    module.is_active = False
+    module.deleted_at = datetime.utcnow()
     await db.commit()
+    dashboard_stats.bump(modules=-1)
+    background_tasks.add_task(purge_deleted_content)
+    background_tasks.add_task(collect_media_garbage)
     
     return {"success": True}
 
@@ -348,24 +447,14 @@ async def delete_module(
 # Video upload for lessons
 @router.post("/lessons/upload-video")
 async def upload_lesson_video(
-    file: UploadFile = File(...),
+    request: Request,
     admin: User = Depends(get_current_admin)
 ):
-    """Dars videosini yuklash"""
-    allowed = {"mp4", "webm", "mov", "avi", "mkv"}
-    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
-    if ext not in allowed:
-        raise HTTPException(400, "Faqat video fayllar qabul qilinadi (mp4, webm, mov, avi, mkv)")
-
-    os.makedirs("uploads/videos", exist_ok=True)
-    filename = f"{uuid.uuid4()}.{ext}"
-    path = f"uploads/videos/{filename}"
-
-    content = await file.read()
-    with open(path, "wb") as f:
-        f.write(content)
-
-    return {"url": f"uploads/videos/{filename}"}
+    """Dars videosini yuklash (multipart, "file" maydoni)"""
+    stored = await save_upload(request, "video")
+    # HLS ni dars yaratilishini kutmasdan boshlaymiz
+    transcode_queue.enqueue(stored.url)
+    return {"url": stored.url, "size": stored.size, "sha256": stored.sha256}
 
 
 # Lesson CRUD
@@ -377,9 +466,13 @@ async def create_lesson(
 ):
     """Dars yaratish"""
     lesson = Lesson(**data.model_dump())
+    lesson.transcode_status = transcode_queue.initial_status(lesson.video_url)
     db.add(lesson)
     await db.commit()
     await db.refresh(lesson)
+    if lesson.transcode_status == "pending":
+        transcode_queue.enqueue(lesson.video_url)
+    dashboard_stats.bump(lessons=1)
     
     return {"id": lesson.id, "title": lesson.title}
 
@@ -387,18 +480,25 @@ async def create_lesson(
 @router.delete("/lessons/{lesson_id}")
 async def delete_lesson(
     lesson_id: int,
+    background_tasks: BackgroundTasks,
     admin: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Darsni o'chirish"""
-    result = await db.execute(select(Lesson).where(Lesson.id == lesson_id))
+    """Darsni o'chirish (darhol yashiriladi, quiz va progress fonda o'chiriladi)"""
+    result = await db.execute(
+        select(Lesson).where(Lesson.id == lesson_id, Lesson.deleted_at.is_(None))
+    )
     lesson = result.scalar_one_or_none()
     
     if not lesson:
         raise HTTPException(404, "Dars topilmadi")
     
-    await db.delete(lesson)
+    lesson.is_active = False
+    lesson.deleted_at = datetime.utcnow()
     await db.commit()
+    dashboard_stats.bump(lessons=-1)
+    background_tasks.add_task(purge_deleted_content)
+    background_tasks.add_task(collect_media_garbage)
     
     return {"success": True}
 
@@ -415,6 +515,7 @@ async def create_quiz(
     db.add(quiz)
     await db.commit()
     await db.refresh(quiz)
+    dashboard_stats.bump(quizzes=1)
     
     return {"id": quiz.id, "title": quiz.title}
 
@@ -427,7 +528,7 @@ async def add_question(
     db: AsyncSession = Depends(get_db)
 ):
     """Savol qo'shish"""
-    result = await db.execute(select(Quiz).where(Quiz.id == quiz_id))
+    result = await db.execute(select(Quiz).where(Quiz.id == quiz_id, Quiz.deleted_at.is_(None)))
     quiz = result.scalar_one_or_none()
     
     if not quiz:
@@ -444,18 +545,24 @@ async def add_question(
 @router.delete("/quizzes/{quiz_id}")
 async def delete_quiz(
     quiz_id: int,
+    background_tasks: BackgroundTasks,
     admin: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Quizni o'chirish"""
-    result = await db.execute(select(Quiz).where(Quiz.id == quiz_id))
+    """Quizni o'chirish (darhol yashiriladi, savollar fonda o'chiriladi)"""
+    result = await db.execute(
+        select(Quiz).where(Quiz.id == quiz_id, Quiz.deleted_at.is_(None))
+    )
     quiz = result.scalar_one_or_none()
 
     if not quiz:
         raise HTTPException(404, "Quiz topilmadi")
 
-    await db.delete(quiz)
+    quiz.is_active = False
+    quiz.deleted_at = datetime.utcnow()
     await db.commit()
+    dashboard_stats.bump(quizzes=-1)
+    background_tasks.add_task(purge_deleted_content)
 
     return {"success": True}
 
@@ -475,115 +582,316 @@ async def generate_quiz_ai(
     db: AsyncSession = Depends(get_db)
 ):
     """AI yordamida quiz savollari yaratish"""
-    from app.config import settings
+    try:
+        questions, lesson_title = await generate_questions(
+            db, data.lesson_id, data.question_count, data.difficulty, data.extra_context
+        )
+    except QuizGenerationError as e:
+        raise HTTPException(e.status_code, e.message)
+
+    return {"questions": questions, "lesson_title": lesson_title}
+
+
+# AI Quiz Jobs (fon rejimida, dars yoki butun modul uchun)
+class AIQuizJobCreate(BaseModel):
+    lesson_id: Optional[int] = None
+    module_id: Optional[int] = None
+    question_count: int = 5
+    difficulty: str = "medium"
+    extra_context: Optional[str] = None
+
+
+class GeneratedQuestion(BaseModel):
+    question: str
+    options: List[str]
+    correct_index: int = 0
+    explanation: Optional[str] = None
+
+
+class AIQuizJobApprove(BaseModel):
+    quiz_title: Optional[str] = None
+    time_limit_sec: int = 300
+    pass_percentage: int = 70
+    questions: Optional[List[GeneratedQuestion]] = None  # tahrirlangan savollar
+
+
+@router.post("/quizzes/ai-jobs")
+async def create_quiz_ai_jobs(
+    data: AIQuizJobCreate,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """AI quiz job(lar) yaratish - bitta dars yoki modulning barcha darslari"""
+    if not data.lesson_id and not data.module_id:
+        raise HTTPException(400, "lesson_id yoki module_id kerak")
+
+    if data.lesson_id:
+        lesson = await db.get(Lesson, data.lesson_id)
+        if not lesson:
+            raise HTTPException(404, "Dars topilmadi")
+        lessons = [(lesson.id, lesson.module_id)]
+    else:
+        result = await db.execute(
+            select(Lesson.id, Lesson.module_id)
+            .where(Lesson.module_id == data.module_id, Lesson.is_active == True)
+            .order_by(Lesson.order_index)
+        )
+        lessons = [(row.id, row.module_id) for row in result.all()]
+        if not lessons:
+            raise HTTPException(404, "Modulda darslar topilmadi")
+
+    batch_id = uuid.uuid4().hex
+    jobs = [
+        QuizGenJob(
+            batch_id=batch_id,
+            lesson_id=lesson_id,
+            module_id=module_id,
+            created_by=admin.id,
+            question_count=data.question_count,
+            difficulty=data.difficulty,
+            extra_context=data.extra_context
+        )
+        for lesson_id, module_id in lessons
+    ]
+    db.add_all(jobs)
+    await db.commit()
+
+    quiz_job_queue.enqueue(j.id for j in jobs)
+    return {"batch_id": batch_id, "job_ids": [j.id for j in jobs]}
+
+
+@router.get("/quizzes/ai-jobs")
+async def get_quiz_ai_jobs(
+    batch_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 50,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """AI quiz joblar ro'yxati"""
+    query = select(QuizGenJob).order_by(desc(QuizGenJob.id)).limit(min(limit, 200))
+    if batch_id:
+        query = query.where(QuizGenJob.batch_id == batch_id)
+    if status:
+        query = query.where(QuizGenJob.status == status)
+    result = await db.execute(query)
+    return [job_dict(j) for j in result.scalars().all()]
+
+
+@router.get("/quizzes/ai-jobs/stream")
+async def stream_quiz_ai_jobs(
+    batch_id: str,
+    admin: User = Depends(get_current_admin)
+):
+    """Batch holati SSE orqali - barcha joblar tugaguncha"""
+    async def events():
+        last = None
+        while True:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(QuizGenJob).where(QuizGenJob.batch_id == batch_id).order_by(QuizGenJob.id)
+                )
+                jobs = [job_dict(j) for j in result.scalars().all()]
+            if jobs != last:
+                yield f"data: {json.dumps(jobs)}\n\n"
+                last = jobs
+            if not jobs or all(j["status"] in TERMINAL_STATUSES for j in jobs):
+                return
+            if not await quiz_job_queue.wait_for_change(timeout=15):
+                yield ": ping\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    if not settings.ANTHROPIC_API_KEY:
-        raise HTTPException(503, "AI xizmati sozlanmagan (ANTHROPIC_API_KEY yo'q)")
 
-    lesson = await db.get(Lesson, data.lesson_id)
+@router.get("/quizzes/ai-jobs/{job_id}")
+async def get_quiz_ai_job(
+    job_id: int,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """AI quiz job va yaratilgan savollar"""
+    job = await db.get(QuizGenJob, job_id)
+    if not job:
+        raise HTTPException(404, "Job topilmadi")
+    return job_dict(job, include_questions=True)
+
+
+@router.post("/quizzes/ai-jobs/{job_id}/approve")
+async def approve_quiz_ai_job(
+    job_id: int,
+    data: AIQuizJobApprove,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Yaratilgan savollarni bitta tranzaksiyada quizga qo'shish"""
+    job = await db.get(QuizGenJob, job_id)
+    if not job:
+        raise HTTPException(404, "Job topilmadi")
+    if job.status != "done":
+        raise HTTPException(400, "Faqat tayyor (done) jobni tasdiqlash mumkin")
+
+    if data.questions is not None:
+        questions = [q.model_dump() for q in data.questions]
+    else:
+        questions = job.questions or []
+    if not questions:
+        raise HTTPException(400, "Savollar yo'q")
+
+    lesson = await db.get(Lesson, job.lesson_id)
     if not lesson:
         raise HTTPException(404, "Dars topilmadi")
 
-    module_title = ""
-    if lesson.module_id:
-        module = await db.get(Module, lesson.module_id)
-        if module:
-            module_title = module.title
-
-    # Build context for Claude
-    parts = []
-    if module_title:
-        parts.append(f"Kurs: {module_title}")
-    parts.append(f"Dars: {lesson.title}")
-    if lesson.description:
-        parts.append(f"Tavsif: {lesson.description}")
-    if lesson.content:
-        parts.append(f"Dars matni:\n{lesson.content[:3000]}")
-    if data.extra_context:
-        parts.append(f"Qo'shimcha ma'lumot: {data.extra_context}")
-
-    context = "\n\n".join(parts)
-    diff_map = {
-        "easy": "oson — asosiy ta'riflar va tushunchalar",
-        "medium": "o'rtacha — tushunish va qo'llash",
-        "hard": "qiyin — tahlil va chuqur bilim"
-    }
-    diff_label = diff_map.get(data.difficulty, "o'rtacha")
-
-    prompt = f"""Quyidagi dars mavzusiga oid {data.question_count} ta test savoli yarating.
-
-Kontekst:
-{context}
-
-Talablar:
-- Qiyinlik: {diff_label}
-- Har bir savolda 4 ta javob varianti
-- Faqat 1 ta to'g'ri javob
-- O'zbek tilida
-
-FAQAT quyidagi JSON formatida javob bering, boshqa matn bo'lmasin:
-[
-  {{
-    "question": "Savol matni?",
-    "options": ["A varianti", "B varianti", "C varianti", "D varianti"],
-    "correct_index": 0,
-    "explanation": "Nima uchun A to'g'ri"
-  }}
-]"""
-
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            resp = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "x-api-key": settings.ANTHROPIC_API_KEY,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json"
-                },
-                json={
-                    "model": "claude-haiku-4-5-20251001",
-                    "max_tokens": 4096,
-                    "messages": [{"role": "user", "content": prompt}]
-                }
-            )
-            result = resp.json()
-            if "error" in result:
-                err_msg = result["error"].get("message", "Noma'lum")
-                raise HTTPException(500, f"AI xatosi: {err_msg}")
-            raw_text = result["content"][0]["text"]
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(500, f"AI ga ulanishda xato: {str(e)}")
-
-    # Extract JSON array from response
-    try:
-        match = re.search(r'\[[\s\S]*\]', raw_text)
-        questions_raw = json.loads(match.group() if match else raw_text.strip())
-    except json.JSONDecodeError:
-        raise HTTPException(500, "AI javobini o'qishda xato. Qayta urinib ko'ring.")
-
-    validated = []
-    for i, q in enumerate(questions_raw[:data.question_count]):
-        if not isinstance(q, dict):
-            continue
-        opts = [str(o) for o in q.get("options", [])[:4]]
-        if len(opts) < 2:
-            continue
-        correct_idx = int(q.get("correct_index", 0))
-        correct_idx = max(0, min(correct_idx, len(opts) - 1))
-        validated.append({
-            "id": i + 1,
-            "question": str(q.get("question", "")),
-            "options": opts,
-            "correct_index": correct_idx,
-            "explanation": str(q.get("explanation", ""))
+    result = await db.execute(
+        select(Quiz).where(Quiz.lesson_id == lesson.id, Quiz.deleted_at.is_(None))
+    )
+    quiz = result.scalars().first()
+    created = quiz is None
+    if created:
+        quiz = Quiz(
+            lesson_id=lesson.id,
+            title=data.quiz_title or f"{lesson.title} — test",
+            time_limit_sec=data.time_limit_sec,
+            pass_percentage=data.pass_percentage
+        )
+        db.add(quiz)
+        await db.flush()
+
+    result = await db.execute(
+        select(func.coalesce(func.max(Question.order_index), -1)).where(Question.quiz_id == quiz.id)
+    )
+    start_index = result.scalar() + 1
+
+    rows = []
+    for i, q in enumerate(questions):
+        options = [str(o) for o in q["options"]]
+        correct_idx = max(0, min(int(q.get("correct_index", 0)), len(options) - 1))
+        rows.append({
+            "quiz_id": quiz.id,
+            "question_text": q["question"],
+            "question_type": "multiple_choice",
+            "options": options,
+            "correct_answer": options[correct_idx],
+            "explanation": q.get("explanation") or None,
+            "order_index": start_index + i
         })
+    await db.execute(insert(Question), rows)
+
+    job.status = "approved"
+    job.quiz_id = quiz.id
+    await db.commit()
+    quiz_job_queue.notify()
+    if created:
+        dashboard_stats.bump(quizzes=1)
+
+    return {"success": True, "quiz_id": quiz.id, "added": len(rows)}
+
+
+@router.post("/quizzes/ai-jobs/{job_id}/reject")
+async def reject_quiz_ai_job(
+    job_id: int,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Jobni rad etish"""
+    job = await db.get(QuizGenJob, job_id)
+    if not job:
+        raise HTTPException(404, "Job topilmadi")
+    if job.status not in ("done", "failed"):
+        raise HTTPException(400, "Job hali tugamagan")
+    job.status = "rejected"
+    await db.commit()
+    quiz_job_queue.notify()
+    return {"success": True}
+
+
+@router.post("/quizzes/ai-jobs/{job_id}/retry")
+async def retry_quiz_ai_job(
+    job_id: int,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Muvaffaqiyatsiz jobni qayta navbatga qo'yish"""
+    job = await db.get(QuizGenJob, job_id)
+    if not job:
+        raise HTTPException(404, "Job topilmadi")
+    if job.status != "failed":
+        raise HTTPException(400, "Faqat failed jobni qayta ishga tushirish mumkin")
+    job.status = "pending"
+    job.error = None
+    await db.commit()
+    quiz_job_queue.enqueue([job.id])
+    quiz_job_queue.notify()
+    return {"success": True}
 
-    if not validated:
-        raise HTTPException(500, "AI savollar yarata olmadi. Qayta urinib ko'ring.")
 
-    return {"questions": validated, "lesson_title": lesson.title}
+@router.post("/quizzes/explanations/fill")
+async def fill_question_explanations(
+    background_tasks: BackgroundTasks,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Izohsiz savollar uchun AI izohlarini fonda yaratish"""
+    result = await db.execute(
+        select(func.count(Question.id))
+        .where(or_(Question.explanation.is_(None), Question.explanation == ""))
+    )
+    missing = result.scalar() or 0
+    if missing:
+        background_tasks.add_task(fill_missing_explanations)
+    return {"success": True, "missing": missing}
+
+
+# ─── Course import / export ───────────────────────────────────────────────────
+
+@router.post("/courses/import")
+async def import_courses(
+    file: UploadFile = File(...),
+    mode: str = "upsert",
+    dry_run: bool = False,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Kurs paketi (JSONL yoki ZIP) - avval to'liq tekshiruv, keyin bitta tranzaksiya"""
+    if mode not in ("upsert", "insert"):
+        raise HTTPException(400, "mode: upsert yoki insert")
+    try:
+        package = await asyncio.to_thread(parse_package, iter_package_lines(file.file))
+    except PackageError as e:
+        raise HTTPException(422, {"message": "Paket xato", "errors": e.errors})
+
+    if dry_run:
+        return {"success": True, "dry_run": True, "total": package.counts()}
+    result = await import_package(db, package, mode)
+    return {"success": True, **result}
+
+
+@router.get("/courses/{module_id}/export")
+async def export_course(
+    module_id: int,
+    format: str = "jsonl",
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Modul (kurs) darslari, quizlari va savollari bilan - JSONL yoki ZIP stream"""
+    if format not in ("jsonl", "zip"):
+        raise HTTPException(400, "format: jsonl yoki zip")
+    module = await db.get(Module, module_id)
+    if not module or module.deleted_at is not None:
+        raise HTTPException(404, "Modul topilmadi")
+
+    if format == "zip":
+        body, media_type = iter_course_zip([module_id]), "application/zip"
+    else:
+        body, media_type = iter_course_jsonl([module_id]), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="course_{module_id}.{format}"'}
+    )
 
 
 # ─── Audio Library Admin ───────────────────────────────────────────────────────
@@ -646,6 +954,11 @@ async def create_audio(
     db: AsyncSession = Depends(get_db)
 ):
     audio = Audio(**data.model_dump())
+    meta = await get_metadata(audio.audio_url, "audio")
+    if not audio.duration_sec and meta.get("duration_sec"):
+        audio.duration_sec = meta["duration_sec"]
+    if not audio.cover_url and meta.get("cover_url"):
+        audio.cover_url = meta["cover_url"]
     db.add(audio)
     await db.commit()
     await db.refresh(audio)
@@ -655,6 +968,7 @@ async def create_audio(
 @router.delete("/audio/{audio_id}")
 async def delete_audio(
     audio_id: int,
+    background_tasks: BackgroundTasks,
     admin: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
@@ -664,26 +978,19 @@ async def delete_audio(
         raise HTTPException(404, "Audio topilmadi")
     await db.delete(audio)
     await db.commit()
+    background_tasks.add_task(collect_media_garbage)
     return {"success": True}
 
 
 @router.post("/audio/upload")
 async def upload_audio_file(
-    file: UploadFile = File(...),
+    request: Request,
     admin: User = Depends(get_current_admin)
 ):
-    """Audio fayl yuklash"""
-    allowed = {"mp3", "wav", "ogg", "m4a", "aac", "flac"}
-    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
-    if ext not in allowed:
-        raise HTTPException(400, "Faqat audio fayllar qabul qilinadi (mp3, wav, ogg, m4a, aac)")
-    os.makedirs("uploads/audio", exist_ok=True)
-    filename = f"{uuid.uuid4()}.{ext}"
-    path = f"uploads/audio/{filename}"
-    content = await file.read()
-    with open(path, "wb") as f:
-        f.write(content)
-    return {"url": f"uploads/audio/{filename}"}
+    """Audio fayl yuklash (multipart, "file" maydoni)"""
+    stored = await save_upload(request, "audio")
+    meta = await get_metadata(stored.url, "audio")
+    return {"url": stored.url, "size": stored.size, "sha256": stored.sha256, **meta}
 
 
 # ─── Books Library Admin ───────────────────────────────────────────────────────
@@ -746,6 +1053,11 @@ async def create_book(
     db: AsyncSession = Depends(get_db)
 ):
     book = Book(**data.model_dump())
+    meta = await get_metadata(book.file_url, "book")
+    if not book.pages and meta.get("pages"):
+        book.pages = meta["pages"]
+    if not book.cover_url and meta.get("cover_url"):
+        book.cover_url = meta["cover_url"]
     db.add(book)
     await db.commit()
     await db.refresh(book)
@@ -755,6 +1067,7 @@ async def create_book(
 @router.delete("/books/{book_id}")
 async def delete_book(
     book_id: int,
+    background_tasks: BackgroundTasks,
     admin: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
@@ -764,23 +1077,16 @@ async def delete_book(
         raise HTTPException(404, "Kitob topilmadi")
     await db.delete(book)
     await db.commit()
+    background_tasks.add_task(collect_media_garbage)
     return {"success": True}
 
 
 @router.post("/books/upload")
 async def upload_book_file(
-    file: UploadFile = File(...),
+    request: Request,
     admin: User = Depends(get_current_admin)
 ):
-    """Kitob fayl yuklash (PDF va boshqalar)"""
-    allowed = {"pdf", "epub", "fb2", "djvu", "doc", "docx"}
-    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
-    if ext not in allowed:
-        raise HTTPException(400, "Faqat kitob fayllar qabul qilinadi (pdf, epub, fb2)")
-    os.makedirs("uploads/books", exist_ok=True)
-    filename = f"{uuid.uuid4()}.{ext}"
-    path = f"uploads/books/{filename}"
-    content = await file.read()
-    with open(path, "wb") as f:
-        f.write(content)
-    return {"url": f"uploads/books/{filename}"}
+    """Kitob fayl yuklash (PDF va boshqalar, multipart "file" maydoni)"""
+    stored = await save_upload(request, "book")
+    meta = await get_metadata(stored.url, "book")
+    return {"url": stored.url, "size": stored.size, "sha256": stored.sha256, **meta}
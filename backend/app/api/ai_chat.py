@@ -1,25 +1,29 @@
 """
 AI Chat & AI Explain API
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
 from typing import List, Optional
-import httpx
+from contextlib import aclosing
+from datetime import datetime
 import json
 
-from app.database import get_db
+from app.database import get_db, async_session
 from app.models.user import User
 from app.models.ai_chat import AIChatHistory
 from app.models.lesson import Lesson
-from app.api.deps import get_current_user, get_premium_user
+from app.api.deps import get_current_user, get_premium_user, get_current_admin, get_ai_user
 from app.config import settings
+from app.services.ai_client import ai_client, AIError
+from app.services.explain_cache import explain_cache
+from app.services.ai_usage import ai_usage
+from app.services.chat_memory import build_context, schedule_summary_refresh, conversation_filter, keyset_before
 
 router = APIRouter()
 
-ANTHROPIC_API_URL = "https://api.anthropic.com/v1/messages"
-
 
 class ChatMessage(BaseModel):
     role: str
@@ -29,6 +33,7 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     lesson_id: Optional[int] = None
+    # Eskirgan: kontekst endi serverda saqlangan tarixdan yig'iladi
     history: Optional[List[ChatMessage]] = []
 
 
@@ -37,84 +42,100 @@ class ExplainRequest(BaseModel):
     lesson_id: Optional[int] = None
 
 
-async def call_claude(messages: list, system: str = "") -> str:
+CHAT_SYSTEM = (
+    "Siz EduLearn ta'lim platformasining AI yordamchisisiz. "
+    "Foydalanuvchilarga o'qishda yordam bering. "
+    "O'zbek tilida qisqa va aniq javob bering. "
+    "Faqat ta'lim bilan bog'liq savollarga javob bering."
+)
+
+EXPLAIN_SYSTEM = (
+    "Siz ta'lim yordamchisisiz. Tanlangan matnni oddiy va tushunarli tarzda izohlang. "
+    "O'zbek tilida javob bering. Qisqa, aniq va misollar bilan tushuntiring."
+)
+
+
+async def _lesson_title(db: AsyncSession, lesson_id: Optional[int]) -> Optional[str]:
+    if not lesson_id:
+        return None
+    result = await db.execute(select(Lesson.title).where(Lesson.id == lesson_id))
+    return result.scalar_one_or_none()
+
+
+async def build_chat_prompt(data: ChatRequest, user_id: int, db: AsyncSession) -> tuple:
+    """Chat uchun (system, messages) - tarix serverdan, token budjeti bo'yicha"""
+    system = CHAT_SYSTEM
+    title = await _lesson_title(db, data.lesson_id)
+    if title:
+        system += f"\n\nFoydalanuvchi hozir '{title}' darsini o'qimoqda."
+
+    summary, messages = await build_context(db, user_id, data.lesson_id, data.message)
+    if summary:
+        system += f"\n\nOldingi suhbat xulosasi:\n{summary}"
+    return system, messages
+
+
+async def build_explain_prompt(data: ExplainRequest, db: AsyncSession) -> tuple:
+    """Explain uchun (system, messages)"""
+    system = EXPLAIN_SYSTEM
+    title = await _lesson_title(db, data.lesson_id)
+    if title:
+        system += f"\n\nKontekst: '{title}' darsi."
+
+    prompt = f"Quyidagi matnni tushuntiring:\n\n{data.text}"
+    return system, [{"role": "user", "content": prompt}]
+
+
+async def save_chat_turn(db: AsyncSession, user_id: int, lesson_id: Optional[int], message: str, response: str):
+    db.add(AIChatHistory(user_id=user_id, role="user", content=message, lesson_id=lesson_id))
+    db.add(AIChatHistory(user_id=user_id, role="assistant", content=response, lesson_id=lesson_id))
+    await db.commit()
+
+
+async def ask_claude(messages: list, system: str = "", user_id: Optional[int] = None) -> str:
+    """Call Anthropic Claude API (xato bo'lsa AIError)"""
+    payload = {
+        "model": settings.AI_MODEL,
+        "max_tokens": 1024,
+        "messages": messages
+    }
+    if system:
+        payload["system"] = system
+
+    data = await ai_client.post_messages(payload)
+    ai_usage.record_response(user_id, data.get("usage"))
+    if "content" in data and data["content"]:
+        return data["content"][0]["text"]
+    raise AIError(data.get("error", {}).get("message", "Javob olishda xato yuz berdi."))
+
+
+async def call_claude(messages: list, system: str = "", user_id: Optional[int] = None) -> str:
     """Call Anthropic Claude API"""
-    if not settings.ANTHROPIC_API_KEY:
+    if not ai_client.enabled:
         return "AI Chat hozircha mavjud emas. API kaliti sozlanmagan."
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        payload = {
-            "model": "claude-haiku-4-5-20251001",
-            "max_tokens": 1024,
-            "messages": messages
-        }
-        if system:
-            payload["system"] = system
-
-        try:
-            response = await client.post(
-                ANTHROPIC_API_URL,
-                headers={
-                    "x-api-key": settings.ANTHROPIC_API_KEY,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json"
-                },
-                json=payload
-            )
-            data = response.json()
-            if "content" in data and data["content"]:
-                return data["content"][0]["text"]
-            return "Javob olishda xato yuz berdi."
-        except Exception as e:
-            return f"AI xizmatida xato: {str(e)}"
+    try:
+        return await ask_claude(messages, system, user_id)
+    except AIError:
+        return "Javob olishda xato yuz berdi."
+    except Exception as e:
+        return f"AI xizmatida xato: {str(e)}"
 
 
 @router.post("/chat")
 async def ai_chat(
     data: ChatRequest,
-    current_user: User = Depends(get_premium_user),
+    current_user: User = Depends(get_ai_user),
     db: AsyncSession = Depends(get_db)
 ):
     """General AI chat for learning questions"""
-    system = (
-        "Siz EduLearn ta'lim platformasining AI yordamchisisiz. "
-        "Foydalanuvchilarga o'qishda yordam bering. "
-        "O'zbek tilida qisqa va aniq javob bering. "
-        "Faqat ta'lim bilan bog'liq savollarga javob bering."
-    )
-
-    # Add lesson context if provided
-    if data.lesson_id:
-        lesson_result = await db.execute(select(Lesson).where(Lesson.id == data.lesson_id))
-        lesson = lesson_result.scalar_one_or_none()
-        if lesson:
-            system += f"\n\nFoydalanuvchi hozir '{lesson.title}' darsini o'qimoqda."
-
-    # Build messages
-    messages = []
-    if data.history:
-        for msg in data.history[-6:]:  # last 6 messages for context
-            messages.append({"role": msg.role, "content": msg.content})
-    messages.append({"role": "user", "content": data.message})
-
-    response = await call_claude(messages, system)
+    ai_usage.record(current_user.id, requests=1)
+    system, messages = await build_chat_prompt(data, current_user.id, db)
+    response = await call_claude(messages, system, current_user.id)
 
     # Save to history
-    user_msg = AIChatHistory(
-        user_id=current_user.id,
-        role="user",
-        content=data.message,
-        lesson_id=data.lesson_id
-    )
-    assistant_msg = AIChatHistory(
-        user_id=current_user.id,
-        role="assistant",
-        content=response,
-        lesson_id=data.lesson_id
-    )
-    db.add(user_msg)
-    db.add(assistant_msg)
-    await db.commit()
+    await save_chat_turn(db, current_user.id, data.lesson_id, data.message, response)
+    schedule_summary_refresh(current_user.id, data.lesson_id)
 
     return {"response": response}
 
@@ -122,26 +143,171 @@ async def ai_chat(
 @router.post("/explain")
 async def ai_explain(
     data: ExplainRequest,
-    current_user: User = Depends(get_premium_user),
+    current_user: User = Depends(get_ai_user),
     db: AsyncSession = Depends(get_db)
 ):
     """AI explains selected text in simple terms"""
-    system = (
-        "Siz ta'lim yordamchisisiz. Tanlangan matnni oddiy va tushunarli tarzda izohlang. "
-        "O'zbek tilida javob bering. Qisqa, aniq va misollar bilan tushuntiring."
+    if not ai_client.enabled:
+        return {"explanation": "AI Chat hozircha mavjud emas. API kaliti sozlanmagan."}
+
+    ai_usage.record(current_user.id, requests=1)
+    key = explain_cache.make_key(data.text, data.lesson_id)
+    system, messages = await build_explain_prompt(data, db)
+    try:
+        response = await explain_cache.get_or_load(
+            key, data.lesson_id, lambda: ask_claude(messages, system, current_user.id)
+        )
+    except AIError:
+        response = "Javob olishda xato yuz berdi."
+    except Exception as e:
+        response = f"AI xizmatida xato: {str(e)}"
+    return {"explanation": response}
+
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def stream_claude(request: Request, messages: list, system: str, on_complete=None, user_id: Optional[int] = None):
+    """
+    Provider stream ni SSE ga proxy qilish
+
+    Events: {"type": "delta", "text"}, {"type": "done"}, {"type": "error", "message"}
+    Klient uzilsa generator yopiladi va upstream so'rov bekor qilinadi.
+    on_complete(text) faqat oqim to'liq tugaganda chaqiriladi.
+    """
+    if not ai_client.enabled:
+        yield _sse({"type": "error", "message": "AI Chat hozircha mavjud emas. API kaliti sozlanmagan."})
+        return
+
+    payload = {
+        "model": settings.AI_MODEL,
+        "max_tokens": 1024,
+        "messages": messages
+    }
+    if system:
+        payload["system"] = system
+
+    parts = []
+    usage = {"input_tokens": 0, "output_tokens": None}
+    try:
+        async with aclosing(ai_client.stream_messages(payload)) as events:
+            async for event in events:
+                if await request.is_disconnected():
+                    return
+                etype = event.get("type")
+                if etype == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        parts.append(text)
+                        yield _sse({"type": "delta", "text": text})
+                elif etype == "message_start":
+                    usage["input_tokens"] = event.get("message", {}).get("usage", {}).get("input_tokens", 0)
+                elif etype == "message_delta":
+                    usage["output_tokens"] = event.get("usage", {}).get("output_tokens")
+                elif etype == "error":
+                    message = event.get("error", {}).get("message", "Noma'lum")
+                    yield _sse({"type": "error", "message": f"AI xatosi: {message}"})
+                    return
+                elif etype == "message_stop":
+                    break
+    except Exception as e:
+        yield _sse({"type": "error", "message": f"AI xizmatida xato: {str(e)}"})
+        return
+    finally:
+        # Uzilgan oqimda output_tokens kelmaydi - matndan taxmin qilamiz
+        output_tokens = usage["output_tokens"]
+        if output_tokens is None:
+            output_tokens = len("".join(parts)) // 4
+        ai_usage.record(user_id, input_tokens=usage["input_tokens"], output_tokens=output_tokens)
+
+    full_text = "".join(parts)
+    if on_complete is not None:
+        await on_complete(full_text)
+    yield _sse({"type": "done"})
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx buffering o'chirish
+}
+
+
+@router.post("/chat/stream")
+async def ai_chat_stream(
+    data: ChatRequest,
+    request: Request,
+    current_user: User = Depends(get_ai_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """AI chat - javob SSE orqali token-token keladi"""
+    ai_usage.record(current_user.id, requests=1)
+    system, messages = await build_chat_prompt(data, current_user.id, db)
+    user_id = current_user.id
+
+    async def persist(text: str):
+        # Request sessiyasi stream paytida yopilgan bo'ladi
+        async with async_session() as session:
+            await save_chat_turn(session, user_id, data.lesson_id, data.message, text)
+        schedule_summary_refresh(user_id, data.lesson_id)
+
+    return StreamingResponse(
+        stream_claude(request, messages, system, on_complete=persist, user_id=user_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
     )
 
-    if data.lesson_id:
-        lesson_result = await db.execute(select(Lesson).where(Lesson.id == data.lesson_id))
-        lesson = lesson_result.scalar_one_or_none()
-        if lesson:
-            system += f"\n\nKontekst: '{lesson.title}' darsi."
 
-    prompt = f"Quyidagi matnni tushuntiring:\n\n{data.text}"
-    messages = [{"role": "user", "content": prompt}]
+@router.post("/explain/stream")
+async def ai_explain_stream(
+    data: ExplainRequest,
+    request: Request,
+    current_user: User = Depends(get_ai_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """AI explain - javob SSE orqali token-token keladi"""
+    ai_usage.record(current_user.id, requests=1)
+    key = explain_cache.make_key(data.text, data.lesson_id)
+    cached = await explain_cache.get(key)
+    if cached is not None:
+        async def replay():
+            yield _sse({"type": "delta", "text": cached})
+            yield _sse({"type": "done"})
+        return StreamingResponse(replay(), media_type="text/event-stream", headers=SSE_HEADERS)
 
-    response = await call_claude(messages, system)
-    return {"explanation": response}
+    system, messages = await build_explain_prompt(data, db)
+
+    async def remember(text: str):
+        if text:
+            await explain_cache.put(key, data.lesson_id, text)
+
+    return StreamingResponse(
+        stream_claude(request, messages, system, on_complete=remember, user_id=current_user.id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.get("/usage")
+async def get_ai_usage(
+    current_user: User = Depends(get_premium_user)
+):
+    """Bugungi AI foydalanish va limitlar"""
+    usage = await ai_usage.usage(current_user.id)
+    return {
+        **usage,
+        "request_quota": ai_usage.request_quota,
+        "token_quota": ai_usage.token_quota,
+        "unlimited": current_user.is_admin
+    }
+
+
+@router.get("/explain/cache-stats")
+async def get_explain_cache_stats(
+    admin: User = Depends(get_current_admin)
+):
+    """AI explain kesh metrikalari (hit rate, tejalgan vaqt)"""
+    return explain_cache.stats()
 
 
 @router.get("/history")
@@ -150,16 +316,16 @@ async def get_chat_history(
     current_user: User = Depends(get_premium_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get AI chat history"""
+    """Get AI chat history (oxirgi 50 ta, eskidan yangiga)"""
     query = select(AIChatHistory).where(
         AIChatHistory.user_id == current_user.id
-    ).order_by(AIChatHistory.created_at.asc()).limit(50)
+    ).order_by(AIChatHistory.created_at.desc(), AIChatHistory.id.desc()).limit(50)
 
     if lesson_id:
         query = query.where(AIChatHistory.lesson_id == lesson_id)
 
     result = await db.execute(query)
-    messages = result.scalars().all()
+    messages = list(reversed(result.scalars().all()))
 
     return [
         {
@@ -170,3 +336,48 @@ async def get_chat_history(
         }
         for m in messages
     ]
+
+
+@router.get("/history/page")
+async def get_chat_history_page(
+    lesson_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 30,
+    current_user: User = Depends(get_premium_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Suhbat tarixi sahifalab (yangidan eskiga)
+    cursor - oldingi javobdagi next_cursor
+    """
+    limit = max(1, min(limit, 100))
+    query = (
+        select(AIChatHistory)
+        .where(conversation_filter(current_user.id, lesson_id))
+        .order_by(AIChatHistory.created_at.desc(), AIChatHistory.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        try:
+            created_at, message_id = cursor.rsplit("_", 1)
+            query = query.where(keyset_before(datetime.fromisoformat(created_at), int(message_id)))
+        except ValueError:
+            raise HTTPException(400, "Noto'g'ri cursor")
+
+    result = await db.execute(query)
+    rows = result.scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [
+            {
+                "id": m.id,
+                "role": m.role,
+                "content": m.content,
+                "created_at": m.created_at.isoformat()
+            }
+            for m in rows
+        ],
+        "next_cursor": f"{rows[-1].created_at.isoformat()}_{rows[-1].id}" if has_more else None
+    }
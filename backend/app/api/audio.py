@@ -10,6 +10,9 @@ from app.database import get_db
 from app.models.user import User
 from app.models.audio import AudioCategory, Audio
 from app.api.deps import get_current_user
+from app.core.security import create_media_token
+from app.core.entitlement import has_premium
+from app.services.media_serving import media_url
 
 router = APIRouter()
 
@@ -70,6 +73,7 @@ async def get_category_audios(
         .order_by(Audio.order_index)
     )
     audios = result.scalars().all()
+    token = create_media_token(current_user.id)
 
     return {
         "category": {
@@ -83,7 +87,7 @@ async def get_category_audios(
                 "id": a.id,
                 "title": a.title,
                 "description": a.description,
-                "audio_url": a.audio_url,
+                "audio_url": media_url("audio", a.id, a.audio_url, token),
                 "cover_url": a.cover_url,
                 "duration_sec": a.duration_sec,
                 "duration_str": format_duration(a.duration_sec),
@@ -109,14 +113,14 @@ async def get_audio(
     if not audio:
         raise HTTPException(404, "Audio topilmadi")
 
-    if audio.is_premium and not current_user.is_premium and not current_user.is_admin:
+    if audio.is_premium and not has_premium(current_user) and not current_user.is_admin:
         raise HTTPException(403, "Bu audio faqat premium foydalanuvchilar uchun")
 
     return {
         "id": audio.id,
         "title": audio.title,
         "description": audio.description,
-        "audio_url": audio.audio_url,
+        "audio_url": media_url("audio", audio.id, audio.audio_url, create_media_token(current_user.id)),
         "cover_url": audio.cover_url,
         "duration_sec": audio.duration_sec,
         "duration_str": format_duration(audio.duration_sec),
@@ -14,6 +14,8 @@ from app.models.user import User
 from app.models.login_code import LoginCode
 from app.core.security import verify_telegram_webapp, create_token
 from app.core.level_engine import LevelEngine
+from app.core.entitlement import has_premium
+from app.services.dashboard_stats import dashboard_stats
 from app.api.deps import get_current_user
 from app.config import settings
 
@@ -55,7 +57,7 @@ def build_user_response(user: User) -> dict:
         "level_progress": level_info["progress"],
         "xp_to_next": level_info["xp_to_next"],
         "streak_days": user.streak_days,
-        "is_premium": user.is_premium,
+        "is_premium": has_premium(user),
         "premium_until": user.premium_until.isoformat() if user.premium_until else None,
         "is_admin": user.is_admin,
         "created_at": user.created_at.isoformat()
@@ -86,6 +88,7 @@ async def generate_login_code(
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        dashboard_stats.bump(users_total=1)
     else:
         if data.username:
             user.username = data.username
@@ -161,6 +164,7 @@ async def telegram_auth(
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        dashboard_stats.bump(users_total=1)
     else:
         user.username = telegram_user.get("username")
         user.full_name = f"{telegram_user.get('first_name', '')} {telegram_user.get('last_name', '')}".strip()
@@ -17,6 +17,8 @@ from app.models.quiz import Quiz, Question
 from app.models.battle import Battle, BattleAnswer
 from app.models.xp_history import XPHistory
 from app.api.deps import get_current_user
+from app.services.image_variants import avatar_url
+from app.services.notifications import add_notification, notification_dispatcher
 
 router = APIRouter()
 
@@ -56,14 +58,14 @@ def _battle_dict(b: Battle, user_id: int, module_title: str = "", creator_name:
 async def _pick_questions(module_id: int, db: AsyncSession) -> list[int]:
     """Get random questions from all quizzes in module's lessons"""
     lessons_res = await db.execute(
-        select(Lesson.id).where(Lesson.module_id == module_id)
+        select(Lesson.id).where(Lesson.module_id == module_id, Lesson.is_active != False)
     )
     lesson_ids = [r[0] for r in lessons_res.all()]
     if not lesson_ids:
         return []
 
     quizzes_res = await db.execute(
-        select(Quiz.id).where(Quiz.lesson_id.in_(lesson_ids))
+        select(Quiz.id).where(Quiz.lesson_id.in_(lesson_ids), Quiz.is_active != False)
     )
     quiz_ids = [r[0] for r in quizzes_res.all()]
     if not quiz_ids:
@@ -172,7 +174,12 @@ async def join_battle(
     battle.status = "active"
     battle.started_at = datetime.utcnow()
     battle.question_ids = q_ids
+    add_notification(
+        db, battle.creator_id, "battle_joined",
+        battle_id=battle.id, opponent_id=current_user.id, opponent_name=current_user.full_name
+    )
     await db.commit()
+    notification_dispatcher.notify()
 
     return {"id": battle.id, "status": "active", "question_count": len(q_ids)}
 
@@ -208,8 +215,8 @@ async def get_active_battle(
                        creator_name=creator.full_name if creator else ""),
         "module_emoji": mod.emoji if mod else "📚",
         "opponent_name": opponent.full_name if opponent else None,
-        "opponent_photo": opponent.photo_url if opponent else None,
-        "creator_photo": creator.photo_url if creator else None,
+        "opponent_photo": avatar_url(opponent.id, opponent.photo_url) if opponent else None,
+        "creator_photo": avatar_url(creator.id, creator.photo_url) if creator else None,
     }
 
 
@@ -272,9 +279,9 @@ async def get_battle_status(
                        module_title=mod.title if mod else "",
                        creator_name=creator.full_name if creator else ""),
         "module_emoji": mod.emoji if mod else "📚",
-        "creator_photo": creator.photo_url if creator else None,
+        "creator_photo": avatar_url(creator.id, creator.photo_url) if creator else None,
         "opponent_name": opponent.full_name if opponent else None,
-        "opponent_photo": opponent.photo_url if opponent else None,
+        "opponent_photo": avatar_url(opponent.id, opponent.photo_url) if opponent else None,
         "questions": questions,
         "my_answers": my_answers,
         "answered_count": len(my_answers),
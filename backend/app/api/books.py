@@ -9,6 +9,9 @@ from app.database import get_db
 from app.models.user import User
 from app.models.book import BookCategory, Book
 from app.api.deps import get_current_user
+from app.core.security import create_media_token
+from app.core.entitlement import has_premium
+from app.services.media_serving import media_url, file_extension
 
 router = APIRouter()
 
@@ -59,6 +62,7 @@ async def get_category_books(
         .order_by(Book.order_index)
     )
     books = result.scalars().all()
+    token = create_media_token(current_user.id)
 
     return {
         "category": {
@@ -73,7 +77,7 @@ async def get_category_books(
                 "title": b.title,
                 "description": b.description,
                 "cover_url": b.cover_url,
-                "file_url": b.file_url,
+                "file_url": media_url("book", b.id, b.file_url, token),
                 "author": b.author,
                 "language": b.language,
                 "pages": b.pages,
@@ -97,7 +101,7 @@ async def get_book(
     if not book:
         raise HTTPException(404, "Kitob topilmadi")
 
-    if book.is_premium and not current_user.is_premium and not current_user.is_admin:
+    if book.is_premium and not has_premium(current_user) and not current_user.is_admin:
         raise HTTPException(403, "Bu kitob faqat premium foydalanuvchilar uchun")
 
     return {
@@ -105,7 +109,8 @@ async def get_book(
         "title": book.title,
         "description": book.description,
         "cover_url": book.cover_url,
-        "file_url": book.file_url,
+        "file_url": media_url("book", book.id, book.file_url, create_media_token(current_user.id)),
+        "file_type": file_extension(book.file_url),
         "author": book.author,
         "language": book.language,
         "pages": book.pages,
@@ -0,0 +1,83 @@
+"""
+Admin broadcast API - bot orqali barcha foydalanuvchilarga xabar
+"""
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import select, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.models.broadcast import Broadcast
+from app.api.deps import get_current_admin
+from app.services.broadcast import (
+    broadcast_sender, broadcast_dict, create_broadcast, ACTIVE_STATUSES, MAX_HTML_LENGTH
+)
+
+router = APIRouter()
+
+
+class BroadcastCreate(BaseModel):
+    # Telegram HTML - ko'rinadigan matn uzunligi create_broadcast da tekshiriladi
+    text: str = Field(..., min_length=1, max_length=MAX_HTML_LENGTH)
+    audience: str = "all"
+
+
+@router.post("")
+async def submit_broadcast(
+    data: BroadcastCreate,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Yangi broadcast - navbatga qo'yiladi, fonda yuboriladi"""
+    broadcast = create_broadcast(db, admin, data.text, data.audience)
+    await db.commit()
+    await db.refresh(broadcast)
+    broadcast_sender.notify()
+    return broadcast_dict(broadcast)
+
+
+@router.get("")
+async def list_broadcasts(
+    limit: int = 20,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Oxirgi broadcastlar va ularning holati"""
+    result = await db.execute(
+        select(Broadcast).order_by(desc(Broadcast.id)).limit(min(limit, 100))
+    )
+    return [broadcast_dict(b) for b in result.scalars().all()]
+
+
+@router.get("/{broadcast_id}")
+async def get_broadcast(
+    broadcast_id: int,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Yetkazildi / xato / bloklagan sonlari"""
+    broadcast = await db.get(Broadcast, broadcast_id)
+    if not broadcast:
+        raise HTTPException(404, "Broadcast topilmadi")
+    return broadcast_dict(broadcast)
+
+
+@router.post("/{broadcast_id}/cancel")
+async def cancel_broadcast(
+    broadcast_id: int,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bekor qilish - joriy sahifa tugagach to'xtaydi"""
+    broadcast = await db.get(Broadcast, broadcast_id)
+    if not broadcast:
+        raise HTTPException(404, "Broadcast topilmadi")
+    if broadcast.status not in ACTIVE_STATUSES:
+        raise HTTPException(400, "Broadcast allaqachon tugagan")
+    broadcast.status = "cancelled"
+    broadcast.finished_at = datetime.utcnow()
+    await db.commit()
+    return broadcast_dict(broadcast)
@@ -67,9 +67,13 @@ async def claim_certificate(
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Sertifikat allaqachon olindi")
 
-    # Check completion
+    module = await db.get(Module, module_id)
+    if not module or module.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Modul topilmadi")
+
+    # Check completion (o'chirilgan, purge kutayotgan darslar hisobga olinmaydi)
     lessons_result = await db.execute(
-        select(Lesson).where(Lesson.module_id == module_id)
+        select(Lesson).where(Lesson.module_id == module_id, Lesson.deleted_at.is_(None))
     )
     lessons = lessons_result.scalars().all()
 
@@ -1,7 +1,7 @@
 """
 API Dependencies
 """
-from fastapi import Depends, HTTPException, Header
+from fastapi import Depends, HTTPException, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
@@ -9,6 +9,7 @@ from typing import Optional
 from app.database import get_db
 from app.models.user import User
 from app.core.security import verify_token
+from app.core.entitlement import has_premium
 
 
 async def get_current_user(
@@ -59,7 +60,7 @@ async def get_premium_user(
     if current_user.is_admin:
         return current_user
     
-    if not current_user.is_premium:
+    if not has_premium(current_user):
         raise HTTPException(
             status_code=403, 
             detail={
@@ -68,3 +69,49 @@ async def get_premium_user(
             }
         )
     return current_user
+
+
+async def get_ai_user(
+    current_user: User = Depends(get_premium_user)
+) -> User:
+    """Premium + kunlik AI kvota tekshirish (xotiradagi hisoblagich, O(1))"""
+    from app.services.ai_usage import ai_usage
+
+    if current_user.is_admin:
+        return current_user
+
+    exceeded = await ai_usage.check(current_user.id)
+    if exceeded:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "ai_quota_exceeded",
+                "limit": exceeded,
+                "message": "Bugungi AI limitingiz tugadi. Ertaga qayta urinib ko'ring."
+            }
+        )
+    return current_user
+
+
+async def get_media_user(
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    Media so'rovlari uchun user
+    <audio>/<video>/<a> header yubora olmaydi - ?token= (scope="media") ham qabul qilinadi
+    """
+    if not token:
+        return await get_current_user(authorization, db)
+
+    user_id = verify_token(token, scope="media")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Token yaroqsiz")
+
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User topilmadi")
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Akkount bloklangan")
+    return user
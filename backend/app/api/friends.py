@@ -8,6 +8,9 @@ from app.database import get_db
 from app.models.user import User
 from app.models.friendship import Friendship
 from app.api.deps import get_current_user
+from app.core.entitlement import has_premium
+from app.services.image_variants import avatar_url
+from app.services.notifications import add_notification, notification_dispatcher
 
 router = APIRouter()
 
@@ -38,10 +41,10 @@ async def get_friends(
                 "id": friend.id,
                 "username": friend.username,
                 "full_name": friend.full_name,
-                "photo_url": friend.photo_url,
+                "photo_url": avatar_url(friend.id, friend.photo_url),
                 "total_xp": friend.total_xp,
                 "level": friend.level,
-                "is_premium": friend.is_premium,
+                "is_premium": has_premium(friend),
                 "friendship_id": f.id
             })
     return friends
@@ -94,7 +97,7 @@ async def search_users(
             "id": u.id,
             "username": u.username,
             "full_name": u.full_name,
-            "photo_url": u.photo_url,
+            "photo_url": avatar_url(u.id, u.photo_url),
             "total_xp": u.total_xp,
             "level": u.level,
         }
@@ -127,7 +130,7 @@ async def get_friend_requests(
                     "id": requester.id,
                     "username": requester.username,
                     "full_name": requester.full_name,
-                    "photo_url": requester.photo_url,
+                    "photo_url": avatar_url(requester.id, requester.photo_url),
                     "total_xp": requester.total_xp,
                     "level": requester.level
                 }
@@ -156,10 +159,17 @@ async def send_friend_request(
     existing = result.scalar_one_or_none()
     if existing:
         raise HTTPException(status_code=400, detail="Do'stlik so'rovi allaqachon yuborilgan")
+    if not await db.get(User, user_id):
+        raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
 
     friendship = Friendship(requester_id=current_user.id, receiver_id=user_id, status="pending")
     db.add(friendship)
+    add_notification(
+        db, user_id, "friend_request",
+        requester_id=current_user.id, requester_name=current_user.full_name
+    )
     await db.commit()
+    notification_dispatcher.notify()
     return {"message": "Do'stlik so'rovi yuborildi"}
 
 
@@ -13,6 +13,7 @@ from app.models.progress import UserProgress
 from app.api.deps import get_current_user
 from app.core.xp_engine import XPEngine
 from app.core.level_engine import LevelEngine
+from app.core.entitlement import has_premium
 
 router = APIRouter()
 xp_engine = XPEngine()
@@ -65,7 +66,7 @@ async def get_gamification_stats(
             "id": current_user.id,
             "full_name": current_user.full_name,
             "photo_url": current_user.photo_url,
-            "is_premium": current_user.is_premium
+            "is_premium": has_premium(current_user)
         },
         "level": level_info,
         "stats": {
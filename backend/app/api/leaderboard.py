@@ -9,6 +9,8 @@ from app.database import get_db
 from app.models.user import User
 from app.api.deps import get_current_user
 from app.core.level_engine import LevelEngine
+from app.core.entitlement import has_premium
+from app.services.image_variants import avatar_url
 
 router = APIRouter()
 level_engine = LevelEngine()
@@ -36,11 +38,11 @@ async def get_global_leaderboard(
             "user_id": user.id,
             "username": user.username,
             "full_name": user.full_name,
-            "photo_url": user.photo_url,
+            "photo_url": avatar_url(user.id, user.photo_url),
             "total_xp": user.total_xp,
             "level": user.level,
             "level_badge": level_engine.get_level_badge(user.level),
-            "is_premium": user.is_premium,
+            "is_premium": has_premium(user),
             "is_current_user": user.id == current_user.id
         })
     
@@ -89,6 +91,7 @@ async def get_weekly_leaderboard(
             User.photo_url,
             User.level,
             User.is_premium,
+            User.premium_until,
             func.sum(XPHistory.amount).label("weekly_xp")
         )
         .join(XPHistory, XPHistory.user_id == User.id)
@@ -106,11 +109,11 @@ async def get_weekly_leaderboard(
             "user_id": user.id,
             "username": user.username,
             "full_name": user.full_name,
-            "photo_url": user.photo_url,
+            "photo_url": avatar_url(user.id, user.photo_url),
             "weekly_xp": user.weekly_xp or 0,
             "level": user.level,
             "level_badge": level_engine.get_level_badge(user.level),
-            "is_premium": user.is_premium,
+            "is_premium": has_premium(user),
             "is_current_user": user.id == current_user.id
         })
     
@@ -15,6 +15,10 @@ from app.models.lesson import Lesson
 from app.models.progress import UserProgress
 from app.models.xp_history import XPHistory
 from app.api.deps import get_current_user, get_premium_user
+from app.core.security import create_media_token
+from app.core.entitlement import has_premium
+from app.services.media_serving import media_url, hls_urls
+from app.services.transcode_queue import PENDING_STATUSES, is_transcoded
 from app.core.xp_engine import XPEngine
 from app.core.level_engine import LevelEngine
 
@@ -23,6 +27,16 @@ xp_engine = XPEngine()
 level_engine = LevelEngine()
 
 
+def _alive_lesson():
+    """Dars ham, uning moduli ham o'chirilmagan (purge kutayotganlar ko'rinmaydi)"""
+    return Lesson.deleted_at.is_(None), Lesson.module.has(Module.deleted_at.is_(None))
+
+
+def _active_quiz(lesson: Lesson):
+    """O'chirilgan (purge kutayotgan) quiz ko'rsatilmaydi"""
+    return lesson.quiz if lesson.quiz is not None and lesson.quiz.is_active != False else None
+
+
 @router.get("/modules")
 async def get_modules(
     current_user: User = Depends(get_current_user),
@@ -62,7 +76,7 @@ async def get_modules(
             "emoji": module.emoji,
             "image_url": module.image_url,
             "is_premium": module.is_premium,
-            "is_locked": module.is_premium and not current_user.is_premium and not current_user.is_admin,
+            "is_locked": module.is_premium and not has_premium(current_user) and not current_user.is_admin,
             "total_lessons": total_lessons,
             "completed_lessons": completed_lessons,
             "progress": round((completed_lessons / total_lessons * 100) if total_lessons > 0 else 0, 1)
@@ -79,14 +93,16 @@ async def get_module_lessons(
 ):
     """Modul darslari"""
     # Check module exists
-    result = await db.execute(select(Module).where(Module.id == module_id))
+    result = await db.execute(
+        select(Module).where(Module.id == module_id, Module.deleted_at.is_(None))
+    )
     module = result.scalar_one_or_none()
     
     if not module:
         raise HTTPException(status_code=404, detail="Modul topilmadi")
     
     # Check premium access
-    if module.is_premium and not current_user.is_premium and not current_user.is_admin:
+    if module.is_premium and not has_premium(current_user) and not current_user.is_admin:
         raise HTTPException(
             status_code=403,
             detail={"error": "premium_required", "message": "Bu modul faqat Premium uchun"}
@@ -122,7 +138,7 @@ async def get_module_lessons(
             is_locked = True
             lock_reason = "previous_incomplete"
         
-        if lesson.is_premium and not current_user.is_premium and not current_user.is_admin:
+        if lesson.is_premium and not has_premium(current_user) and not current_user.is_admin:
             is_locked = True
             lock_reason = "premium_required"
         
@@ -136,7 +152,7 @@ async def get_module_lessons(
             "is_completed": is_completed,
             "is_locked": is_locked,
             "lock_reason": lock_reason,
-            "has_quiz": lesson.quiz is not None,
+            "has_quiz": _active_quiz(lesson) is not None,
             "quiz_score": user_progress[lesson.id].quiz_score if lesson.id in user_progress else None
         })
         
@@ -162,7 +178,7 @@ async def get_lesson(
     result = await db.execute(
         select(Lesson)
         .options(selectinload(Lesson.module), selectinload(Lesson.quiz))
-        .where(Lesson.id == lesson_id)
+        .where(Lesson.id == lesson_id, *_alive_lesson())
     )
     lesson = result.scalar_one_or_none()
     
@@ -170,7 +186,7 @@ async def get_lesson(
         raise HTTPException(status_code=404, detail="Dars topilmadi")
     
     # Check premium
-    if lesson.is_premium and not current_user.is_premium and not current_user.is_admin:
+    if lesson.is_premium and not has_premium(current_user) and not current_user.is_admin:
         raise HTTPException(
             status_code=403,
             detail={"error": "premium_required", "message": "Bu dars faqat Premium uchun"}
@@ -186,12 +202,24 @@ async def get_lesson(
     )
     progress = progress_result.scalar_one_or_none()
     
+    # HLS (job dars yaratilishidan oldin tugagan bo'lishi mumkin)
+    transcode_status = lesson.transcode_status
+    if transcode_status in PENDING_STATUSES and is_transcoded(lesson.video_url):
+        transcode_status = "ready"
+    media_token = create_media_token(current_user.id)
+    hls = hls_urls(lesson.id, media_token) if transcode_status == "ready" else {}
+    quiz = _active_quiz(lesson)
+    
     return {
         "id": lesson.id,
         "title": lesson.title,
         "description": lesson.description,
         "content": lesson.content,
-        "video_url": lesson.video_url,
+        "video_url": media_url("lesson", lesson.id, lesson.video_url, media_token),
+        "hls_url": hls.get("hls_url"),
+        "poster_url": hls.get("poster_url"),
+        "thumbnails_url": hls.get("thumbnails_url"),
+        "transcode_status": transcode_status,
         "duration_min": lesson.duration_min,
         "xp_reward": lesson.xp_reward,
         "is_premium": lesson.is_premium,
@@ -200,8 +228,8 @@ async def get_lesson(
             "title": lesson.module.title,
             "emoji": lesson.module.emoji
         },
-        "has_quiz": lesson.quiz is not None,
-        "quiz_id": lesson.quiz.id if lesson.quiz else None,
+        "has_quiz": quiz is not None,
+        "quiz_id": quiz.id if quiz else None,
         "is_completed": progress.is_completed if progress else False,
         "quiz_score": progress.quiz_score if progress else None
     }
@@ -214,7 +242,7 @@ async def complete_lesson(
     db: AsyncSession = Depends(get_db)
 ):
     """Darsni tugatish"""
-    result = await db.execute(select(Lesson).where(Lesson.id == lesson_id))
+    result = await db.execute(select(Lesson).where(Lesson.id == lesson_id, *_alive_lesson()))
     lesson = result.scalar_one_or_none()
     
     if not lesson:
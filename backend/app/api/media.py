@@ -0,0 +1,178 @@
+"""
+Media API - ruxsat tekshirilgan fayl yuborish (audio, kitob, dars videosi, to'lov skrinshoti)
+va rasm variantlari (thumbnail/WebP, Telegram avatar proxy)
+"""
+import os
+import re
+from typing import Optional
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.models.audio import Audio
+from app.models.book import Book
+from app.models.lesson import Lesson
+from app.models.payment import Payment
+from app.models.media_blob import MediaBlob
+from app.api.deps import get_media_user, get_current_admin
+from app.core.entitlement import has_premium
+from app.services.media_serving import serve_media
+from app.services.image_variants import image_cache, snap_width, is_avatar_url, FORMATS, IMAGE_EXTENSIONS
+from app.services.media_store import IMMUTABLE_CACHE, is_public_blob, hash_from_url
+from app.services.transcode_queue import is_local_video, output_dir
+
+router = APIRouter()
+
+# kind -> (model, URL ustuni, topilmadi xabari)
+MEDIA_KINDS = {
+    "audio": (Audio, "audio_url", "Audio topilmadi"),
+    "book": (Book, "file_url", "Kitob topilmadi"),
+    "lesson": (Lesson, "video_url", "Dars topilmadi"),
+    "payment": (Payment, "screenshot_url", "To'lov topilmadi"),
+}
+
+# Media store dan oldingi to'lov skrinshotlari shu papkada
+LEGACY_PAYMENT_DIR = "uploads/payments/"
+
+# master.m3u8, 720p.m3u8, 720p_0001.ts, poster.jpg, sprite.jpg, thumbnails.vtt
+HLS_FILE_RE = re.compile(r"[A-Za-z0-9_-]+\.(m3u8|ts|jpg|vtt)")
+
+
+def _check_access(kind: str, item, user: User):
+    if user.is_admin:
+        return
+    if kind == "payment":
+        if item.user_id != user.id:
+            raise HTTPException(403, "Ruxsat yo'q")
+        return
+    if not item.is_active:
+        raise HTTPException(404, MEDIA_KINDS[kind][2])
+    if item.is_premium and not has_premium(user):
+        raise HTTPException(
+            status_code=403,
+            detail={"error": "premium_required", "message": "Bu kontent faqat Premium foydalanuvchilar uchun"}
+        )
+
+
+async def _is_payment_file(db: AsyncSession, stored_url: str) -> bool:
+    """To'lov URL i haqiqatan skrinshot: "payment" blob yoki eski uploads/payments/ fayli"""
+    sha256 = hash_from_url(stored_url)
+    if sha256:
+        blob = await db.get(MediaBlob, sha256)
+        return bool(blob and blob.kind == "payment" and stored_url.lstrip("/") == blob.path)
+    relative = os.path.normpath(stored_url.lstrip("/"))
+    return relative.startswith(LEGACY_PAYMENT_DIR)
+
+
+def _image_response(path: str, fmt: str, cache_control: str) -> FileResponse:
+    return FileResponse(path, media_type=FORMATS[fmt], headers={"Cache-Control": cache_control})
+
+
+@router.get("/img/cache-stats")
+async def image_cache_stats(admin: User = Depends(get_current_admin)):
+    """Rasm variant kesh statistikasi"""
+    return await image_cache.stats()
+
+
+@router.get("/img/{sha256}")
+async def get_image_variant(
+    sha256: str,
+    w: int = Query(256, ge=16, le=4096),
+    fmt: str = Query("webp"),
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Media store dagi rasmning kichraytirilgan varianti (/api/media/img/{hash}?w=128&fmt=webp)"""
+    if fmt not in FORMATS:
+        raise HTTPException(400, "fmt: webp yoki jpeg")
+    blob = await db.get(MediaBlob, sha256.lower())
+    if not blob or blob.ext not in IMAGE_EXTENSIONS:
+        raise HTTPException(404, "Rasm topilmadi")
+    public = await is_public_blob(db, blob)
+    if not public:
+        # To'lov skrinshotlari va e'lon qilinmagan rasmlar - faqat admin
+        user = await get_media_user(token, authorization, db)
+        if not user.is_admin:
+            raise HTTPException(403, "Admin huquqi kerak")
+
+    try:
+        path = await image_cache.variant(blob.sha256, blob.path, snap_width(w), fmt)
+    except OSError:
+        raise HTTPException(415, "Rasmni o'qib bo'lmadi")
+    cache_control = IMMUTABLE_CACHE if public else "private, max-age=3600"
+    return _image_response(path, fmt, cache_control)
+
+
+@router.get("/avatar/{user_id}")
+async def get_avatar(
+    user_id: int,
+    w: int = Query(96, ge=16, le=512),
+    fmt: str = Query("webp"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Telegram avatar - lokal keshdan (hot-link qilmaslik uchun)"""
+    if fmt not in FORMATS:
+        raise HTTPException(400, "fmt: webp yoki jpeg")
+    user = await db.get(User, user_id)
+    if not user or not is_avatar_url(user.photo_url):
+        raise HTTPException(404, "Avatar topilmadi")
+
+    try:
+        path = await image_cache.avatar_variant(user.photo_url, snap_width(w), fmt)
+    except OSError:
+        raise HTTPException(415, "Rasmni o'qib bo'lmadi")
+    except (httpx.HTTPError, ValueError):
+        raise HTTPException(502, "Avatarni yuklab bo'lmadi")
+    # URL user_id ga bog'liq, rasm o'zgarishi mumkin
+    return _image_response(path, fmt, "public, max-age=86400")
+
+
+@router.api_route("/hls/{lesson_id}/{token}/{filename}", methods=["GET", "HEAD"])
+async def get_hls_file(
+    lesson_id: int,
+    token: str,
+    filename: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """HLS playlist / segment / poster / sprite - dars ruxsati har faylda tekshiriladi"""
+    if not HLS_FILE_RE.fullmatch(filename):
+        raise HTTPException(404, "Fayl topilmadi")
+    user = await get_media_user(token, None, db)
+    lesson = await db.get(Lesson, lesson_id)
+    if not lesson or not is_local_video(lesson.video_url):
+        raise HTTPException(404, "Dars topilmadi")
+    _check_access("lesson", lesson, user)
+    return serve_media(request, os.path.join(output_dir(lesson.video_url), filename))
+
+
+@router.api_route("/{kind}/{item_id}", methods=["GET", "HEAD"])
+async def get_media(
+    kind: str,
+    item_id: int,
+    request: Request,
+    current_user: User = Depends(get_media_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Media fayl (Range, ETag, Last-Modified; nginx bo'lsa X-Accel-Redirect)"""
+    if kind not in MEDIA_KINDS:
+        raise HTTPException(404, "Topilmadi")
+    model, column, not_found = MEDIA_KINDS[kind]
+
+    item = await db.get(model, item_id)
+    if not item:
+        raise HTTPException(404, not_found)
+    _check_access(kind, item, current_user)
+
+    stored_url = getattr(item, column)
+    if not stored_url or stored_url.startswith(("http://", "https://")):
+        raise HTTPException(404, "Fayl topilmadi")
+    if kind == "payment" and not await _is_payment_file(db, stored_url):
+        # Egasi tekshiriladi, lekin URL ni klient bergan - boshqa media yo'li bo'lishi mumkin
+        raise HTTPException(404, "Fayl topilmadi")
+    return serve_media(request, stored_url)
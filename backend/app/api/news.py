@@ -11,9 +11,14 @@ from app.database import get_db
 from app.models.user import User
 from app.models.news import News
 from app.api.deps import get_current_user, get_current_admin
+from app.services.counters import CounterBuffer
+from app.services.broadcast import broadcast_sender, create_broadcast, news_broadcast_text
 
 router = APIRouter()
 
+# Ko'rishlar soni xotirada yig'iladi va scheduler orqali DB ga yoziladi
+news_views = CounterBuffer(News, "views_count")
+
 
 class NewsCreate(BaseModel):
     title: str
@@ -21,6 +26,8 @@ class NewsCreate(BaseModel):
     media_type: str = "text"
     media_url: Optional[str] = None
     is_pinned: bool = False
+    broadcast: bool = False            # bot orqali ham yuborish
+    broadcast_audience: str = "all"    # all | premium | free
 
 
 class NewsUpdate(BaseModel):
@@ -57,7 +64,7 @@ async def get_news(
             "media_type": n.media_type,
             "media_url": n.media_url,
             "is_pinned": n.is_pinned,
-            "views_count": n.views_count,
+            "views_count": n.views_count + news_views.pending(n.id),
             "created_at": n.created_at.isoformat()
         }
         for n in news
@@ -103,9 +110,8 @@ async def get_news_detail(
     if not news:
         raise HTTPException(404, "Yangilik topilmadi")
     
-    # Increment views
-    news.views_count += 1
-    await db.commit()
+    # Increment views (buffered)
+    news_views.incr(news.id)
     
     return {
         "id": news.id,
@@ -114,7 +120,7 @@ async def get_news_detail(
         "media_type": news.media_type,
         "media_url": news.media_url,
         "is_pinned": news.is_pinned,
-        "views_count": news.views_count,
+        "views_count": news.views_count + news_views.pending(news.id),
         "created_at": news.created_at.isoformat()
     }
 
@@ -135,13 +141,20 @@ async def create_news(
         is_pinned=data.is_pinned
     )
     db.add(news)
+    broadcast = None
+    if data.broadcast:
+        await db.flush()
+        broadcast = create_broadcast(db, admin, news_broadcast_text(news), data.broadcast_audience, news.id)
     await db.commit()
     await db.refresh(news)
+    if broadcast is not None:
+        broadcast_sender.notify()
     
     return {
         "id": news.id,
         "title": news.title,
-        "created_at": news.created_at.isoformat()
+        "created_at": news.created_at.isoformat(),
+        "broadcast_id": broadcast.id if broadcast is not None else None
     }
 
 
@@ -1,20 +1,28 @@
 """
 Payment API
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, case, and_, or_
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-from typing import Optional
-import os
-import uuid
+from typing import List, Optional
 
 from app.database import get_db
 from app.models.user import User
 from app.models.payment import Payment
+from app.models.media_blob import MediaBlob
 from app.api.deps import get_current_user, get_current_admin
+from app.core.security import create_media_token
+from app.core.entitlement import has_premium, premium_days_remaining
+from app.services.premium_expiry import premium_expiry
+from app.services.notifications import add_notifications, notification_dispatcher
+from app.services.revenue import record_reviews, record_premium
+from app.services.dashboard_stats import dashboard_stats
+from app.services.media_serving import media_url
+from app.services.media_store import hash_from_url
 from app.config import settings
+from app.services.uploads import save_upload
 
 router = APIRouter()
 
@@ -39,6 +47,19 @@ class PaymentReview(BaseModel):
     note: Optional[str] = None
 
 
+class BulkReviewItem(BaseModel):
+    payment_id: int
+    approved: bool
+    note: Optional[str] = None
+
+
+MAX_BULK_REVIEW = 200
+
+
+class BulkReview(BaseModel):
+    reviews: List[BulkReviewItem]
+
+
 @router.get("/plans")
 async def get_plans():
     """Premium tariflar"""
@@ -83,28 +104,12 @@ async def get_plans():
 
 @router.post("/upload-screenshot")
 async def upload_screenshot(
-    file: UploadFile = File(...),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    """Screenshot yuklash"""
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(400, "Faqat rasm yuklash mumkin")
-    
-    # Create uploads directory
-    upload_dir = "uploads/payments"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-    filename = f"{current_user.id}_{uuid.uuid4().hex}.{ext}"
-    filepath = os.path.join(upload_dir, filename)
-    
-    # Save file
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
-    
-    return {"url": filepath}
+    """Screenshot yuklash (multipart, "file" maydoni)"""
+    stored = await save_upload(request, "payment")
+    return {"url": stored.url}
 
 
 @router.post("/request")
@@ -116,6 +121,11 @@ async def create_payment_request(
     """To'lov so'rovi yaratish"""
     if data.plan_type not in PLAN_PRICES:
         raise HTTPException(400, "Noto'g'ri tarif turi")
+
+    # Faqat /upload-screenshot orqali yuklangan fayl (boshqa media yo'li - premium kontent)
+    blob = await db.get(MediaBlob, hash_from_url(data.screenshot_url) or "")
+    if not blob or blob.kind != "payment":
+        raise HTTPException(400, "Screenshot avval yuklanishi kerak")
     
     # Check pending payments
     result = await db.execute(
@@ -134,12 +144,13 @@ async def create_payment_request(
         user_id=current_user.id,
         amount=PLAN_PRICES[data.plan_type],
         plan_type=data.plan_type,
-        screenshot_url=data.screenshot_url,
+        screenshot_url=blob.path,
         status="pending"
     )
     db.add(payment)
     await db.commit()
     await db.refresh(payment)
+    dashboard_stats.bump(payments_pending=1)
     
     return {
         "payment_id": payment.id,
@@ -154,15 +165,8 @@ async def get_payment_status(
     db: AsyncSession = Depends(get_db)
 ):
     """Premium status"""
-    # Check if premium expired
-    if current_user.is_premium and current_user.premium_until:
-        if current_user.premium_until < datetime.utcnow():
-            current_user.is_premium = False
-            await db.commit()
-    
-    days_remaining = 0
-    if current_user.is_premium and current_user.premium_until:
-        days_remaining = (current_user.premium_until - datetime.utcnow()).days
+    # Muddat premium_until dan hisoblanadi - GET hech narsa yozmaydi
+    days_remaining = premium_days_remaining(current_user)
     
     # Get latest payment
     result = await db.execute(
@@ -174,7 +178,7 @@ async def get_payment_status(
     latest_payment = result.scalar_one_or_none()
     
     return {
-        "is_premium": current_user.is_premium,
+        "is_premium": has_premium(current_user),
         "premium_until": current_user.premium_until.isoformat() if current_user.premium_until else None,
         "days_remaining": max(0, days_remaining),
         "expiring_soon": 0 < days_remaining <= 3,
@@ -188,39 +192,183 @@ async def get_payment_status(
 
 
 # Admin endpoints
+async def _apply_reviews(db: AsyncSession, admin: User, reviews: List[BulkReviewItem]) -> List[dict]:
+    """
+    Bir tranzaksiyada: payment statuslari, premium - har tarif uchun bitta
+    set-based UPDATE, revenue aggregatlari va foydalanuvchilarga bot xabarlari
+    (notification outbox)
+
+    To'lovlar avval UPDATE ... WHERE status='pending' RETURNING id bilan
+    "egallanadi" - parallel bitta/bulk review bir to'lovni ikki marta
+    ko'rib chiqmaydi, faqat qaytgan id lar ishlanadi
+    """
+    decisions = {r.payment_id: r for r in reviews}
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(Payment)
+        .where(Payment.id.in_(decisions.keys()), Payment.status == "pending")
+        .values(
+            status=case(
+                {pid: "approved" if d.approved else "rejected" for pid, d in decisions.items()},
+                value=Payment.id
+            ),
+            admin_note=case({pid: d.note for pid, d in decisions.items()}, value=Payment.id),
+            reviewed_by=admin.id,
+            reviewed_at=now,
+        )
+        .returning(Payment.id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = result.scalars().all()
+    if not claimed:
+        return []
+
+    result = await db.execute(
+        select(
+            Payment.id, Payment.user_id, Payment.plan_type, Payment.amount,
+            User.is_premium, User.premium_until
+        )
+        .outerjoin(User, User.id == Payment.user_id)
+        .where(Payment.id.in_(claimed))
+    )
+    rows = result.all()
+
+    # Tarif bo'yicha guruhlab - qisqasidan uzuniga, bitta userda ikkita to'lov bo'lsa uzuni qoladi
+    grants = {}
+    for row in rows:
+        if decisions[row.id].approved:
+            grants.setdefault(row.plan_type, set()).add(row.user_id)
+    premium_until = {}
+    for plan_type in sorted(grants, key=lambda p: PLAN_DURATIONS[p]):
+        until = now + timedelta(days=PLAN_DURATIONS[plan_type])
+        await db.execute(
+            update(User)
+            .where(User.id.in_(grants[plan_type]))
+            .values(is_premium=True, premium_until=until)
+            .execution_options(synchronize_session=False)
+        )
+        for user_id in grants[plan_type]:
+            premium_until[user_id] = until
+
+    # Revenue aggregatlari - shu tranzaksiyada
+    await record_reviews(db, [
+        (row.plan_type, "approved" if decisions[row.id].approved else "rejected", row.amount)
+        for row in rows
+    ], now)
+    was_active = {row.user_id for row in rows if row.user_id in premium_until and has_premium(row, now)}
+    await record_premium(db, activated=len(premium_until) - len(was_active), renewed=len(was_active), when=now)
+
+    reviewed = []
+    notifications = []
+    for row in rows:
+        decision = decisions[row.id]
+        status = "approved" if decision.approved else "rejected"
+        reviewed.append({"payment_id": row.id, "status": status})
+        if row.user_id:
+            until = premium_until.get(row.user_id)
+            notifications.append((row.user_id, "payment_reviewed", {
+                "payment_id": row.id,
+                "status": status,
+                "plan_type": row.plan_type,
+                "premium_until": until.isoformat() if until else None,
+                "note": decision.note,
+            }))
+    await add_notifications(db, notifications)
+
+    await db.commit()
+    notification_dispatcher.notify()
+
+    for user_id, until in premium_until.items():
+        premium_expiry.schedule(user_id, until)
+    newly_flagged = {row.user_id for row in rows if row.user_id in premium_until and not row.is_premium}
+    dashboard_stats.bump(
+        payments_pending=-len(rows),
+        revenue=sum(row.amount for row in rows if decisions[row.id].approved),
+        users_premium=len(newly_flagged)
+    )
+    return reviewed
+
+
 @router.get("/admin/pending")
 async def get_pending_payments(
+    cursor: Optional[str] = None,
+    limit: int = 50,
     admin: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Kutilayotgan to'lovlar"""
-    result = await db.execute(
-        select(Payment)
+    """
+    Kutilayotgan to'lovlar (yangidan eskiga, keyset pagination)
+    cursor - oldingi javobdagi next_cursor
+    """
+    limit = max(1, min(limit, 200))
+    query = (
+        select(
+            Payment.id, Payment.amount, Payment.plan_type, Payment.screenshot_url, Payment.created_at,
+            User.id.label("user_id"), User.username, User.full_name
+        )
+        .outerjoin(User, User.id == Payment.user_id)
         .where(Payment.status == "pending")
-        .order_by(Payment.created_at.desc())
+        .order_by(Payment.created_at.desc(), Payment.id.desc())
+        .limit(limit + 1)
     )
-    payments = result.scalars().all()
-    
-    payments_data = []
-    for p in payments:
-        # Get user
-        user_result = await db.execute(select(User).where(User.id == p.user_id))
-        user = user_result.scalar_one_or_none()
-        
-        payments_data.append({
-            "id": p.id,
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "full_name": user.full_name
-            } if user else None,
-            "amount": p.amount,
-            "plan_type": p.plan_type,
-            "screenshot_url": p.screenshot_url,
-            "created_at": p.created_at.isoformat()
-        })
-    
-    return payments_data
+    if cursor:
+        try:
+            created_at, payment_id = cursor.rsplit("_", 1)
+            created_at, payment_id = datetime.fromisoformat(created_at), int(payment_id)
+        except ValueError:
+            raise HTTPException(400, "Noto'g'ri cursor")
+        query = query.where(or_(
+            Payment.created_at < created_at,
+            and_(Payment.created_at == created_at, Payment.id < payment_id)
+        ))
+
+    result = await db.execute(query)
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    token = create_media_token(admin.id)
+    return {
+        "items": [
+            {
+                "id": p.id,
+                "user": {
+                    "id": p.user_id,
+                    "username": p.username,
+                    "full_name": p.full_name
+                } if p.user_id is not None else None,
+                "amount": p.amount,
+                "plan_type": p.plan_type,
+                "screenshot_url": media_url("payment", p.id, p.screenshot_url, token),
+                "created_at": p.created_at.isoformat()
+            }
+            for p in rows
+        ],
+        "next_cursor": f"{rows[-1].created_at.isoformat()}_{rows[-1].id}" if has_more else None
+    }
+
+
+@router.post("/admin/review-bulk")
+async def review_payments_bulk(
+    data: BulkReview,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bir nechta to'lovni bitta tranzaksiyada ko'rib chiqish"""
+    if not data.reviews:
+        raise HTTPException(400, "Bo'sh ro'yxat")
+    if len(data.reviews) > MAX_BULK_REVIEW:
+        raise HTTPException(400, f"Bir so'rovda ko'pi bilan {MAX_BULK_REVIEW} ta to'lov")
+
+    reviewed = await _apply_reviews(db, admin, data.reviews)
+    reviewed_ids = {r["payment_id"] for r in reviewed}
+    return {
+        "success": True,
+        "reviewed": reviewed,
+        "skipped": [r.payment_id for r in data.reviews if r.payment_id not in reviewed_ids],
+        "approved": sum(1 for r in reviewed if r["status"] == "approved"),
+        "rejected": sum(1 for r in reviewed if r["status"] == "rejected")
+    }
 
 
 @router.post("/admin/{payment_id}/review")
@@ -231,8 +379,7 @@ async def review_payment(
     db: AsyncSession = Depends(get_db)
 ):
     """To'lovni ko'rib chiqish"""
-    result = await db.execute(select(Payment).where(Payment.id == payment_id))
-    payment = result.scalar_one_or_none()
+    payment = await db.get(Payment, payment_id)
     
     if not payment:
         raise HTTPException(404, "To'lov topilmadi")
@@ -240,25 +387,14 @@ async def review_payment(
     if payment.status != "pending":
         raise HTTPException(400, "To'lov allaqachon ko'rib chiqilgan")
     
-    payment.status = "approved" if data.approved else "rejected"
-    payment.reviewed_by = admin.id
-    payment.reviewed_at = datetime.utcnow()
-    payment.admin_note = data.note
-    
-    if data.approved:
-        # Grant premium
-        user_result = await db.execute(select(User).where(User.id == payment.user_id))
-        user = user_result.scalar_one_or_none()
-        
-        if user:
-            duration_days = PLAN_DURATIONS[payment.plan_type]
-            user.is_premium = True
-            user.premium_until = datetime.utcnow() + timedelta(days=duration_days)
-    
-    await db.commit()
+    reviewed = await _apply_reviews(
+        db, admin, [BulkReviewItem(payment_id=payment_id, approved=data.approved, note=data.note)]
+    )
+    if not reviewed:
+        raise HTTPException(400, "To'lov allaqachon ko'rib chiqilgan")
     
     return {
         "success": True,
-        "status": payment.status,
+        "status": reviewed[0]["status"],
         "message": "To'lov tasdiqlandi" if data.approved else "To'lov rad etildi"
     }
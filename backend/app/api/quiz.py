@@ -42,7 +42,7 @@ async def get_quiz(
     result = await db.execute(
         select(Quiz)
         .options(selectinload(Quiz.questions), selectinload(Quiz.lesson))
-        .where(Quiz.id == quiz_id)
+        .where(Quiz.id == quiz_id, Quiz.is_active != False)
     )
     quiz = result.scalar_one_or_none()
 
@@ -82,7 +82,7 @@ async def submit_quiz(
     result = await db.execute(
         select(Quiz)
         .options(selectinload(Quiz.questions), selectinload(Quiz.lesson))
-        .where(Quiz.id == quiz_id)
+        .where(Quiz.id == quiz_id, Quiz.is_active != False)
     )
     quiz = result.scalar_one_or_none()
     
@@ -0,0 +1,97 @@
+"""
+Admin reports API - daromad, obunalar va engagement analytics
+"""
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.api.deps import get_current_admin
+from app.services.revenue import revenue_report, iter_payments_csv, month_key, month_start, next_month
+from app.tasks.analytics_tasks import run_analytics, get_analytics_results, is_running
+
+router = APIRouter()
+
+MAX_MONTHS = 120
+
+
+def _month_range(start: Optional[str], end: Optional[str]) -> Tuple[str, str]:
+    """Default - oxirgi 12 oy"""
+    try:
+        end_dt = month_start(end or month_key())
+        start_dt = month_start(start) if start else end_dt.replace(year=end_dt.year - 1)
+    except ValueError:
+        raise HTTPException(400, "Oy formati: YYYY-MM")
+    if not start:
+        start_dt = month_start(next_month(month_key(start_dt)))
+    if start_dt > end_dt:
+        raise HTTPException(400, "start end dan katta")
+    if (end_dt.year - start_dt.year) * 12 + end_dt.month - start_dt.month >= MAX_MONTHS:
+        raise HTTPException(400, f"Ko'pi bilan {MAX_MONTHS} oy")
+    return month_key(start_dt), month_key(end_dt)
+
+
+@router.get("/revenue")
+async def get_revenue_report(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Oylik daromad (tarif bo'yicha), tasdiqlash/rad etish, premium oqimi va churn
+    start/end - YYYY-MM (ikkalasi ham kiradi)
+    """
+    start, end = _month_range(start, end)
+    return await revenue_report(db, start, end)
+
+
+@router.get("/revenue/export.csv")
+async def export_revenue_csv(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    admin: User = Depends(get_current_admin)
+):
+    """Ko'rib chiqilgan to'lovlar CSV (stream)"""
+    start, end = _month_range(start, end)
+    return StreamingResponse(
+        iter_payments_csv(month_start(start), month_start(next_month(end))),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="payments_{start}_{end}.csv"'}
+    )
+
+
+# Engagement analytics (tungi snapshotlardan oldindan hisoblangan)
+ANALYTICS_SECTIONS = ("engagement", "retention", "funnels", "quizzes")
+
+
+@router.get("/analytics/{section}")
+async def get_analytics(
+    section: str,
+    admin: User = Depends(get_current_admin)
+):
+    """
+    engagement - DAU/WAU/MAU (oxirgi 90 kun), retention - haftalik kohortlar,
+    funnels - modul bo'yicha darslar, quizzes - o'tish foizi
+    """
+    if section not in ANALYTICS_SECTIONS:
+        raise HTTPException(404, "Bo'lim topilmadi")
+    results = get_analytics_results()
+    if results is None:
+        raise HTTPException(404, "Analytics hali hisoblanmagan")
+    return {"generated_at": results["generated_at"], "items": results[section]}
+
+
+@router.post("/analytics/run")
+async def run_analytics_now(
+    background_tasks: BackgroundTasks,
+    admin: User = Depends(get_current_admin)
+):
+    """Eksport va hisoblashni hozir ishga tushirish"""
+    if is_running():
+        return {"success": False, "message": "Analytics allaqachon ishlayapti"}
+    background_tasks.add_task(run_analytics)
+    return {"success": True, "message": "Analytics ishga tushirildi"}
@@ -10,6 +10,8 @@ from app.models.lesson import Lesson
 from app.models.module import Module
 from app.models.news import News
 from app.api.deps import get_current_user
+from app.core.entitlement import has_premium
+from app.services.image_variants import avatar_url
 
 router = APIRouter()
 
@@ -104,10 +106,10 @@ async def search(
                 "id": u.id,
                 "username": u.username,
                 "full_name": u.full_name,
-                "photo_url": u.photo_url,
+                "photo_url": avatar_url(u.id, u.photo_url),
                 "total_xp": u.total_xp,
                 "level": u.level,
-                "is_premium": u.is_premium,
+                "is_premium": has_premium(u),
             }
             for u in users
         ],
@@ -0,0 +1,236 @@
+"""
+Resumable Uploads API (tus 1.0 core protocol)
+
+POST   /api/uploads          Upload-Length + Upload-Metadata (filename, kind) -> 201 Location
+HEAD   /api/uploads/{id}     -> Upload-Offset, Upload-Length
+PATCH  /api/uploads/{id}     Upload-Offset + application/offset+octet-stream body -> 204
+GET    /api/uploads/{id}     -> JSON holat (tugagach "url")
+DELETE /api/uploads/{id}     -> bekor qilish
+"""
+import base64
+import os
+import uuid
+from datetime import datetime
+from typing import Set
+
+import aiofiles
+import aiofiles.os
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.models.upload_session import UploadSession
+from app.api.deps import get_current_admin
+from app.services.transcode_queue import transcode_queue
+from app.services.uploads import UPLOAD_POLICIES, MB, TMP_DIR, check_type, finalize_file
+
+router = APIRouter()
+
+TUS_VERSION = "1.0.0"
+RESUMABLE_KINDS = {"video", "audio", "book"}
+
+# Bitta sessiyaga bir vaqtda faqat bitta PATCH
+_active: Set[str] = set()
+
+
+def _tus_headers(**extra) -> dict:
+    headers = {"Tus-Resumable": TUS_VERSION, "Cache-Control": "no-store"}
+    headers.update({k.replace("_", "-"): str(v) for k, v in extra.items()})
+    return headers
+
+
+def _parse_metadata(header: str) -> dict:
+    """Upload-Metadata: key base64,key2 base64"""
+    result = {}
+    for pair in filter(None, (p.strip() for p in header.split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            result[key] = base64.b64decode(value).decode("utf-8") if value else ""
+        except ValueError:
+            raise HTTPException(400, "Upload-Metadata noto'g'ri")
+    return result
+
+
+async def _get_session(db: AsyncSession, upload_id: str, admin: User) -> UploadSession:
+    session = await db.get(UploadSession, upload_id)
+    if not session or session.created_by != admin.id:
+        raise HTTPException(404, "Upload topilmadi")
+    if session.status == "expired":
+        raise HTTPException(410, "Upload muddati tugagan")
+    return session
+
+
+@router.options("")
+async def tus_options():
+    return Response(status_code=204, headers=_tus_headers(
+        Tus_Version=TUS_VERSION,
+        Tus_Extension="creation,termination",
+        Tus_Max_Size=max(p.max_bytes for k, p in UPLOAD_POLICIES.items() if k in RESUMABLE_KINDS)
+    ))
+
+
+@router.post("", status_code=201)
+async def create_upload(
+    request: Request,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Yangi resumable upload yaratish"""
+    try:
+        total_size = int(request.headers.get("upload-length", ""))
+    except ValueError:
+        raise HTTPException(400, "Upload-Length kerak")
+    if total_size <= 0:
+        raise HTTPException(400, "Fayl bo'sh")
+
+    metadata = _parse_metadata(request.headers.get("upload-metadata", ""))
+    kind = metadata.get("kind", "video")
+    if kind not in RESUMABLE_KINDS:
+        raise HTTPException(400, "Noto'g'ri fayl turi")
+    filename = metadata.get("filename")
+    # tus-js-client "filetype" yuboradi; bo'lmasa octet-stream sifatida
+    ext = check_type(filename, metadata.get("filetype", ""), kind)
+
+    policy = UPLOAD_POLICIES[kind]
+    if total_size > policy.max_bytes:
+        raise HTTPException(413, f"Fayl juda katta (maksimal {policy.max_bytes // MB} MB)")
+
+    upload_id = uuid.uuid4().hex
+    os.makedirs(TMP_DIR, exist_ok=True)
+    temp_path = os.path.join(TMP_DIR, f"{upload_id}.part")
+    # Sparse fayl - diskda faqat yozilgan qismlar joy egallaydi
+    async with aiofiles.open(temp_path, "wb") as f:
+        await f.truncate(total_size)
+
+    db.add(UploadSession(
+        id=upload_id,
+        created_by=admin.id,
+        kind=kind,
+        filename=filename,
+        ext=ext,
+        total_size=total_size,
+        offset=0,
+        temp_path=temp_path
+    ))
+    await db.commit()
+
+    return Response(status_code=201, headers=_tus_headers(
+        Location=f"{request.url.path.rstrip('/')}/{upload_id}",
+        Upload_Offset=0
+    ))
+
+
+@router.head("/{upload_id}")
+async def upload_status_head(
+    upload_id: str,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload holati (qayerdan davom ettirish)"""
+    session = await _get_session(db, upload_id, admin)
+    return Response(status_code=200, headers=_tus_headers(
+        Upload_Offset=session.offset,
+        Upload_Length=session.total_size
+    ))
+
+
+@router.patch("/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Chunk yozish (Upload-Offset dan boshlab)"""
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(415, "Content-Type: application/offset+octet-stream kerak")
+    try:
+        offset = int(request.headers.get("upload-offset", ""))
+    except ValueError:
+        raise HTTPException(400, "Upload-Offset kerak")
+
+    session = await _get_session(db, upload_id, admin)
+    if session.status == "completed":
+        raise HTTPException(409, "Upload allaqachon tugagan")
+    if session.status == "rejected":
+        raise HTTPException(409, "Fayl tarkibi tekshiruvdan o'tmadi")
+    if offset != session.offset:
+        raise HTTPException(409, f"Offset mos emas (server: {session.offset})")
+    if upload_id in _active:
+        raise HTTPException(423, "Bu upload hozir yozilmoqda")
+
+    _active.add(upload_id)
+    written = offset
+    try:
+        async with aiofiles.open(session.temp_path, "r+b") as f:
+            await f.seek(offset)
+            async for chunk in request.stream():
+                if not chunk:
+                    continue
+                if written + len(chunk) > session.total_size:
+                    raise HTTPException(413, "Upload-Length dan oshib ketdi")
+                await f.write(chunk)
+                written += len(chunk)
+    finally:
+        # Uzilgan so'rovda ham qabul qilingan baytlar saqlanadi
+        _active.discard(upload_id)
+        session.offset = written
+        session.updated_at = datetime.utcnow()
+        await db.commit()
+
+    if written == session.total_size:
+        try:
+            stored = await finalize_file(session.temp_path, session.kind, session.ext)
+        except HTTPException:
+            session.status = "rejected"
+            await db.commit()
+            raise
+        session.status = "completed"
+        session.url = stored.url
+        session.sha256 = stored.sha256
+        await db.commit()
+        if session.kind == "video":
+            transcode_queue.enqueue(stored.url)
+
+    return Response(status_code=204, headers=_tus_headers(Upload_Offset=written))
+
+
+@router.get("/{upload_id}")
+async def get_upload(
+    upload_id: str,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload holati JSON (tugagach fayl URL)"""
+    session = await _get_session(db, upload_id, admin)
+    return {
+        "id": session.id,
+        "kind": session.kind,
+        "filename": session.filename,
+        "offset": session.offset,
+        "total_size": session.total_size,
+        "status": session.status,
+        "url": session.url,
+        "sha256": session.sha256
+    }
+
+
+@router.delete("/{upload_id}")
+async def delete_upload(
+    upload_id: str,
+    admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Uploadni bekor qilish"""
+    session = await _get_session(db, upload_id, admin)
+    if upload_id in _active:
+        raise HTTPException(423, "Bu upload hozir yozilmoqda")
+    if session.status == "active":
+        try:
+            await aiofiles.os.remove(session.temp_path)
+        except OSError:
+            pass
+    await db.delete(session)
+    await db.commit()
+    return Response(status_code=204, headers=_tus_headers())
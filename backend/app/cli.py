@@ -0,0 +1,75 @@
+"""
+Admin CLI
+
+    python -m app.cli course-import course.jsonl [--mode insert] [--dry-run]
+    python -m app.cli course-export 3 course_3.zip
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from app.database import async_session, engine
+from app.services.course_package import (
+    PackageError, iter_package_lines, parse_package, import_package, iter_course_jsonl, iter_course_zip
+)
+
+
+async def course_import(path: str, mode: str, dry_run: bool) -> int:
+    try:
+        with open(path, "rb") as f:
+            package = parse_package(iter_package_lines(f))
+    except PackageError as e:
+        for error in e.errors:
+            print(f"❌ {error}", file=sys.stderr)
+        return 1
+
+    if dry_run:
+        print(json.dumps({"dry_run": True, "total": package.counts()}, ensure_ascii=False))
+        return 0
+    async with async_session() as db:
+        result = await import_package(db, package, mode)
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+async def course_export(module_ids: list, path: str) -> int:
+    if path.endswith(".zip"):
+        with open(path, "wb") as f:
+            async for chunk in iter_course_zip(module_ids):
+                f.write(chunk)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            async for text in iter_course_jsonl(module_ids):
+                f.write(text)
+    print(f"✅ {path}")
+    return 0
+
+
+async def run(args) -> int:
+    try:
+        if args.command == "course-import":
+            return await course_import(args.file, args.mode, args.dry_run)
+        return await course_export(args.module_ids, args.out)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("course-import", help="JSONL/ZIP kurs paketini import qilish")
+    importer.add_argument("file")
+    importer.add_argument("--mode", choices=("upsert", "insert"), default="upsert")
+    importer.add_argument("--dry-run", action="store_true", help="faqat tekshirish")
+
+    exporter = commands.add_parser("course-export", help="Modul(lar)ni JSONL/ZIP ga eksport qilish")
+    exporter.add_argument("module_ids", nargs="+", type=int)
+    exporter.add_argument("out", help=".jsonl yoki .zip")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
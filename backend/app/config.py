@@ -15,14 +15,56 @@ class Settings(BaseSettings):
     # Telegram
     BOT_TOKEN: str = ""
     WEBAPP_URL: str = ""
+    BOT_GLOBAL_RATE_PER_SEC: float = 25.0   # Telegram: ~30 xabar/sek
+    BOT_CHAT_RATE_PER_SEC: float = 1.0      # Telegram: ~1 xabar/sek bitta chatga
+    BROADCAST_CONCURRENCY: int = 10         # bir vaqtda ochiq sendMessage so'rovlari
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
     
+    # Buffered counters (news views va h.k.)
+    COUNTER_FLUSH_INTERVAL_SEC: int = 10
+    
+    # Upload limits (MB)
+    UPLOAD_MAX_VIDEO_MB: int = 500
+    UPLOAD_MAX_AUDIO_MB: int = 200
+    UPLOAD_MAX_BOOK_MB: int = 100
+    UPLOAD_MAX_IMAGE_MB: int = 10
+    UPLOAD_SESSION_TTL_HOURS: int = 24       # tugallanmagan resumable upload
+    UPLOAD_TMP_DIR: str = "data/upload_tmp"  # yozilayotgan fayllar - /uploads dan tashqarida
+    MEDIA_GC_GRACE_HOURS: int = 24           # biriktirilmagan yangi blob lar saqlanadi
+    MEDIA_TOKEN_EXPIRE_MINUTES: int = 360    # /api/media URL token
+    TRANSCODE_WORKERS: int = 1               # parallel ffmpeg jarayonlar (HLS)
+    MEDIA_METADATA_WORKERS: int = 2          # audio/PDF metadata o'qish
+    IMAGE_CACHE_DIR: str = "data/img_cache"  # thumbnail/WebP variantlar, avatarlar
+    IMAGE_CACHE_MAX_MB: int = 512
+    IMAGE_WORKERS: int = 2
+    MEDIA_ACCEL_PREFIX: str = ""             # masalan "/protected/" - nginx X-Accel-Redirect, bo'sh = Python
+
+    # Analytics (tungi Parquet eksport)
+    ANALYTICS_DIR: str = "data/analytics"
+    ANALYTICS_SNAPSHOT_KEEP: int = 7         # o'zgaruvchan jadvallar snapshotlari
+    
     # AI
     ANTHROPIC_API_KEY: str = ""
+    ANTHROPIC_BASE_URL: str = "https://api.anthropic.com"
+    AI_MODEL: str = "claude-haiku-4-5-20251001"
+    AI_MAX_CONNECTIONS: int = 20
+    AI_MAX_CONCURRENCY: int = 8
+    AI_MAX_RETRIES: int = 3
+    AI_TIMEOUT_SEC: float = 30.0
+    AI_CACHE_MAX_ENTRIES: int = 1000         # xotiradagi LRU
+    AI_CACHE_DB_MAX_ENTRIES: int = 50000     # SQLite jadval
+    AI_CACHE_TTL_SEC: int = 7 * 24 * 3600
+    AI_CONTEXT_TOKEN_BUDGET: int = 3000      # chat tarixi + xulosa uchun
+    AI_SUMMARY_MIN_MESSAGES: int = 6         # shuncha xabar oynadan chiqqanda xulosa yangilanadi
+    AI_SUMMARY_BATCH: int = 40
+    AI_QUIZ_JOB_WORKERS: int = 3             # parallel quiz generatsiyalar
+    AI_DAILY_REQUEST_QUOTA: int = 100        # 0 = cheksiz
+    AI_DAILY_TOKEN_QUOTA: int = 200000       # input + output, 0 = cheksiz
+    AI_EXPLANATION_CONCURRENCY: int = 3      # izoh yaratishda parallel so'rovlar
 
     # Admin
     ADMIN_IDS: str = ""
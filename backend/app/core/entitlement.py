@@ -0,0 +1,28 @@
+"""
+Premium entitlement - pure logic
+
+Entitlement is derived from ``premium_until`` at read time, so a request that
+arrives after the expiry instant is already treated as free even before the
+``is_premium`` flag is flipped in the database. Nothing here writes.
+"""
+from datetime import datetime
+from typing import Optional
+
+
+def has_premium(user, now: Optional[datetime] = None) -> bool:
+    """
+    is_premium + premium_until > now
+    premium_until bo'lmasa - muddatsiz premium
+    """
+    if not user.is_premium:
+        return False
+    if user.premium_until is None:
+        return True
+    return user.premium_until > (now or datetime.utcnow())
+
+
+def premium_days_remaining(user, now: Optional[datetime] = None) -> int:
+    now = now or datetime.utcnow()
+    if not has_premium(user, now) or user.premium_until is None:
+        return 0
+    return max(0, (user.premium_until - now).days)
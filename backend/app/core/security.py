@@ -46,7 +46,7 @@ def verify_telegram_webapp(init_data: str) -> Optional[dict]:
         return None
 
 
-def create_token(user_id: int, expires_delta: timedelta = None) -> str:
+def create_token(user_id: int, expires_delta: timedelta = None, scope: Optional[str] = None) -> str:
     """JWT token yaratish"""
     if expires_delta is None:
         expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -57,18 +57,31 @@ def create_token(user_id: int, expires_delta: timedelta = None) -> str:
         "sub": str(user_id),
         "exp": expire
     }
+    if scope:
+        payload["scope"] = scope
     
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return token
 
 
-def verify_token(token: str) -> Optional[int]:
-    """JWT tokenni tekshirish"""
+def verify_token(token: str, scope: Optional[str] = None) -> Optional[int]:
+    """JWT tokenni tekshirish (scope mos kelmasa - yaroqsiz)"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if payload.get("scope") != scope:
+            return None
         user_id = int(payload.get("sub"))
         return user_id
     except jwt.ExpiredSignatureError:
         return None
-    except jwt.JWTError:
+    except jwt.PyJWTError:
         return None
+
+
+def create_media_token(user_id: int) -> str:
+    """Qisqa muddatli token - faqat /api/media uchun (URL ichida yuradi)"""
+    return create_token(
+        user_id,
+        timedelta(minutes=settings.MEDIA_TOKEN_EXPIRE_MINUTES),
+        scope="media"
+    )
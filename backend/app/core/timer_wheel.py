@@ -0,0 +1,94 @@
+"""
+Hierarchical timer wheel
+
+Timers are bucketed by deadline into levels of increasing resolution
+(seconds, minutes, hours, days). Scheduling and cancelling are O(1): the
+level is picked from the distance to the deadline and the slot from the
+deadline itself. When a coarser slot comes due its timers cascade down into
+finer levels; the finest level fires. Deadlines beyond the top level are
+parked in its last slot and re-placed when they cascade.
+"""
+import math
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+
+class TimerWheel:
+    def __init__(self, origin: float, tick_sec: float = 1.0, slots: Sequence[int] = (60, 60, 24, 32)):
+        """
+        origin: boshlang'ich vaqt (unix timestamp)
+        slots: har daraja slotlari soni - default 1s/1m/1h/1d
+        """
+        self.origin = origin
+        self.tick_sec = tick_sec
+        self.slots = tuple(slots)
+        # Daraja rezolyutsiyasi tick larda: 1, 60, 3600, 86400
+        self._resolutions: List[int] = []
+        resolution = 1
+        for n in self.slots:
+            self._resolutions.append(resolution)
+            resolution *= n
+        self._levels: List[List[Dict[Hashable, int]]] = [[{} for _ in range(n)] for n in self.slots]
+        self._index: Dict[Hashable, Tuple[int, int]] = {}  # key -> (level, slot)
+        self._tick = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def _to_tick(self, timestamp: float) -> int:
+        return math.ceil((timestamp - self.origin) / self.tick_sec)
+
+    def _place(self, key: Hashable, deadline: int):
+        """deadline >= self._tick bo'lishi kerak"""
+        for level, (n, res) in enumerate(zip(self.slots, self._resolutions)):
+            if deadline // res - self._tick // res < n:
+                slot = (deadline // res) % n
+                break
+        else:
+            # Eng yuqori darajadan ham uzoq - oxirgi slotga, cascade da qayta joylanadi
+            level = len(self.slots) - 1
+            slot = (self._tick // self._resolutions[level] - 1) % self.slots[level]
+        self._levels[level][slot][key] = deadline
+        self._index[key] = (level, slot)
+
+    def schedule(self, key: Hashable, timestamp: float):
+        """O(1) - mavjud bo'lsa qayta rejalashtiriladi"""
+        self.cancel(key)
+        deadline = max(self._to_tick(timestamp), self._tick + 1)
+        self._place(key, deadline)
+
+    def cancel(self, key: Hashable) -> bool:
+        position = self._index.pop(key, None)
+        if position is None:
+            return False
+        level, slot = position
+        self._levels[level][slot].pop(key, None)
+        return True
+
+    def advance(self, now: float) -> List[Hashable]:
+        """now gacha bo'lgan tick larni o'tkazib, muddati kelgan kalitlar"""
+        target = math.floor((now - self.origin) / self.tick_sec)
+        due: List[Hashable] = []
+        while self._tick < target:
+            self._tick += 1
+            # Yuqori darajalardan pastga cascade
+            for level in range(len(self.slots) - 1, 0, -1):
+                res = self._resolutions[level]
+                if self._tick % res:
+                    continue
+                bucket = self._levels[level][(self._tick // res) % self.slots[level]]
+                if not bucket:
+                    continue
+                entries = list(bucket.items())
+                bucket.clear()
+                for key, deadline in entries:
+                    self._place(key, max(deadline, self._tick))
+            bucket = self._levels[0][self._tick % self.slots[0]]
+            if bucket:
+                for key in list(bucket):
+                    self._index.pop(key, None)
+                    due.append(key)
+                bucket.clear()
+        return due
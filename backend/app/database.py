@@ -1,6 +1,7 @@
 """
 Database configuration
 """
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.config import settings
@@ -11,6 +12,15 @@ engine = create_async_engine(
     future=True
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_foreign_keys(dbapi_connection, connection_record):
+        """SQLite da FK (ON DELETE CASCADE) har bir ulanish uchun alohida yoqiladi"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 async_session = async_sessionmaker(
     engine,
     class_=AsyncSession,
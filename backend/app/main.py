@@ -4,15 +4,35 @@ Backend API
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import text
+from sqlalchemy import text, MetaData
+from sqlalchemy.schema import CreateTable, CreateIndex
 
 from app.database import engine, Base
-from app.api import auth, lessons, quiz, gamification, payment, news, admin, leaderboard, friends, bookmarks, certificates, search, challenges, ai_chat, audio, books, battle
+from app.api import auth, lessons, quiz, gamification, payment, news, admin, leaderboard, friends, bookmarks, certificates, search, challenges, ai_chat, audio, books, battle, uploads, media, reports, broadcasts
 from app.tasks.premium_tasks import check_premium_expiry
+from app.tasks.explanation_tasks import fill_missing_explanations
+from app.tasks.upload_tasks import cleanup_upload_sessions
+from app.tasks.media_tasks import collect_media_garbage
+from app.tasks.purge_tasks import purge_deleted_content
+from app.tasks.analytics_tasks import run_analytics
+from app.services.counters import flush_all_counters
+from app.services.ai_client import ai_client
+from app.services.explain_cache import prune_explain_cache
+from app.services.quiz_jobs import quiz_job_queue
+from app.services.transcode_queue import transcode_queue
+from app.services.premium_expiry import premium_expiry
+from app.services.bot_notify import bot_notifier
+from app.services.broadcast import broadcast_sender
+from app.services.notifications import notification_dispatcher, prune_notifications
+from app.services.revenue import backfill_revenue_aggregates
+from app.services.dashboard_stats import dashboard_stats
+from app.services.ai_usage import flush_ai_usage
+from app.services.media_store import UploadStaticFiles
+from app.services.media_metadata import shutdown_metadata_pool
+from app.services.image_variants import image_cache
 from app.config import settings
 
 scheduler = AsyncIOScheduler()
@@ -50,6 +70,8 @@ async def run_migrations(conn):
     await add_col("lessons", "is_active",    "BOOLEAN",  1)
     await add_col("lessons", "duration_min", "INTEGER",  10)
     await add_col("lessons", "content",      "TEXT")
+    await add_col("lessons", "transcode_status", "VARCHAR(20)")
+    await add_col("lessons", "transcode_error",  "TEXT")
 
     # news
     await add_col("news", "media_type",  "VARCHAR(20)", "'text'")
@@ -68,16 +90,118 @@ async def run_migrations(conn):
     await add_col("questions", "order_index",   "INTEGER", 0)
     await add_col("questions", "question_type", "VARCHAR(30)", "'multiple_choice'")
 
+    # media_blobs
+    await add_col("media_blobs", "meta", "JSON")
+
+    # soft delete
+    await add_col("modules", "deleted_at", "DATETIME")
+    await add_col("lessons", "deleted_at", "DATETIME")
+    await add_col("quizzes", "is_active",  "BOOLEAN", 1)
+    await add_col("quizzes", "deleted_at", "DATETIME")
+
+    await sync_foreign_keys(conn)
+
+    # indexes
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ai_chat_history_conversation "
+        "ON ai_chat_history (user_id, lesson_id, created_at)"
+    ))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_payments_status_created "
+        "ON payments (status, created_at)"
+    ))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_xp_history_created_at ON xp_history (created_at)"
+    ))
+    for name, columns in (
+        ("ix_users_created", "created_at, id"),
+        ("ix_users_premium_created", "is_premium, created_at"),
+        ("ix_users_level", "level"),
+        ("ix_users_last_activity", "last_activity"),
+    ):
+        await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON users ({columns})"))
+
+
+# ON DELETE qoidasi bor FK li tablalar
+FK_TABLES = (
+    "lessons", "quizzes", "questions", "user_progress", "battles", "battle_answers",
+    "certificates", "quiz_gen_jobs", "ai_chat_history", "ai_chat_summaries",
+)
+
+
+async def sync_foreign_keys(conn):
+    """
+    SQLite mavjud FK ni o'zgartira olmaydi: ON DELETE modeldagidan farq qilsa tabla qayta quriladi
+    (yangi tabla -> ma'lumot nusxasi -> eskisini DROP -> RENAME). PRAGMA foreign_keys=OFF bo'lishi kerak
+    """
+    models = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(models)
+
+    for name in FK_TABLES:
+        table = Base.metadata.tables[name]
+        wanted = {
+            (fk.parent.name, fk.column.table.name, (fk.ondelete or "NO ACTION").upper())
+            for fk in table.foreign_keys
+        }
+        result = await conn.execute(text(f"PRAGMA foreign_key_list({name})"))
+        current = {(row[3], row[2], row[6].upper()) for row in result.fetchall()}
+        if current == wanted:
+            continue
+
+        result = await conn.execute(text(f"PRAGMA table_info({name})"))
+        existing = {row[1] for row in result.fetchall()}
+        columns = ", ".join(column.name for column in table.columns if column.name in existing)
+        rebuilt = f"{name}__rebuild"
+        await conn.execute(text(f"DROP TABLE IF EXISTS {rebuilt}"))
+        await conn.execute(CreateTable(models.tables[name].to_metadata(models, name=rebuilt)))
+        await conn.execute(text(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {name}"))
+        await conn.execute(text(f"DROP TABLE {name}"))
+        await conn.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {name}"))
+        for index in table.indexes:
+            await conn.execute(CreateIndex(index, if_not_exists=True))
+        print(f"🔧 Migration: {name} FK (ON DELETE) bilan qayta qurildi")
+
+    result = await conn.execute(text("PRAGMA foreign_key_check"))
+    orphans = result.fetchall()
+    if orphans:
+        print(f"⚠️ {len(orphans)} ta qator mavjud bo'lmagan ota qatorga ishora qiladi (eski o'chirishlardan qolgan)")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     async with engine.begin() as conn:
+        # Tabla qayta qurish uchun - tranzaksiya ichida PRAGMA ta'sir qilmaydi, shuning uchun birinchi
+        await conn.execute(text("PRAGMA foreign_keys=OFF"))
         await conn.run_sync(Base.metadata.create_all)
         await run_migrations(conn)
+    # FK o'chiq ulanish poolda qolmasin - keyingilari connect eventda yoqiladi
+    await engine.dispose()
+
+    await ai_client.start()
+    await quiz_job_queue.start()
+    await transcode_queue.start()
+    await backfill_revenue_aggregates()
+    await premium_expiry.start()
+    await bot_notifier.start()
+    await broadcast_sender.start()
+    await notification_dispatcher.start()
 
     # Scheduler
-    scheduler.add_job(check_premium_expiry, 'cron', hour=9, minute=0)
+    # Aniq vaqtda premium_expiry o'chiradi; bu - zaxira tekshiruv
+    scheduler.add_job(check_premium_expiry, 'interval', hours=1)
+    scheduler.add_job(flush_all_counters, 'interval', seconds=settings.COUNTER_FLUSH_INTERVAL_SEC)
+    scheduler.add_job(prune_explain_cache, 'interval', hours=1)
+    scheduler.add_job(flush_ai_usage, 'interval', seconds=settings.COUNTER_FLUSH_INTERVAL_SEC)
+    scheduler.add_job(fill_missing_explanations, 'cron', hour=3, minute=0)
+    scheduler.add_job(run_analytics, 'cron', hour=2, minute=30)
+    scheduler.add_job(cleanup_upload_sessions, 'interval', hours=1)
+    scheduler.add_job(collect_media_garbage, 'interval', hours=6)
+    # Admin delete dan keyin darhol ham ishga tushadi; bu - restartdan keyin davom ettirish
+    scheduler.add_job(purge_deleted_content, 'interval', minutes=15)
+    scheduler.add_job(dashboard_stats.refresh, 'interval', minutes=10)
+    scheduler.add_job(prune_notifications, 'cron', hour=4, minute=0)
     scheduler.start()
     print("⏰ Scheduler ishga tushdi")
     print("🚀 Backend ishga tushdi!")
@@ -85,8 +209,19 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    await quiz_job_queue.stop()
+    await transcode_queue.stop()
+    await premium_expiry.stop()
+    await broadcast_sender.stop()
+    await notification_dispatcher.stop()
+    await bot_notifier.stop()
+    shutdown_metadata_pool()
+    await image_cache.close()
     scheduler.shutdown()
     print("⏰ Scheduler to'xtatildi")
+    await flush_all_counters()
+    await flush_ai_usage()
+    await ai_client.close()
     print("👋 Backend to'xtatildi!")
 
 
@@ -106,12 +241,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Static files (payment screenshots)
+# Static files - faqat ochiq rasm blob lar; qolgan media /api/media orqali
 os.makedirs("uploads/payments", exist_ok=True)
 os.makedirs("uploads/videos", exist_ok=True)
 os.makedirs("uploads/audio", exist_ok=True)
 os.makedirs("uploads/books", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+os.makedirs(settings.UPLOAD_TMP_DIR, exist_ok=True)
+os.makedirs("uploads/media", exist_ok=True)
+os.makedirs("uploads/hls", exist_ok=True)
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
 
 # Routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -122,6 +260,8 @@ app.include_router(payment.router, prefix="/api/payment", tags=["payment"])
 app.include_router(news.router, prefix="/api/news", tags=["news"])
 app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["leaderboard"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(reports.router, prefix="/api/admin/reports", tags=["reports"])
+app.include_router(broadcasts.router, prefix="/api/admin/broadcasts", tags=["broadcasts"])
 app.include_router(friends.router, prefix="/api/friends", tags=["friends"])
 app.include_router(bookmarks.router, prefix="/api/bookmarks", tags=["bookmarks"])
 app.include_router(certificates.router, prefix="/api/certificates", tags=["certificates"])
@@ -131,6 +271,8 @@ app.include_router(ai_chat.router, prefix="/api/ai", tags=["ai"])
 app.include_router(audio.router, prefix="/api/audio", tags=["audio"])
 app.include_router(books.router, prefix="/api/books", tags=["books"])
 app.include_router(battle.router, prefix="/api/battle", tags=["battle"])
+app.include_router(uploads.router, prefix="/api/uploads", tags=["uploads"])
+app.include_router(media.router, prefix="/api/media", tags=["media"])
 
 
 @app.get("/")
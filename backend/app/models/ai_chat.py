@@ -1,7 +1,7 @@
 """
 AI Chat History model
 """
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Text
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Date, String, Text, Index, UniqueConstraint
 from datetime import datetime
 from app.database import Base
 
@@ -13,5 +13,49 @@ class AIChatHistory(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     role = Column(String(10), nullable=False)  # user, assistant
     content = Column(Text, nullable=False)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination: (user_id, lesson_id, created_at)
+        Index("ix_ai_chat_history_conversation", "user_id", "lesson_id", "created_at"),
+    )
+
+
+class AIChatSummary(Base):
+    """Suhbatning eski qismi uchun rolling summary (har bir user+lesson uchun bitta)"""
+    __tablename__ = "ai_chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=True)
+    summary = Column(Text, nullable=False)
+    covered_until_id = Column(Integer, nullable=False)  # shu id gacha bo'lgan xabarlar xulosada
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AIExplainCache(Base):
+    __tablename__ = "ai_explain_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)  # sha256
+    lesson_id = Column(Integer, nullable=True)
+    prompt_version = Column(String(20), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class AIUsage(Base):
+    """Kunlik AI foydalanish (UsageTracker tomonidan batch bilan yoziladi)"""
+    __tablename__ = "ai_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    requests = Column(Integer, default=0)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_ai_usage_user_day"),
+    )
@@ -17,7 +17,7 @@ class Battle(Base):
     opponent_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
     # Quiz source — which module's questions to use
-    module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
+    module_id = Column(Integer, ForeignKey("modules.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # Status: waiting | active | finished | cancelled
     status = Column(String(20), default="waiting")
@@ -39,16 +39,16 @@ class Battle(Base):
     started_at = Column(DateTime, nullable=True)
     finished_at = Column(DateTime, nullable=True)
 
-    answers = relationship("BattleAnswer", back_populates="battle", cascade="all, delete-orphan")
+    answers = relationship("BattleAnswer", back_populates="battle", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class BattleAnswer(Base):
     __tablename__ = "battle_answers"
 
     id = Column(Integer, primary_key=True, index=True)
-    battle_id = Column(Integer, ForeignKey("battles.id"), nullable=False)
+    battle_id = Column(Integer, ForeignKey("battles.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
     selected_answer = Column(String(500), nullable=False)
     is_correct = Column(Boolean, default=False)
     answered_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,30 @@
+"""
+Bot broadcast model
+"""
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from datetime import datetime
+from app.database import Base
+
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(Text, nullable=False)  # HTML
+    audience = Column(String(20), default="all")  # all | premium | free
+    news_id = Column(Integer, ForeignKey("news.id", ondelete="SET NULL"), nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Status: pending | running | done | cancelled
+    status = Column(String(20), default="pending", index=True)
+    # Resume nuqtasi - shu users.id gacha bo'lganlar ishlangan
+    last_user_id = Column(Integer, default=0)
+    total = Column(Integer, default=0)  # boshlanishdagi qabul qiluvchilar soni
+    delivered = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    blocked = Column(Integer, default=0)  # 403 - botni bloklagan (failed ichida)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -11,7 +11,8 @@ class Certificate(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
+    # Modul purge qilinganda sertifikat qoladi (module_id NULL)
+    module_id = Column(Integer, ForeignKey("modules.id", ondelete="SET NULL"), nullable=True, index=True)
     certificate_code = Column(String(20), unique=True, nullable=False)
     score = Column(Float, default=0.0)
     issued_at = Column(DateTime, default=datetime.utcnow)
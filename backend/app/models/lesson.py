@@ -11,7 +11,7 @@ class Lesson(Base):
     __tablename__ = "lessons"
     
     id = Column(Integer, primary_key=True, index=True)
-    module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
+    module_id = Column(Integer, ForeignKey("modules.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     content = Column(Text, nullable=True)
@@ -21,9 +21,13 @@ class Lesson(Base):
     is_premium = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
     duration_min = Column(Integer, default=10)
+    # HLS: None (tashqi/yo'q) | pending | processing | ready | failed
+    transcode_status = Column(String(20), nullable=True)
+    transcode_error = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)  # soft delete - fon purge o'chiradi
     
     # Relationships
     module = relationship("Module", back_populates="lessons")
-    quiz = relationship("Quiz", back_populates="lesson", uselist=False, cascade="all, delete-orphan")
-    progress = relationship("UserProgress", back_populates="lesson", cascade="all, delete-orphan")
+    quiz = relationship("Quiz", back_populates="lesson", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    progress = relationship("UserProgress", back_populates="lesson", cascade="all, delete-orphan", passive_deletes=True)
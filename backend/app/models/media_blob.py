@@ -0,0 +1,25 @@
+"""
+Content-addressed media blob model
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON
+from datetime import datetime
+from app.database import Base
+
+
+class MediaBlob(Base):
+    __tablename__ = "media_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String(500), nullable=False)  # uploads/media/ab/cd/<sha256>.<ext>
+    ext = Column(String(10), nullable=False)
+    kind = Column(String(20), nullable=False)  # video, audio, book, payment
+    size = Column(BigInteger, nullable=False)
+
+    # Lesson/Audio/Book/... qatorlaridagi URL lar soni (GC qayta hisoblaydi)
+    ref_count = Column(Integer, default=0)
+
+    # Metadata kesh: duration_sec, bitrate_kbps, pages, cover_url (None = hali o'qilmagan)
+    meta = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_uploaded_at = Column(DateTime, default=datetime.utcnow, index=True)
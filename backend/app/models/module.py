@@ -19,6 +19,7 @@ class Module(Base):
     is_premium = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)  # soft delete - fon purge o'chiradi
     
     # Relationships
-    lessons = relationship("Lesson", back_populates="module", order_by="Lesson.order_index", cascade="all, delete-orphan")
+    lessons = relationship("Lesson", back_populates="module", order_by="Lesson.order_index", cascade="all, delete-orphan", passive_deletes=True)
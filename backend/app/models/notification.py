@@ -0,0 +1,29 @@
+"""
+Notification outbox model
+"""
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Text, Index
+from datetime import datetime
+from app.database import Base
+
+
+class Notification(Base):
+    """Bot xabari - sababchi o'zgarish bilan bitta tranzaksiyada yoziladi, dispatcher yuboradi"""
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(30), nullable=False)  # payment_reviewed | friend_request | battle_joined | premium_expired
+    payload = Column(JSON, default=dict)
+
+    # Status: pending | sent | failed | skipped (telegram_id yo'q / bot o'chiq)
+    status = Column(String(20), default="pending")
+    attempts = Column(Integer, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow)  # coalescing oynasi / retry backoff
+    sent_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Dispatcher: pending + available_at <= now, eng eskisi birinchi
+        Index("ix_notifications_status_available", "status", "available_at"),
+    )
@@ -1,7 +1,7 @@
 """
 Payment model
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -20,6 +20,11 @@ class Payment(Base):
     reviewed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     reviewed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Admin pending navbati (keyset pagination)
+        Index("ix_payments_status_created", "status", "created_at"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="payments", foreign_keys=[user_id])
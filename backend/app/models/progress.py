@@ -12,7 +12,7 @@ class UserProgress(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False, index=True)
     is_completed = Column(Boolean, default=False)
     quiz_score = Column(Float, nullable=True)
     quiz_attempts = Column(Integer, default=0)
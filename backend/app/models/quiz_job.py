@@ -0,0 +1,31 @@
+"""
+AI quiz generation job model
+"""
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Text
+from datetime import datetime
+from app.database import Base
+
+
+class QuizGenJob(Base):
+    __tablename__ = "quiz_gen_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(32), index=True, nullable=False)  # bitta submit dagi joblar
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
+    module_id = Column(Integer, ForeignKey("modules.id", ondelete="SET NULL"), nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    question_count = Column(Integer, default=5)
+    difficulty = Column(String(20), default="medium")
+    extra_context = Column(Text, nullable=True)
+
+    # Status: pending | running | done | failed | approved | rejected
+    status = Column(String(20), default="pending", index=True)
+    attempts = Column(Integer, default=0)
+    questions = Column(JSON, nullable=True)  # generate_questions() natijasi
+    error = Column(Text, nullable=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"), nullable=True)  # approve dan keyin
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,27 @@
+"""
+Revenue reporting aggregates (incremental, per month)
+"""
+from sqlalchemy import Column, Integer, BigInteger, String
+from app.database import Base
+
+
+class RevenueMonthly(Base):
+    """To'lovlar - oy va tarif bo'yicha (review paytida yangilanadi)"""
+    __tablename__ = "revenue_monthly"
+
+    month = Column(String(7), primary_key=True)  # YYYY-MM (reviewed_at)
+    plan_type = Column(String(20), primary_key=True)
+    revenue = Column(BigInteger, default=0)
+    approvals = Column(Integer, default=0)
+    rejections = Column(Integer, default=0)
+
+
+class PremiumMonthly(Base):
+    """Premium obunalar oqimi - oy bo'yicha"""
+    __tablename__ = "premium_monthly"
+
+    month = Column(String(7), primary_key=True)
+    activated = Column(Integer, default=0)  # yangi premium
+    renewed = Column(Integer, default=0)    # faol premium ustiga
+    churned = Column(Integer, default=0)    # muddati tugagan yoki bekor qilingan
+    active_end = Column(Integer, nullable=True)  # oy oxiridagi (joriy oy - hozirgi) faol premiumlar
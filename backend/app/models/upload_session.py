@@ -0,0 +1,27 @@
+"""
+Resumable upload session model (tus-style)
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # uuid hex
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(20), nullable=False)  # video, audio, book
+    filename = Column(String(255), nullable=True)
+    ext = Column(String(10), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, default=0)
+    temp_path = Column(String(500), nullable=False)
+
+    # Status: active | completed | expired | rejected (tarkib tekshiruvidan o'tmadi)
+    status = Column(String(20), default="active", index=True)
+    url = Column(String(500), nullable=True)
+    sha256 = Column(String(64), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
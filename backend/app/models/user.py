@@ -1,7 +1,7 @@
 """
 User model
 """
-from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -33,6 +33,15 @@ class User(Base):
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Admin ro'yxati: keyset (created_at, id) va filtrlar
+        Index("ix_users_created", "created_at", "id"),
+        Index("ix_users_premium_created", "is_premium", "created_at"),
+        Index("ix_users_level", "level"),
+        # Dashboard: bugun faol bo'lganlar
+        Index("ix_users_last_activity", "last_activity"),
+    )
     
     # Relationships
     progress = relationship("UserProgress", back_populates="user", cascade="all, delete-orphan")
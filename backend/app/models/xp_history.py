@@ -16,7 +16,7 @@ class XPHistory(Base):
     source = Column(String(50), nullable=False)  # lesson, quiz, daily_challenge, bonus
     source_id = Column(Integer, nullable=True)
     description = Column(String(255), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # analytics eksport (kun bo'yicha)
     
     # Relationships
     user = relationship("User", back_populates="xp_history")
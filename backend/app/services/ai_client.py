@@ -0,0 +1,202 @@
+"""
+Anthropic API client - bitta ulanish pulidan foydalanadi
+
+One application-scoped ``httpx.AsyncClient`` (keep-alive, HTTP/2) is shared by
+every AI call. A semaphore caps concurrent upstream requests and 429/5xx
+responses are retried with jittered backoff, honouring ``retry-after``.
+Transport errors are retried only in the connect phase: the messages POST is
+not idempotent, and a read timeout may mean the request was already billed.
+"""
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.config import settings
+
+ANTHROPIC_VERSION = "2023-06-01"
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+# Faqat so'rov serverga yetib bormagani aniq bo'lgan xatolar qayta yuboriladi -
+# read timeout da so'rov allaqachon bajarilgan (va hisoblangan) bo'lishi mumkin
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+MAX_RETRY_DELAY_SEC = 30.0
+
+
+class AIError(Exception):
+    """Provider xato javob qaytardi"""
+
+
+class AIClient:
+    """
+    Pooled Anthropic Messages API client
+
+    Lifespan da start() / close() chaqiriladi; start() chaqirilmagan bo'lsa
+    (masalan scheduler task ichida) birinchi so'rovda yaratiladi.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        max_connections: int = 20,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    async def start(self):
+        if self._client is not None:
+            return
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60.0,
+            ),
+            headers={
+                "x-api-key": self.api_key,
+                "anthropic-version": ANTHROPIC_VERSION,
+                "content-type": "application/json",
+            },
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("AIClient ishga tushirilmagan (start() chaqiring)")
+        return self._client
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """retry-after bo'lsa unga amal qilamiz, aks holda full-jitter exponential backoff"""
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    try:
+                        at = parsedate_to_datetime(retry_after)
+                        delay = (at - datetime.now(timezone.utc)).total_seconds()
+                    except (TypeError, ValueError):
+                        delay = 0.0
+                return min(max(delay, 0.0) + random.uniform(0, 0.25), MAX_RETRY_DELAY_SEC)
+        return random.uniform(0, min(0.5 * 2 ** attempt, MAX_RETRY_DELAY_SEC))
+
+    async def post_messages(self, payload: dict, timeout: Optional[float] = None) -> dict:
+        """
+        POST /v1/messages
+        Returns: provider JSON javobi (xato bo'lsa ham "error" kaliti bilan)
+        Raises: httpx.HTTPError - barcha urinishlar tarmoq xatosi bilan tugasa
+        """
+        await self.start()
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self._semaphore:
+                    response = await self.client.post(
+                        "/v1/messages",
+                        json=payload,
+                        timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                    )
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        return {"type": "error", "error": {"message": f"HTTP {response.status_code}"}}
+            except RETRY_ERRORS:
+                if attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    async def stream_messages(self, payload: dict, timeout: Optional[float] = None) -> AsyncIterator[dict]:
+        """
+        POST /v1/messages (stream=True) - SSE eventlarni dict sifatida qaytaradi
+
+        Retry faqat birinchi baytgacha qilinadi. Generator yopilsa (klient uzilsa)
+        upstream ulanish ham yopiladi va token sarflanishi to'xtaydi.
+        Xato bo'lsa {"type": "error", "error": {...}} event yuboriladi.
+        """
+        await self.start()
+        payload = {**payload, "stream": True}
+        attempt = 0
+        started = False
+        while True:
+            retry_response = None
+            try:
+                async with self._semaphore:
+                    async with self.client.stream(
+                        "POST",
+                        "/v1/messages",
+                        json=payload,
+                        timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                    ) as response:
+                        if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                            await response.aclose()
+                            retry_response = response
+                        elif response.status_code >= 400:
+                            body = await response.aread()
+                            try:
+                                yield json.loads(body)
+                            except ValueError:
+                                yield {"type": "error", "error": {"message": f"HTTP {response.status_code}"}}
+                            return
+                        else:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if not data:
+                                    continue
+                                try:
+                                    event = json.loads(data)
+                                except ValueError:
+                                    continue
+                                started = True
+                                yield event
+                            return
+            except RETRY_ERRORS:
+                # Oqim boshlangandan keyin qayta urinib bo'lmaydi (dublikat matn)
+                if started or attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(self._retry_delay(attempt, retry_response))
+            attempt += 1
+
+
+ai_client = AIClient(
+    base_url=settings.ANTHROPIC_BASE_URL,
+    api_key=settings.ANTHROPIC_API_KEY,
+    max_connections=settings.AI_MAX_CONNECTIONS,
+    max_concurrency=settings.AI_MAX_CONCURRENCY,
+    max_retries=settings.AI_MAX_RETRIES,
+    timeout=settings.AI_TIMEOUT_SEC,
+)
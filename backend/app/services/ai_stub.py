@@ -0,0 +1,116 @@
+"""
+Local Anthropic API stub - testlar va benchmarklar uchun (offline)
+
+Run:
+    uvicorn app.services.ai_stub:app --port 8100
+    ANTHROPIC_BASE_URL=http://localhost:8100 ANTHROPIC_API_KEY=stub uvicorn app.main:app
+
+Env:
+    AI_STUB_LATENCY_MS - har bir javob kechikishi (default 200)
+    AI_STUB_FAIL_RATE  - 429 qaytarish ehtimoli 0..1 (default 0)
+    AI_STUB_TOKEN_MS   - stream rejimida tokenlar orasidagi kechikish (default 20)
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = int(os.getenv("AI_STUB_LATENCY_MS", "200"))
+FAIL_RATE = float(os.getenv("AI_STUB_FAIL_RATE", "0"))
+TOKEN_MS = int(os.getenv("AI_STUB_TOKEN_MS", "20"))
+
+app = FastAPI(title="Anthropic API stub")
+
+
+def _prompt_text(body: dict) -> str:
+    parts = []
+    for msg in body.get("messages", []):
+        content = msg.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(c.get("text", "") for c in content if isinstance(c, dict))
+    return "\n".join(parts)
+
+
+def _fake_quiz(count: int) -> str:
+    return json.dumps([
+        {
+            "question": f"Stub savol #{i + 1}?",
+            "options": ["A varianti", "B varianti", "C varianti", "D varianti"],
+            "correct_index": i % 4,
+            "explanation": "Stub izoh",
+        }
+        for i in range(count)
+    ], ensure_ascii=False)
+
+
+def _reply_text(prompt: str) -> str:
+    match = re.search(r"(\d+) ta test savoli", prompt)
+    if match:
+        return _fake_quiz(int(match.group(1)))
+    return f"Stub javob: {prompt[:200]}"
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def _stream(message_id: str, model: str, prompt: str, text: str):
+    yield _sse({
+        "type": "message_start",
+        "message": {
+            "id": message_id, "type": "message", "role": "assistant", "model": model,
+            "content": [], "usage": {"input_tokens": max(1, len(prompt) // 4), "output_tokens": 0},
+        },
+    })
+    yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+    for token in re.findall(r"\S+\s*", text):
+        await asyncio.sleep(TOKEN_MS / 1000)
+        yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}})
+    yield _sse({"type": "content_block_stop", "index": 0})
+    yield _sse({
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn"},
+        "usage": {"output_tokens": max(1, len(text) // 4)},
+    })
+    yield _sse({"type": "message_stop"})
+
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    await asyncio.sleep(LATENCY_MS / 1000)
+
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        return JSONResponse(
+            {"type": "error", "error": {"type": "rate_limit_error", "message": "Stub rate limit"}},
+            status_code=429,
+            headers={"retry-after": "1"},
+        )
+
+    prompt = _prompt_text(body)
+    text = _reply_text(prompt)
+    message_id = f"msg_{uuid.uuid4().hex[:24]}"
+    if body.get("stream"):
+        return StreamingResponse(
+            _stream(message_id, body.get("model", "stub"), prompt, text),
+            media_type="text/event-stream",
+        )
+    return {
+        "id": message_id,
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "stub"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "usage": {
+            "input_tokens": max(1, len(prompt) // 4),
+            "output_tokens": max(1, len(text) // 4),
+        },
+    }
@@ -0,0 +1,135 @@
+"""
+AI usage tracker - kunlik kvota va token hisobi
+
+Today's totals per user live in memory (loaded once per user per day with a
+single-row lookup), so the quota check is a dict read. Deltas are upserted
+into ``ai_usage`` in batches by the scheduler and on shutdown.
+"""
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import settings
+from app.database import async_session
+from app.models.ai_chat import AIUsage
+
+Key = Tuple[int, date]
+FIELDS = ("requests", "input_tokens", "output_tokens")
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+class UsageTracker:
+    def __init__(self, request_quota: int, token_quota: int):
+        self.request_quota = request_quota
+        self.token_quota = token_quota
+        self._totals: Dict[Key, Dict[str, int]] = {}   # DB + pending
+        self._pending: Dict[Key, Dict[str, int]] = {}  # hali yozilmagan
+
+    async def _ensure_loaded(self, user_id: int, day: date) -> Dict[str, int]:
+        key = (user_id, day)
+        totals = self._totals.get(key)
+        if totals is not None:
+            return totals
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(AIUsage.requests, AIUsage.input_tokens, AIUsage.output_tokens)
+                .where(AIUsage.user_id == user_id, AIUsage.day == day)
+            )
+            row = result.first()
+        # await paytida boshqa so'rov yuklagan bo'lishi mumkin
+        totals = self._totals.get(key)
+        if totals is None:
+            totals = dict(zip(FIELDS, row)) if row else dict.fromkeys(FIELDS, 0)
+            totals = {k: v or 0 for k, v in totals.items()}
+            for field, amount in self._pending.get(key, {}).items():
+                totals[field] += amount
+            self._totals[key] = totals
+        return totals
+
+    async def usage(self, user_id: int) -> Dict[str, int]:
+        return dict(await self._ensure_loaded(user_id, _today()))
+
+    async def check(self, user_id: int) -> Optional[str]:
+        """Kvota tugagan bo'lsa sababini qaytaradi, aks holda None"""
+        totals = await self._ensure_loaded(user_id, _today())
+        if self.request_quota and totals["requests"] >= self.request_quota:
+            return "requests"
+        if self.token_quota and totals["input_tokens"] + totals["output_tokens"] >= self.token_quota:
+            return "tokens"
+        return None
+
+    def record(self, user_id: Optional[int], requests: int = 0, input_tokens: int = 0, output_tokens: int = 0):
+        if not user_id:
+            return
+        key = (user_id, _today())
+        delta = {"requests": requests, "input_tokens": input_tokens, "output_tokens": output_tokens}
+        pending = self._pending.setdefault(key, dict.fromkeys(FIELDS, 0))
+        totals = self._totals.get(key)
+        for field, amount in delta.items():
+            pending[field] += amount
+            if totals is not None:
+                totals[field] += amount
+
+    def record_response(self, user_id: Optional[int], usage: Optional[dict]):
+        """Provider javobidagi usage blokini yozish"""
+        if usage:
+            self.record(
+                user_id,
+                input_tokens=usage.get("input_tokens") or 0,
+                output_tokens=usage.get("output_tokens") or 0
+            )
+
+    async def flush(self) -> int:
+        if not self._pending:
+            self._prune()
+            return 0
+        pending, self._pending = self._pending, {}
+
+        rows = [
+            {"user_id": user_id, "day": day, **values}
+            for (user_id, day), values in pending.items()
+        ]
+        stmt = sqlite_insert(AIUsage)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AIUsage.user_id, AIUsage.day],
+            set_={field: getattr(AIUsage, field) + getattr(stmt.excluded, field) for field in FIELDS}
+        )
+        try:
+            async with async_session() as db:
+                await db.execute(stmt, rows)
+                await db.commit()
+        except Exception:
+            # Qaytarib qo'yamiz - keyingi flush da yoziladi
+            for key, values in pending.items():
+                target = self._pending.setdefault(key, dict.fromkeys(FIELDS, 0))
+                for field, amount in values.items():
+                    target[field] += amount
+            raise
+        self._prune()
+        return len(rows)
+
+    def _prune(self):
+        """Kechagi kunlar xotiradan o'chiriladi (pending bo'lmasa)"""
+        today = _today()
+        for key in [k for k in self._totals if k[1] != today and k not in self._pending]:
+            del self._totals[key]
+
+
+ai_usage = UsageTracker(
+    request_quota=settings.AI_DAILY_REQUEST_QUOTA,
+    token_quota=settings.AI_DAILY_TOKEN_QUOTA,
+)
+
+
+async def flush_ai_usage():
+    """Scheduler job"""
+    try:
+        await ai_usage.flush()
+    except Exception as e:
+        print(f"⚠️ AI usage flush xatosi: {e}")
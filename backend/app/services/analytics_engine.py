@@ -0,0 +1,211 @@
+"""
+Engagement analytics over the Parquet snapshots (blocking, pandas/NumPy)
+
+Runs in a worker process and never touches SQLite. Activity is any XP event,
+lesson progress or battle participation, reduced to distinct (user, day)
+pairs. Produces DAU/WAU/MAU, weekly signup-cohort retention, per-module lesson
+funnels and quiz pass rates as a JSON-serialisable dict.
+"""
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+SERIES_DAYS = 90
+RETENTION_WEEKS = 12
+
+
+def _partitions(root: str, table: str) -> List[str]:
+    path = os.path.join(root, table)
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        os.path.join(path, name, "part.parquet")
+        for name in os.listdir(path)
+        if name.startswith("day=") and os.path.exists(os.path.join(path, name, "part.parquet"))
+    )
+
+
+def _read_events(root: str, table: str, since: date, columns: List[str]):
+    """Kun bo'yicha partitionlar - faqat since dan keyingilari o'qiladi"""
+    import pandas as pd
+
+    files = [f for f in _partitions(root, table) if os.path.basename(os.path.dirname(f))[4:] >= since.isoformat()]
+    if not files:
+        return pd.DataFrame(columns=columns)
+    return pd.concat([pd.read_parquet(f, columns=columns) for f in files], ignore_index=True)
+
+
+def _read_snapshot(root: str, table: str, columns: Optional[List[str]] = None):
+    """Eng oxirgi snapshot"""
+    import pandas as pd
+
+    files = _partitions(root, table)
+    if not files:
+        return pd.DataFrame(columns=columns or [])
+    return pd.read_parquet(files[-1], columns=columns)
+
+
+def _activity(root: str, since: date):
+    """Distinct (user_id, day) juftliklari"""
+    import pandas as pd
+
+    frames = []
+    xp = _read_events(root, "xp_history", since, ["user_id", "created_at"])
+    frames.append(xp.rename(columns={"created_at": "at"}))
+
+    progress = _read_snapshot(root, "user_progress", ["user_id", "created_at", "completed_at"])
+    for column in ("created_at", "completed_at"):
+        frames.append(progress[["user_id", column]].rename(columns={column: "at"}))
+
+    battles = _read_snapshot(root, "battles", ["creator_id", "opponent_id", "created_at", "started_at"])
+    frames.append(battles[["creator_id", "created_at"]].rename(columns={"creator_id": "user_id", "created_at": "at"}))
+    frames.append(battles[["opponent_id", "started_at"]].rename(columns={"opponent_id": "user_id", "started_at": "at"}))
+
+    events = pd.concat(frames, ignore_index=True).dropna()
+    events["day"] = pd.to_datetime(events["at"]).dt.normalize()
+    events = events[events["day"] >= pd.Timestamp(since)]
+    events["user_id"] = events["user_id"].astype("int64")
+    return events[["user_id", "day"]].drop_duplicates()
+
+
+def _active_series(activity, today: date) -> List[Dict]:
+    import numpy as np
+    import pandas as pd
+
+    days = pd.date_range(end=pd.Timestamp(today) - pd.Timedelta(days=1), periods=SERIES_DAYS, freq="D")
+    day_values = activity["day"].values
+    user_values = activity["user_id"].values
+    series = []
+    for day in days:
+        d = np.datetime64(day)
+        def distinct(window: int) -> int:
+            mask = (day_values > d - np.timedelta64(window, "D")) & (day_values <= d)
+            return int(np.unique(user_values[mask]).size)
+        dau, wau, mau = distinct(1), distinct(7), distinct(30)
+        series.append({
+            "day": day.date().isoformat(),
+            "dau": dau,
+            "wau": wau,
+            "mau": mau,
+            "stickiness": round(dau / mau, 4) if mau else None,
+        })
+    return series
+
+
+def _retention(activity, users, today: date) -> List[Dict]:
+    import pandas as pd
+
+    if users.empty:
+        return []
+    users = users.dropna(subset=["created_at"]).copy()
+    users["cohort"] = pd.to_datetime(users["created_at"]).dt.to_period("W").dt.start_time
+    this_week = pd.Timestamp(today).to_period("W").start_time
+    users = users[users["cohort"] > this_week - pd.Timedelta(weeks=RETENTION_WEEKS)]
+    sizes = users.groupby("cohort")["id"].nunique()
+
+    active = activity.merge(users[["id", "cohort"]], left_on="user_id", right_on="id")
+    active["week"] = ((active["day"] - active["cohort"]).dt.days // 7).astype("int64")
+    active = active[(active["week"] >= 0) & (active["week"] <= RETENTION_WEEKS)]
+    matrix = active.groupby(["cohort", "week"])["user_id"].nunique().unstack(fill_value=0)
+
+    cohorts = []
+    for cohort, size in sizes.sort_index().items():
+        row = matrix.loc[cohort] if cohort in matrix.index else None
+        # Hali o'tmagan haftalar qo'shilmaydi
+        weeks_elapsed = int((this_week - cohort).days // 7)
+        cohorts.append({
+            "cohort": cohort.date().isoformat(),
+            "size": int(size),
+            "retention": [
+                round(int(row.get(week, 0)) / size, 4) if row is not None else 0.0
+                for week in range(min(weeks_elapsed, RETENTION_WEEKS) + 1)
+            ],
+        })
+    return cohorts
+
+
+def _funnels(modules, lessons, progress) -> List[Dict]:
+    if lessons.empty:
+        return []
+    lessons = lessons[lessons["is_active"].fillna(True).astype(bool)]
+    completed = progress[progress["is_completed"].fillna(False).astype(bool)]
+    completions = completed.groupby("lesson_id")["user_id"].nunique()
+    started = progress[["user_id", "lesson_id"]].merge(lessons[["id", "module_id"]], left_on="lesson_id", right_on="id")
+    starters = started.groupby("module_id")["user_id"].nunique()
+    titles = dict(zip(modules["id"], modules["title"])) if not modules.empty else {}
+    module_order = dict(zip(modules["id"], modules["order_index"])) if not modules.empty else {}
+
+    funnels = []
+    for module_id, group in lessons.groupby("module_id"):
+        steps = []
+        previous = int(starters.get(module_id, 0))
+        for lesson in group.sort_values(["order_index", "id"]).itertuples():
+            count = int(completions.get(lesson.id, 0))
+            steps.append({
+                "lesson_id": int(lesson.id),
+                "title": lesson.title,
+                "completed": count,
+                "drop_off": round(1 - count / previous, 4) if previous else None,
+            })
+            previous = count
+        funnels.append({
+            "module_id": int(module_id),
+            "title": titles.get(module_id),
+            "started": int(starters.get(module_id, 0)),
+            "steps": steps,
+            "_order": module_order.get(module_id, 0),
+        })
+    funnels.sort(key=lambda f: (f.pop("_order") or 0, f["module_id"]))
+    return funnels
+
+
+def _quiz_stats(quizzes, progress) -> List[Dict]:
+    if quizzes.empty:
+        return []
+    quizzes = quizzes.rename(columns={"id": "quiz_id"})
+    attempts = progress.loc[progress["quiz_score"].notna(), ["lesson_id", "quiz_score", "quiz_attempts"]].merge(
+        quizzes[["quiz_id", "lesson_id", "pass_percentage"]], on="lesson_id"
+    )
+    attempts["passed"] = attempts["quiz_score"] >= attempts["pass_percentage"]
+    summary = attempts.groupby("quiz_id").agg(
+        users=("quiz_score", "size"),
+        passed=("passed", "sum"),
+        avg_score=("quiz_score", "mean"),
+        avg_attempts=("quiz_attempts", "mean"),
+    )
+
+    stats = []
+    for quiz in quizzes.itertuples():
+        row = summary.loc[quiz.quiz_id] if quiz.quiz_id in summary.index else None
+        users = int(row["users"]) if row is not None else 0
+        passed = int(row["passed"]) if row is not None else 0
+        stats.append({
+            "quiz_id": int(quiz.quiz_id),
+            "lesson_id": int(quiz.lesson_id),
+            "title": quiz.title,
+            "users": users,
+            "passed": passed,
+            "pass_rate": round(passed / users, 4) if users else None,
+            "avg_score": round(float(row["avg_score"]), 2) if users else None,
+            "avg_attempts": round(float(row["avg_attempts"]), 2) if users else None,
+        })
+    return stats
+
+
+def compute_analytics(root: str, today_iso: str) -> Dict:
+    """Worker process ichida - natija JSON ga yoziladi"""
+    today = date.fromisoformat(today_iso)
+    since = today - timedelta(days=max(SERIES_DAYS + 30, (RETENTION_WEEKS + 2) * 7))
+    activity = _activity(root, since)
+    users = _read_snapshot(root, "users", ["id", "created_at"])
+    modules = _read_snapshot(root, "modules")
+    lessons = _read_snapshot(root, "lessons")
+    quizzes = _read_snapshot(root, "quizzes")
+    progress = _read_snapshot(root, "user_progress")
+
+    return {
+        "engagement": _active_series(activity, today),
+        "retention": _retention(activity, users, today),
+        "funnels": _funnels(modules, lessons, progress),
+        "quizzes": _quiz_stats(quizzes, progress),
+    }
@@ -0,0 +1,181 @@
+"""
+Analytics snapshot export - SQLite -> Parquet (zstd)
+
+Tables are read in primary-key chunks, each in its own short session, so the
+export never holds a long read transaction on the production database.
+Chunks are appended to a Parquet file as record batches (the writer runs in a
+thread), so memory stays at one chunk per table. Layout (hive-style)::
+
+    data/analytics/xp_history/day=2024-05-01/part.parquet   # events of that day
+    data/analytics/user_progress/day=2024-05-02/part.parquet  # nightly snapshot
+
+Append-only event tables are exported once per finished day; mutable tables
+are snapshotted nightly and the last ``ANALYTICS_SNAPSHOT_KEEP`` kept.
+"""
+import asyncio
+import os
+import shutil
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, func
+
+from app.config import settings
+from app.database import async_session
+from app.models.user import User
+from app.models.module import Module
+from app.models.lesson import Lesson
+from app.models.quiz import Quiz
+from app.models.progress import UserProgress
+from app.models.xp_history import XPHistory
+from app.models.battle import Battle
+
+CHUNK_ROWS = 5000
+
+# (ustun, tur) - tur: int, float, bool, str, ts
+Columns = Sequence[Tuple[str, str]]
+
+EVENT_TABLES = {
+    "xp_history": (XPHistory, (
+        ("id", "int"), ("user_id", "int"), ("amount", "int"), ("source", "str"),
+        ("source_id", "int"), ("created_at", "ts"),
+    )),
+}
+
+SNAPSHOT_TABLES = {
+    "users": (User, (
+        ("id", "int"), ("created_at", "ts"), ("last_activity", "ts"), ("level", "int"),
+        ("total_xp", "int"), ("is_premium", "bool"),
+    )),
+    "modules": (Module, (
+        ("id", "int"), ("title", "str"), ("order_index", "int"), ("is_active", "bool"),
+    )),
+    "lessons": (Lesson, (
+        ("id", "int"), ("module_id", "int"), ("title", "str"), ("order_index", "int"), ("is_active", "bool"),
+    )),
+    "quizzes": (Quiz, (
+        ("id", "int"), ("lesson_id", "int"), ("title", "str"), ("pass_percentage", "int"),
+    )),
+    "user_progress": (UserProgress, (
+        ("id", "int"), ("user_id", "int"), ("lesson_id", "int"), ("is_completed", "bool"),
+        ("quiz_score", "float"), ("quiz_attempts", "int"), ("completed_at", "ts"), ("created_at", "ts"),
+    )),
+    "battles": (Battle, (
+        ("id", "int"), ("creator_id", "int"), ("opponent_id", "int"), ("module_id", "int"),
+        ("status", "str"), ("creator_score", "int"), ("opponent_score", "int"), ("winner_id", "int"),
+        ("created_at", "ts"), ("started_at", "ts"), ("finished_at", "ts"),
+    )),
+}
+
+
+def partition_path(table: str, day: date) -> str:
+    return os.path.join(settings.ANALYTICS_DIR, table, f"day={day.isoformat()}", "part.parquet")
+
+
+def list_partitions(table: str) -> List[date]:
+    root = os.path.join(settings.ANALYTICS_DIR, table)
+    if not os.path.isdir(root):
+        return []
+    days = []
+    for name in os.listdir(root):
+        if name.startswith("day=") and os.path.exists(os.path.join(root, name, "part.parquet")):
+            days.append(date.fromisoformat(name[4:]))
+    return sorted(days)
+
+
+def _schema(columns: Columns):
+    import pyarrow as pa
+
+    types = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "str": pa.string(), "ts": pa.timestamp("us")}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+async def _iter_chunks(model, columns: Columns, *where) -> AsyncIterator[list]:
+    """PK bo'yicha keyset - har chunk alohida qisqa sessiyada"""
+    cols = [getattr(model, name) for name, _ in columns]
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(*cols)
+                .where(model.id > last_id, *where)
+                .order_by(model.id)
+                .limit(CHUNK_ROWS)
+            )
+            rows = result.all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < CHUNK_ROWS:
+            return
+        last_id = rows[-1][0]
+
+
+async def _write_parquet(path: str, columns: Columns, chunks: AsyncIterator[list]) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schema(columns)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    writer = pq.ParquetWriter(tmp, schema, compression="zstd")
+    total = 0
+    try:
+        async for rows in chunks:
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)],
+                schema=schema
+            )
+            await asyncio.to_thread(writer.write_batch, batch)
+            total += len(rows)
+    except BaseException:
+        writer.close()
+        os.remove(tmp)
+        raise
+    writer.close()
+    os.replace(tmp, path)
+    return total
+
+
+async def _export_events(table: str, model, columns: Columns, today: date) -> int:
+    """Tugagan kunlar - oxirgi eksport qilingan kundan keyingisidan kechagacha"""
+    exported = list_partitions(table)
+    if exported:
+        first = exported[-1] + timedelta(days=1)
+    else:
+        async with async_session() as db:
+            earliest: Optional[datetime] = (await db.execute(select(func.min(model.created_at)))).scalar()
+        if earliest is None:
+            return 0
+        first = earliest.date()
+
+    total = 0
+    day = first
+    while day < today:
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        total += await _write_parquet(
+            partition_path(table, day),
+            columns,
+            _iter_chunks(model, columns, model.created_at >= start, model.created_at < end)
+        )
+        day += timedelta(days=1)
+    return total
+
+
+async def _export_snapshot(table: str, model, columns: Columns, today: date) -> int:
+    total = await _write_parquet(partition_path(table, today), columns, _iter_chunks(model, columns))
+    for old in list_partitions(table)[:-settings.ANALYTICS_SNAPSHOT_KEEP]:
+        shutil.rmtree(os.path.dirname(partition_path(table, old)), ignore_errors=True)
+    return total
+
+
+async def export_snapshots(today: Optional[date] = None) -> dict:
+    """Barcha jadvallar; {jadval: yozilgan qatorlar}"""
+    today = today or datetime.utcnow().date()
+    stats = {}
+    for table, (model, columns) in EVENT_TABLES.items():
+        stats[table] = await _export_events(table, model, columns, today)
+    for table, (model, columns) in SNAPSHOT_TABLES.items():
+        stats[table] = await _export_snapshot(table, model, columns, today)
+    return stats
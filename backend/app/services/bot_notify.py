@@ -0,0 +1,115 @@
+"""
+Telegram bot sender - Bot API client + rate limiter
+
+Nothing here is called from request handlers: user notifications go through
+the outbox (``app.services.notifications``) and announcements through
+``app.services.broadcast``; both deliver with ``send()``. Every send
+goes through one limiter: a global token bucket plus a small bucket per chat,
+matching Telegram's ~30 msg/s and ~1 msg/s per chat limits. A 429 pauses the
+global bucket for ``retry_after`` and is retried. Without ``BOT_TOKEN`` the
+notifier is disabled and the dispatchers do not start.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+TELEGRAM_API = "https://api.telegram.org"
+SEND_RETRIES = 3
+CHAT_BUCKETS_MAX = 10000  # xotirada saqlanadigan per-chat bucketlar
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Token oladi (qarzga ham); necha sekund kutish kerakligini qaytaradi"""
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float):
+        """429 retry_after - shu vaqtgacha hech narsa yuborilmaydi"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self._tokens >= self.capacity
+
+
+class SendLimiter:
+    """Global + per-chat token bucket"""
+
+    def __init__(self, global_rate: float, chat_rate: float):
+        self.chat_rate = chat_rate
+        self.global_bucket = TokenBucket(global_rate, capacity=max(1.0, global_rate))
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def _chat(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, capacity=1.0)
+            if len(self._chats) > CHAT_BUCKETS_MAX:
+                # To'lgan (uzoq vaqt jim) bucketlarni tashlab yuborish - ular yangisiga teng
+                for key in [k for k, b in self._chats.items() if b.is_full()]:
+                    del self._chats[key]
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def acquire(self, chat_id: int):
+        wait = max(self._chat(chat_id).reserve(), self.global_bucket.reserve())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class BotNotifier:
+    def __init__(self):
+        self.enabled = False
+        self.limiter = SendLimiter(settings.BOT_GLOBAL_RATE_PER_SEC, settings.BOT_CHAT_RATE_PER_SEC)
+        self._http: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        self.enabled = bool(settings.BOT_TOKEN)
+        if not self.enabled:
+            print("⚠️ BOT_TOKEN yo'q - bot xabarnomalari o'chirilgan")
+            return
+        self._http = httpx.AsyncClient(base_url=f"{TELEGRAM_API}/bot{settings.BOT_TOKEN}", timeout=10.0)
+
+    async def stop(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def send(self, chat_id: int, text: str):
+        """
+        Limiter orqali bitta xabar; 429 da retry_after kutib qayta urinadi
+        Xato bo'lsa httpx.HTTPStatusError (403 - bot bloklangan) / httpx.HTTPError
+        """
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}
+        for _ in range(SEND_RETRIES):
+            await self.limiter.acquire(chat_id)
+            response = await self._http.post("/sendMessage", json=payload)
+            if response.status_code != 429:
+                response.raise_for_status()
+                return
+            retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+            self.limiter.global_bucket.pause(retry_after)
+        response.raise_for_status()
+
+
+bot_notifier = BotNotifier()
@@ -0,0 +1,315 @@
+"""
+Bot broadcast - admin e'lonlarini barcha foydalanuvchilarga yuborish
+
+Broadcasts are rows in ``broadcasts`` and are sent one at a time by a single
+worker task. Recipients are read from ``users`` in id-ordered pages (keyset
+on ``users.id``), so memory stays flat however many users there are. Each
+page is sent concurrently through ``bot_notifier.send``, which applies the
+shared global and per-chat token buckets and retries 429s. After each page
+the cursor and the delivered/failed counters are saved in one UPDATE, so a
+restart resumes from the last finished page. At most one page can be sent
+twice. Cancelling takes effect at the next page boundary.
+
+Telegram rejects a message whose HTML does not parse, or whose text is over
+4096 UTF-16 units after parsing, for every recipient alike. Admin HTML is
+therefore checked against the same rules when the broadcast is created, and
+news text is cut on the raw content before escaping.
+"""
+import asyncio
+import html
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.broadcast import Broadcast
+from app.models.news import News
+from app.models.user import User
+from app.services.bot_notify import bot_notifier
+
+PAGE_SIZE = 200
+AUDIENCES = ("all", "premium", "free")
+ACTIVE_STATUSES = ("pending", "running")
+ERROR_RETRY_SEC = 30
+MAX_TEXT_LENGTH = 4096  # Telegram sendMessage limiti (parse dan keyingi matn, UTF-16)
+MAX_HTML_LENGTH = 4 * MAX_TEXT_LENGTH  # teglar bilan xom matn
+
+# Telegram parse_mode=HTML qo'llaydigan teglar
+ALLOWED_TAGS = {
+    "b", "strong", "i", "em", "u", "ins", "s", "strike", "del",
+    "a", "code", "pre", "span", "tg-spoiler", "tg-emoji", "blockquote",
+}
+ALLOWED_ENTITIES = {"lt": "<", "gt": ">", "amp": "&", "quot": '"'}
+_BARE_AMP_RE = re.compile(r"&(?!#[0-9]+;|#x[0-9a-fA-F]+;|[a-zA-Z]+;)")
+
+
+def recipient_filters(audience: str) -> list:
+    conditions = [User.is_active != False]
+    if audience == "premium":
+        conditions.append(User.is_premium == True)
+    elif audience == "free":
+        conditions.append(User.is_premium != True)
+    return conditions
+
+
+def telegram_length(text: str) -> int:
+    """Telegram uzunligi - UTF-16 birliklarida (emoji 2 ta)"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Telegram uzunligi bo'yicha kesish, oxirida … (bitta o'tish)"""
+    if telegram_length(text) <= limit:
+        return text
+    budget = limit - 1  # … uchun joy
+    for cut, char in enumerate(text):
+        budget -= 2 if ord(char) > 0xFFFF else 1
+        if budget < 0:
+            return text[:cut] + "…"
+    return text
+
+
+class _TelegramHTML(HTMLParser):
+    """Telegram HTML qoidalari: ruxsat etilgan teglar, yopilish tartibi, entity lar"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack: List[str] = []
+        self.visible: List[str] = []
+
+    def error(self, message: str):
+        raise HTTPException(400, f"HTML xato: {message}")
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in ALLOWED_TAGS:
+            self.error(f"<{tag}> tegi qo'llanmaydi")
+        if tag == "a" and not dict(attrs).get("href"):
+            self.error("<a> uchun href kerak")
+        if tag == "span" and dict(attrs).get("class") != "tg-spoiler":
+            self.error('<span> faqat class="tg-spoiler" bilan')
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack[-1] != tag:
+            self.error(f"</{tag}> ochilgan tegga mos emas")
+        self.stack.pop()
+
+    def handle_data(self, data):
+        if "<" in data or "&" in data:
+            self.error("< va & belgilari &lt; / &amp; ko'rinishida yozilishi kerak")
+        self.visible.append(data)
+
+    def handle_entityref(self, name):
+        if name not in ALLOWED_ENTITIES:
+            self.error(f"&{name}; qo'llanmaydi")
+        self.visible.append(ALLOWED_ENTITIES[name])
+
+    def handle_charref(self, name):
+        try:
+            code = int(name[1:], 16) if name[:1] in ("x", "X") else int(name)
+            self.visible.append(chr(code))
+        except (ValueError, OverflowError):
+            self.error(f"&#{name}; noto'g'ri")
+
+    def handle_comment(self, data):
+        self.error("izohlar qo'llanmaydi")
+
+    handle_decl = handle_pi = handle_comment
+
+
+def check_telegram_html(text: str):
+    """Admin HTML - Telegram qabul qilmaydigan matn broadcast yaratilmasdan rad etiladi"""
+    parser = _TelegramHTML()
+    if _BARE_AMP_RE.search(text):
+        parser.error("< va & belgilari &lt; / &amp; ko'rinishida yozilishi kerak")
+    parser.feed(text)
+    parser.close()
+    if parser.rawdata:
+        parser.error("yopilmagan teg")
+    if parser.stack:
+        parser.error(f"<{parser.stack[-1]}> yopilmagan")
+    visible = "".join(parser.visible)
+    if not visible.strip():
+        raise HTTPException(400, "Xabar matni bo'sh")
+    if telegram_length(visible) > MAX_TEXT_LENGTH:
+        raise HTTPException(
+            400, f"Xabar juda uzun: {telegram_length(visible)} belgi (maksimal {MAX_TEXT_LENGTH})"
+        )
+
+
+def create_broadcast(
+    db: AsyncSession, admin: User, text: str, audience: str = "all", news_id: Optional[int] = None
+) -> Broadcast:
+    """Commit qilmaydi - chaqiruvchi commit dan keyin broadcast_sender.notify()"""
+    if audience not in AUDIENCES:
+        raise HTTPException(400, f"audience: {', '.join(AUDIENCES)}")
+    if not bot_notifier.enabled:
+        raise HTTPException(503, "BOT_TOKEN sozlanmagan")
+    check_telegram_html(text)
+    broadcast = Broadcast(text=text, audience=audience, news_id=news_id, created_by=admin.id)
+    db.add(broadcast)
+    return broadcast
+
+
+def news_broadcast_text(news: News) -> str:
+    """Xom matn escape dan oldin kesiladi - entity (&amp;) yarmida uzilmaydi"""
+    prefix = "📢 "
+    title = _truncate(news.title, MAX_TEXT_LENGTH - telegram_length(prefix))
+    text = f"{prefix}<b>{html.escape(title)}</b>"
+    if news.content:
+        room = MAX_TEXT_LENGTH - telegram_length(prefix + title + "\n\n")
+        if room > 1:
+            text += f"\n\n{html.escape(_truncate(news.content, room))}"
+    return text
+
+
+class BroadcastSender:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    async def start(self):
+        """bot_notifier.start() dan keyin - pending/running broadcastlar davom ettiriladi"""
+        if not bot_notifier.enabled:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self):
+        """Yangi broadcast yaratildi"""
+        self._wake.set()
+
+    async def _next(self) -> Optional[int]:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Broadcast.id)
+                .where(Broadcast.status.in_(ACTIVE_STATUSES))
+                .order_by(Broadcast.id)
+                .limit(1)
+            )
+            return result.scalar_one_or_none()
+
+    async def _loop(self):
+        while True:
+            self._wake.clear()
+            broadcast_id = await self._next()
+            if broadcast_id is None:
+                await self._wake.wait()
+                continue
+            try:
+                await self._run(broadcast_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Broadcast #{broadcast_id} xatosi: {e}")
+                async with async_session() as db:
+                    await db.execute(
+                        update(Broadcast).where(Broadcast.id == broadcast_id).values(last_error=str(e)[:500])
+                    )
+                    await db.commit()
+                await asyncio.sleep(ERROR_RETRY_SEC)
+
+    async def _deliver(self, semaphore: asyncio.Semaphore, chat_id: int, text: str) -> Tuple[str, Optional[str]]:
+        async with semaphore:
+            try:
+                await bot_notifier.send(chat_id, text)
+                return "delivered", None
+            except httpx.HTTPStatusError as e:
+                # 403 - botni bloklagan / hech qachon start bosmagan
+                status = "blocked" if e.response.status_code == 403 else "failed"
+                return status, e.response.text[:300]
+            except httpx.HTTPError as e:
+                return "failed", str(e)[:300]
+
+    async def _run(self, broadcast_id: int):
+        async with async_session() as db:
+            broadcast = await db.get(Broadcast, broadcast_id)
+            conditions = recipient_filters(broadcast.audience)
+            if broadcast.status == "pending":
+                result = await db.execute(select(func.count(User.id)).where(*conditions))
+                broadcast.total = result.scalar() or 0
+                broadcast.status = "running"
+                broadcast.started_at = datetime.utcnow()
+                await db.commit()
+            text, last_user_id = broadcast.text, broadcast.last_user_id or 0
+
+        semaphore = asyncio.Semaphore(settings.BROADCAST_CONCURRENCY)
+        while True:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(User.id, User.telegram_id)
+                    .where(User.id > last_user_id, *conditions)
+                    .order_by(User.id)
+                    .limit(PAGE_SIZE)
+                )
+                page = result.all()
+            if not page:
+                break
+
+            outcomes = await asyncio.gather(*(
+                self._deliver(semaphore, row.telegram_id, text) for row in page
+            ))
+            last_user_id = page[-1].id
+            statuses = [status for status, _ in outcomes]
+            errors = [error for _, error in outcomes if error]
+            values = {
+                "last_user_id": last_user_id,
+                "delivered": Broadcast.delivered + statuses.count("delivered"),
+                "failed": Broadcast.failed + statuses.count("failed") + statuses.count("blocked"),
+                "blocked": Broadcast.blocked + statuses.count("blocked"),
+            }
+            if errors:
+                values["last_error"] = errors[-1]
+
+            async with async_session() as db:
+                result = await db.execute(
+                    update(Broadcast)
+                    .where(Broadcast.id == broadcast_id, Broadcast.status == "running")
+                    .values(**values)
+                )
+                await db.commit()
+            if result.rowcount == 0:
+                # Admin bekor qildi
+                return
+
+        async with async_session() as db:
+            await db.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id, Broadcast.status == "running")
+                .values(status="done", finished_at=datetime.utcnow())
+            )
+            await db.commit()
+        print(f"📣 Broadcast #{broadcast_id} yakunlandi")
+
+
+def broadcast_dict(broadcast: Broadcast) -> dict:
+    return {
+        "id": broadcast.id,
+        "text": broadcast.text,
+        "audience": broadcast.audience,
+        "news_id": broadcast.news_id,
+        "status": broadcast.status,
+        "total": broadcast.total,
+        "delivered": broadcast.delivered,
+        "failed": broadcast.failed,
+        "blocked": broadcast.blocked,
+        "last_error": broadcast.last_error,
+        "created_at": broadcast.created_at.isoformat() if broadcast.created_at else None,
+        "started_at": broadcast.started_at.isoformat() if broadcast.started_at else None,
+        "finished_at": broadcast.finished_at.isoformat() if broadcast.finished_at else None,
+    }
+
+
+broadcast_sender = BroadcastSender()
@@ -0,0 +1,210 @@
+"""
+AI chat memory - kontekstni server tomonda yig'ish
+
+Context = rolling summary of older turns + the newest stored messages that
+fit the token budget. Messages are read newest-first with a keyset query on
+(user_id, lesson_id, created_at), so cost does not grow with history length.
+"""
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import select, and_, or_, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.ai_chat import AIChatHistory, AIChatSummary
+from app.services.ai_client import ai_client
+from app.services.ai_usage import ai_usage
+
+PAGE_SIZE = 20
+SUMMARY_MAX_TOKENS = 512
+
+SUMMARY_SYSTEM = (
+    "Siz suhbat xulosasini yozuvchi yordamchisiz. "
+    "Foydalanuvchi va AI yordamchi o'rtasidagi suhbatning muhim faktlari, savollari "
+    "va berilgan tushuntirishlarini qisqa qilib o'zbek tilida yozing. "
+    "Faqat xulosa matnini qaytaring."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Taxminiy token soni (~4 belgi = 1 token)"""
+    return len(text) // 4 + 4
+
+
+def conversation_filter(user_id: int, lesson_id: Optional[int]):
+    if lesson_id is None:
+        return and_(AIChatHistory.user_id == user_id, AIChatHistory.lesson_id.is_(None))
+    return and_(AIChatHistory.user_id == user_id, AIChatHistory.lesson_id == lesson_id)
+
+
+def keyset_before(created_at: datetime, message_id: int):
+    """(created_at, id) dan oldingi xabarlar"""
+    return or_(
+        AIChatHistory.created_at < created_at,
+        and_(AIChatHistory.created_at == created_at, AIChatHistory.id < message_id)
+    )
+
+
+async def get_summary(db: AsyncSession, user_id: int, lesson_id: Optional[int]) -> Optional[AIChatSummary]:
+    lesson_cond = AIChatSummary.lesson_id.is_(None) if lesson_id is None else AIChatSummary.lesson_id == lesson_id
+    result = await db.execute(
+        select(AIChatSummary).where(and_(AIChatSummary.user_id == user_id, lesson_cond))
+    )
+    return result.scalar_one_or_none()
+
+
+async def load_window(
+    db: AsyncSession,
+    user_id: int,
+    lesson_id: Optional[int],
+    budget: int,
+    after_id: int = 0
+) -> List[AIChatHistory]:
+    """
+    Budjetga sig'adigan eng yangi xabarlar (eskidan yangiga tartibda)
+    after_id - summary qamrab olgan xabarlar o'tkazib yuboriladi
+    """
+    window: List[AIChatHistory] = []
+    used = 0
+    cursor: Optional[Tuple[datetime, int]] = None
+
+    while True:
+        query = (
+            select(AIChatHistory)
+            .where(conversation_filter(user_id, lesson_id), AIChatHistory.id > after_id)
+            .order_by(desc(AIChatHistory.created_at), desc(AIChatHistory.id))
+            .limit(PAGE_SIZE)
+        )
+        if cursor:
+            query = query.where(keyset_before(*cursor))
+        page = (await db.execute(query)).scalars().all()
+
+        for msg in page:
+            cost = estimate_tokens(msg.content)
+            if used + cost > budget:
+                return _oldest_first(window)
+            used += cost
+            window.append(msg)
+
+        if len(page) < PAGE_SIZE:
+            return _oldest_first(window)
+        cursor = (page[-1].created_at, page[-1].id)
+
+
+def _oldest_first(window: List[AIChatHistory]) -> List[AIChatHistory]:
+    window.reverse()
+    # Anthropic API: birinchi xabar "user" bo'lishi kerak
+    while window and window[0].role != "user":
+        window.pop(0)
+    return window
+
+
+async def build_context(
+    db: AsyncSession,
+    user_id: int,
+    lesson_id: Optional[int],
+    message: str,
+    budget: Optional[int] = None
+) -> Tuple[Optional[str], list]:
+    """
+    Returns: (summary yoki None, messages - oxirida yangi user xabari)
+    """
+    budget = budget or settings.AI_CONTEXT_TOKEN_BUDGET
+    budget -= estimate_tokens(message)
+
+    summary = await get_summary(db, user_id, lesson_id)
+    after_id = 0
+    summary_text = None
+    if summary:
+        summary_text = summary.summary
+        after_id = summary.covered_until_id
+        budget -= estimate_tokens(summary_text)
+
+    window = await load_window(db, user_id, lesson_id, max(budget, 0), after_id)
+    messages = [{"role": m.role, "content": m.content} for m in window]
+    messages.append({"role": "user", "content": message})
+    return summary_text, messages
+
+
+# ─── Rolling summary ──────────────────────────────────────────────────────────
+
+_running: Set[Tuple[int, Optional[int]]] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+def schedule_summary_refresh(user_id: int, lesson_id: Optional[int]):
+    """Javob qaytgandan keyin fonda summary ni yangilash"""
+    key = (user_id, lesson_id)
+    if key in _running or not ai_client.enabled:
+        return
+    _running.add(key)
+    task = asyncio.create_task(_refresh_summary(user_id, lesson_id))
+    _tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _tasks.discard(t)
+        _running.discard(key)
+        if not t.cancelled() and t.exception():
+            print(f"⚠️ Chat summary xatosi (user {user_id}): {t.exception()}")
+
+    task.add_done_callback(_done)
+
+
+async def _refresh_summary(user_id: int, lesson_id: Optional[int]):
+    async with async_session() as db:
+        summary = await get_summary(db, user_id, lesson_id)
+        after_id = summary.covered_until_id if summary else 0
+        budget = settings.AI_CONTEXT_TOKEN_BUDGET
+        if summary:
+            budget -= estimate_tokens(summary.summary)
+
+        window = await load_window(db, user_id, lesson_id, max(budget, 0), after_id)
+        window_start = window[0].id if window else None
+
+        # Oynadan tashqarida qolgan, hali xulosa qilinmagan xabarlar
+        query = (
+            select(AIChatHistory)
+            .where(conversation_filter(user_id, lesson_id), AIChatHistory.id > after_id)
+            .order_by(AIChatHistory.created_at, AIChatHistory.id)
+            .limit(settings.AI_SUMMARY_BATCH)
+        )
+        if window_start is not None:
+            query = query.where(AIChatHistory.id < window_start)
+        dropped = (await db.execute(query)).scalars().all()
+        if len(dropped) < settings.AI_SUMMARY_MIN_MESSAGES:
+            return
+
+        transcript = "\n".join(
+            f"{'Foydalanuvchi' if m.role == 'user' else 'AI'}: {m.content}" for m in dropped
+        )
+        prompt = ""
+        if summary:
+            prompt += f"Oldingi xulosa:\n{summary.summary}\n\n"
+        prompt += f"Yangi xabarlar:\n{transcript}\n\nYangilangan xulosani yozing."
+
+        data = await ai_client.post_messages({
+            "model": settings.AI_MODEL,
+            "max_tokens": SUMMARY_MAX_TOKENS,
+            "system": SUMMARY_SYSTEM,
+            "messages": [{"role": "user", "content": prompt}]
+        })
+        ai_usage.record_response(user_id, data.get("usage"))
+        if not data.get("content"):
+            return
+        text = data["content"][0]["text"]
+
+        if summary:
+            summary.summary = text
+            summary.covered_until_id = dropped[-1].id
+        else:
+            db.add(AIChatSummary(
+                user_id=user_id,
+                lesson_id=lesson_id,
+                summary=text,
+                covered_until_id=dropped[-1].id
+            ))
+        await db.commit()
+
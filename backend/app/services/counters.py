@@ -0,0 +1,111 @@
+"""
+Buffered counters - DB ga har bir o'qishda yozmaslik uchun
+
+Increments are absorbed in memory and written periodically as a single
+``UPDATE ... SET col = col + CASE id WHEN ... END`` statement per counter.
+"""
+import threading
+from typing import Dict, List
+
+from sqlalchemy import update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+
+
+class CounterBuffer:
+    """
+    In-memory sharded counter aggregator
+
+    Usage:
+        news_views = CounterBuffer(News, "views_count")
+        news_views.incr(news.id)
+        news.views_count + news_views.pending(news.id)
+    """
+
+    SHARDS = 16
+
+    def __init__(self, model, column: str, shards: int = SHARDS):
+        self.model = model
+        self.column = column
+        self._shards: List[Dict[int, int]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        # Flush paytida yozilayotgan qiymatlar (commit bo'lguncha o'qishda hisobga olinadi)
+        self._inflight: Dict[int, int] = {}
+        _registry.append(self)
+
+    def _shard(self, key: int) -> int:
+        return hash(key) % len(self._shards)
+
+    def incr(self, key: int, amount: int = 1) -> None:
+        """Hisoblagichni oshirish (DB ga yozmasdan)"""
+        i = self._shard(key)
+        with self._locks[i]:
+            shard = self._shards[i]
+            shard[key] = shard.get(key, 0) + amount
+
+    def pending(self, key: int) -> int:
+        """DB ga hali yozilmagan qiymat"""
+        i = self._shard(key)
+        with self._locks[i]:
+            return self._shards[i].get(key, 0) + self._inflight.get(key, 0)
+
+    def _drain(self) -> Dict[int, int]:
+        drained: Dict[int, int] = {}
+        for i, lock in enumerate(self._locks):
+            with lock:
+                shard = self._shards[i]
+                self._shards[i] = {}
+            drained.update(shard)
+        return drained
+
+    def _restore(self, deltas: Dict[int, int]) -> None:
+        for key, amount in deltas.items():
+            self.incr(key, amount)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        Barcha pending qiymatlarni bitta UPDATE bilan yozish
+        Returns: yangilangan qatorlar soni
+        """
+        if self._inflight:
+            # Oldingi flush hali tugamagan
+            return 0
+        deltas = self._drain()
+        if not deltas:
+            return 0
+        self._inflight = deltas
+
+        pk = self.model.id
+        col = getattr(self.model, self.column)
+        try:
+            await db.execute(
+                update(self.model)
+                .where(pk.in_(list(deltas)))
+                .values({self.column: col + case(deltas, value=pk, else_=0)})
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # Keyingi flush da qayta urinamiz
+            self._inflight = {}
+            self._restore(deltas)
+            raise
+        self._inflight = {}
+        return len(deltas)
+
+
+_registry: List[CounterBuffer] = []
+
+
+async def flush_all_counters():
+    """Barcha hisoblagichlarni DB ga yozish (scheduler va shutdown uchun)"""
+    if not any(any(c._shards) for c in _registry):
+        return
+    async with async_session() as db:
+        for counter in _registry:
+            try:
+                await counter.flush(db)
+            except Exception as e:
+                print(f"⚠️ Counter flush xatosi ({counter.model.__tablename__}.{counter.column}): {e}")
@@ -0,0 +1,427 @@
+"""
+Course package - JSONL / ZIP import va eksport
+
+A package is JSON Lines, one record per line, parents before children::
+
+    {"type": "package", "version": 1}
+    {"type": "module", "ref": "m1", "title": "..."}
+    {"type": "lesson", "ref": "l1", "module": "m1", "title": "..."}
+    {"type": "quiz", "ref": "q1", "lesson": "l1", "title": "..."}
+    {"type": "question", "quiz": "q1", "id": 7, "question_text": "...", "options": [...], "correct_answer": "..."}
+
+or a ZIP holding ``course.jsonl``. ``ref`` links records inside the package;
+an optional ``id`` makes the record an update of that row (``mode="upsert"``).
+The whole package is validated before anything is written, then applied in
+one transaction with chunked multi-row INSERT ... RETURNING / bulk UPDATE by
+primary key. A quiz present in the package gets exactly the package's
+questions: questions with a known ``id`` are updated in place (ids, battle
+answers and ``battles.question_ids`` stay valid), new ones are inserted and
+only the questions missing from the package are deleted. Export streams the
+same format back out.
+"""
+import json
+import zipfile
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from sqlalchemy import select, update, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.models.module import Module
+from app.models.lesson import Lesson
+from app.models.quiz import Quiz, Question
+
+PACKAGE_VERSION = 1
+PACKAGE_ENTRY = "course.jsonl"
+CHUNK_ROWS = 500
+MAX_ERRORS = 50
+
+
+class PackageError(Exception):
+    def __init__(self, errors: List[str]):
+        super().__init__(errors[0] if errors else "Paket xatosi")
+        self.errors = errors
+
+
+# ─── Records ──────────────────────────────────────────────────────────────────
+
+class ModuleRecord(BaseModel):
+    ref: str
+    id: Optional[int] = None
+    title: str
+    description: Optional[str] = None
+    emoji: str = "📚"
+    image_url: Optional[str] = None
+    order_index: int = 0
+    is_premium: bool = False
+    is_active: bool = True
+
+
+class LessonRecord(BaseModel):
+    ref: str
+    id: Optional[int] = None
+    module: str
+    title: str
+    description: Optional[str] = None
+    content: Optional[str] = None
+    video_url: Optional[str] = None
+    xp_reward: int = 50
+    order_index: int = 0
+    is_premium: bool = False
+    is_active: bool = True
+    duration_min: int = 10
+
+
+class QuizRecord(BaseModel):
+    ref: str
+    id: Optional[int] = None
+    lesson: str
+    title: str
+    description: Optional[str] = None
+    xp_reward: int = 100
+    pass_percentage: int = 70
+    time_limit_sec: int = 300
+
+
+class QuestionRecord(BaseModel):
+    quiz: str
+    id: Optional[int] = None
+    question_text: str
+    question_type: str = "multiple_choice"
+    options: List[str]
+    correct_answer: str
+    explanation: Optional[str] = None
+    order_index: int = 0
+
+    @field_validator("options")
+    @classmethod
+    def _two_options(cls, options: List[str]) -> List[str]:
+        if len(options) < 2:
+            raise ValueError("kamida 2 ta variant kerak")
+        return options
+
+    @model_validator(mode="after")
+    def _answer_in_options(self):
+        if self.correct_answer not in self.options:
+            raise ValueError("correct_answer variantlar ichida bo'lishi kerak")
+        return self
+
+
+RECORD_TYPES = {
+    "module": ModuleRecord,
+    "lesson": LessonRecord,
+    "quiz": QuizRecord,
+    "question": QuestionRecord,
+}
+
+# Yozuv -> ota yozuv turi (ref maydoni)
+PARENTS = {"lesson": ("module", "module"), "quiz": ("lesson", "lesson"), "question": ("quiz", "quiz")}
+
+
+@dataclass
+class CoursePackage:
+    modules: List[ModuleRecord] = field(default_factory=list)
+    lessons: List[LessonRecord] = field(default_factory=list)
+    quizzes: List[QuizRecord] = field(default_factory=list)
+    questions: List[QuestionRecord] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "modules": len(self.modules),
+            "lessons": len(self.lessons),
+            "quizzes": len(self.quizzes),
+            "questions": len(self.questions),
+        }
+
+
+# ─── Parsing ──────────────────────────────────────────────────────────────────
+
+def iter_package_lines(fileobj) -> Iterable[bytes]:
+    """JSONL yoki ZIP (ichida course.jsonl) - qatorma-qator, xotiraga to'liq o'qimasdan"""
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    if head.startswith(b"PK"):
+        try:
+            member = zipfile.ZipFile(fileobj).open(PACKAGE_ENTRY)
+        except (zipfile.BadZipFile, KeyError):
+            raise PackageError([f"ZIP ichida {PACKAGE_ENTRY} topilmadi"])
+        yield from member
+    else:
+        yield from fileobj
+
+
+def parse_package(lines: Iterable[bytes]) -> CoursePackage:
+    """Butun paketni tekshiradi - xatolar bo'lsa PackageError (qator raqamlari bilan)"""
+    package = CoursePackage()
+    targets = {
+        "module": package.modules,
+        "lesson": package.lessons,
+        "quiz": package.quizzes,
+        "question": package.questions,
+    }
+    refs: Dict[str, set] = {"module": set(), "lesson": set(), "quiz": set()}
+    errors: List[str] = []
+
+    for number, line in enumerate(lines, start=1):
+        if len(errors) >= MAX_ERRORS:
+            errors.append("...")
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except UnicodeDecodeError:
+            errors.append(f"{number}-qator: UTF-8 emas")
+            continue
+        except json.JSONDecodeError as e:
+            errors.append(f"{number}-qator: JSON xato ({e.msg})")
+            continue
+        kind = data.pop("type", None) if isinstance(data, dict) else None
+        if kind == "package":
+            if data.get("version") != PACKAGE_VERSION:
+                errors.append(f"{number}-qator: paket versiyasi {PACKAGE_VERSION} bo'lishi kerak")
+            continue
+        if kind not in RECORD_TYPES:
+            errors.append(f"{number}-qator: noma'lum type {kind!r}")
+            continue
+        try:
+            record = RECORD_TYPES[kind](**data)
+        except ValidationError as e:
+            first = e.errors()[0]
+            location = ".".join(str(p) for p in first["loc"]) or kind
+            errors.append(f"{number}-qator: {location} - {first['msg']}")
+            continue
+
+        if kind in PARENTS:
+            parent_kind, attr = PARENTS[kind]
+            if getattr(record, attr) not in refs[parent_kind]:
+                errors.append(f"{number}-qator: {attr} {getattr(record, attr)!r} oldinroq e'lon qilinmagan")
+                continue
+        if kind in refs:
+            if record.ref in refs[kind]:
+                errors.append(f"{number}-qator: {kind} ref {record.ref!r} takrorlangan")
+                continue
+            refs[kind].add(record.ref)
+        targets[kind].append(record)
+
+    if errors:
+        raise PackageError(errors)
+    if not package.modules:
+        raise PackageError(["Paketda modul yo'q"])
+    return package
+
+
+# ─── Import ───────────────────────────────────────────────────────────────────
+
+def _chunks(rows: list, size: int = CHUNK_ROWS) -> Iterable[list]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def _existing_ids(db: AsyncSession, model, records: list, mode: str) -> Set[int]:
+    """Yozuvlardagi id lardan DB da mavjudlari (insert rejimida - hech biri)"""
+    existing: Set[int] = set()
+    wanted = [r.id for r in records if r.id is not None] if mode == "upsert" else []
+    for chunk in _chunks(wanted):
+        result = await db.execute(select(model.id).where(model.id.in_(chunk)))
+        existing.update(result.scalars().all())
+    return existing
+
+
+async def _upsert(db: AsyncSession, model, records: list, values, mode: str) -> Tuple[Dict[str, int], int]:
+    """
+    records -> ({ref: id}, yangi qo'shilganlar soni)
+    id berilgan va mavjud bo'lsa - PK bo'yicha bulk UPDATE, aks holda INSERT ... RETURNING
+    """
+    existing = await _existing_ids(db, model, records, mode)
+    ids: Dict[str, int] = {}
+    updates = [r for r in records if r.id in existing]
+    inserts = [r for r in records if r.id not in existing]
+    for chunk in _chunks(updates):
+        await db.execute(update(model), [{"id": r.id, **values(r)} for r in chunk])
+        ids.update({r.ref: r.id for r in chunk})
+    for chunk in _chunks(inserts):
+        result = await db.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            [values(r) for r in chunk]
+        )
+        ids.update({r.ref: new_id for r, new_id in zip(chunk, result.scalars().all())})
+    return ids, len(inserts)
+
+
+async def _sync_questions(db: AsyncSession, questions: List[QuestionRecord], quiz_ids: Dict[str, int], mode: str):
+    """
+    Paketdagi quizlarning savollari: id bo'yicha UPDATE, yangilari INSERT,
+    paketda yo'qlari DELETE (qolgan savollar id si o'zgarmaydi)
+    """
+    values = lambda q: {**q.model_dump(exclude={"quiz", "id"}), "quiz_id": quiz_ids[q.quiz]}
+    existing = await _existing_ids(db, Question, questions, mode)
+    updates = [q for q in questions if q.id in existing]
+    inserts = [q for q in questions if q.id not in existing]
+
+    kept = {q.id for q in updates}
+    stale: List[int] = []
+    for chunk in _chunks(list(quiz_ids.values())):
+        result = await db.execute(select(Question.id).where(Question.quiz_id.in_(chunk)))
+        stale.extend(qid for qid in result.scalars().all() if qid not in kept)
+    for chunk in _chunks(stale):
+        await db.execute(delete(Question).where(Question.id.in_(chunk)))
+
+    for chunk in _chunks(updates):
+        await db.execute(update(Question), [{"id": q.id, **values(q)} for q in chunk])
+    for chunk in _chunks(inserts):
+        await db.execute(insert(Question), [values(q) for q in chunk])
+
+
+async def import_package(db: AsyncSession, package: CoursePackage, mode: str = "upsert") -> Dict[str, Dict[str, int]]:
+    """
+    Bitta tranzaksiya - xato bo'lsa hech narsa yozilmaydi
+    mode: upsert (id bo'yicha yangilash) | insert (har doim yangi)
+    Dashboard hisoblagichlari va transcode navbati commitdan keyin
+    """
+    from app.services.dashboard_stats import dashboard_stats
+    from app.services.transcode_queue import transcode_queue
+
+    fields = lambda r, skip: r.model_dump(exclude={"ref", "id", *skip})
+    statuses = {r.ref: transcode_queue.initial_status(r.video_url) for r in package.lessons}
+    try:
+        module_ids, new_modules = await _upsert(db, Module, package.modules, lambda r: {
+            **fields(r, ()),
+            "deleted_at": None,
+        }, mode)
+        lesson_ids, new_lessons = await _upsert(db, Lesson, package.lessons, lambda r: {
+            **fields(r, ("module",)),
+            "module_id": module_ids[r.module],
+            "transcode_status": statuses[r.ref],
+            "deleted_at": None,
+        }, mode)
+        quiz_ids, new_quizzes = await _upsert(db, Quiz, package.quizzes, lambda r: {
+            **fields(r, ("lesson",)),
+            "lesson_id": lesson_ids[r.lesson],
+            "is_active": True,
+            "deleted_at": None,
+        }, mode)
+
+        await _sync_questions(db, package.questions, quiz_ids, mode)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    for lesson in package.lessons:
+        if statuses[lesson.ref] == "pending":
+            transcode_queue.enqueue(lesson.video_url)
+    dashboard_stats.bump(modules=new_modules, lessons=new_lessons, quizzes=new_quizzes)
+    return {
+        "total": package.counts(),
+        "created": {"modules": new_modules, "lessons": new_lessons, "quizzes": new_quizzes},
+    }
+
+
+# ─── Export ───────────────────────────────────────────────────────────────────
+
+def _line(kind: str, data: dict) -> str:
+    return json.dumps({"type": kind, **data}, ensure_ascii=False) + "\n"
+
+
+async def iter_course_jsonl(module_ids: List[int]) -> AsyncIterator[str]:
+    """Modullar (kurslar) JSONL - savollar server-side cursor bilan"""
+    yield _line("package", {"version": PACKAGE_VERSION})
+    async with async_session() as db:
+        for module_id in module_ids:
+            module = await db.get(Module, module_id)
+            if not module or module.deleted_at is not None:
+                continue
+            yield _line("module", {
+                "ref": f"module:{module.id}", "id": module.id, "title": module.title,
+                "description": module.description, "emoji": module.emoji, "image_url": module.image_url,
+                "order_index": module.order_index, "is_premium": module.is_premium,
+                "is_active": module.is_active,
+            })
+
+            result = await db.execute(
+                select(Lesson)
+                .where(Lesson.module_id == module.id, Lesson.deleted_at.is_(None))
+                .order_by(Lesson.order_index, Lesson.id)
+            )
+            lessons = result.scalars().all()
+            for lesson in lessons:
+                yield _line("lesson", {
+                    "ref": f"lesson:{lesson.id}", "id": lesson.id, "module": f"module:{module.id}",
+                    "title": lesson.title, "description": lesson.description, "content": lesson.content,
+                    "video_url": lesson.video_url, "xp_reward": lesson.xp_reward,
+                    "order_index": lesson.order_index, "is_premium": lesson.is_premium,
+                    "is_active": lesson.is_active, "duration_min": lesson.duration_min,
+                })
+
+            result = await db.execute(
+                select(Quiz)
+                .where(Quiz.lesson_id.in_([l.id for l in lessons]), Quiz.deleted_at.is_(None))
+                .order_by(Quiz.id)
+            )
+            quizzes = result.scalars().all()
+            for quiz in quizzes:
+                yield _line("quiz", {
+                    "ref": f"quiz:{quiz.id}", "id": quiz.id, "lesson": f"lesson:{quiz.lesson_id}",
+                    "title": quiz.title, "description": quiz.description, "xp_reward": quiz.xp_reward,
+                    "pass_percentage": quiz.pass_percentage, "time_limit_sec": quiz.time_limit_sec,
+                })
+
+            result = await db.stream(
+                select(
+                    Question.id, Question.quiz_id, Question.question_text, Question.question_type, Question.options,
+                    Question.correct_answer, Question.explanation, Question.order_index,
+                )
+                .where(Question.quiz_id.in_([q.id for q in quizzes]))
+                .order_by(Question.quiz_id, Question.order_index, Question.id)
+                .execution_options(yield_per=CHUNK_ROWS)
+            )
+            async for rows in result.partitions():
+                yield "".join(
+                    _line("question", {
+                        "quiz": f"quiz:{row.quiz_id}", "id": row.id, "question_text": row.question_text,
+                        "question_type": row.question_type, "options": row.options,
+                        "correct_answer": row.correct_answer, "explanation": row.explanation,
+                        "order_index": row.order_index,
+                    })
+                    for row in rows
+                )
+
+
+class _ZipSink:
+    """Seek qilinmaydigan chiqish - zipfile yozganini bo'laklab olish uchun"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def iter_course_zip(module_ids: List[int]) -> AsyncIterator[bytes]:
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(PACKAGE_ENTRY, "w", force_zip64=True) as entry:
+            async for text in iter_course_jsonl(module_ids):
+                entry.write(text.encode("utf-8"))
+                data = sink.drain()
+                if data:
+                    yield data
+    yield sink.drain()
@@ -0,0 +1,112 @@
+"""
+Admin dashboard statistics - in-memory snapshot
+
+All counters are read with one compound query (a single pass over ``users``
+plus scalar subqueries for content, pending payments and revenue) into a
+snapshot that the dashboard endpoint serves from memory. Code paths that
+change a counter bump it after their commit; changes whose effect is not
+known up front (cascading deletes) mark the snapshot dirty instead, so the
+next read recomputes it. The scheduler reconciles the snapshot periodically,
+which also corrects a bump lost to a concurrent refresh. ``active_today`` is
+not a counter: it is counted on every read from the ``last_activity`` index,
+so it keeps the exact ``last_activity >= today`` semantics.
+"""
+import asyncio
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select, func
+
+from app.database import async_session
+from app.models.user import User
+from app.models.module import Module
+from app.models.lesson import Lesson
+from app.models.quiz import Quiz
+from app.models.payment import Payment
+from app.models.revenue import RevenueMonthly
+
+COUNTERS = (
+    "users_total", "users_premium",
+    "modules", "lessons", "quizzes",
+    "payments_pending", "revenue",
+)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+class DashboardStats:
+    def __init__(self):
+        self._counts: Optional[Dict[str, int]] = None
+        self._dirty = False
+        self._refreshed_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        """Bitta so'rov bilan barcha hisoblagichlar"""
+        async with self._lock:
+            users = select(
+                func.count(User.id).label("total"),
+                func.count(User.id).filter(User.is_premium == True).label("premium"),
+            ).subquery()
+            stmt = select(
+                users.c.total,
+                users.c.premium,
+                select(func.count(Module.id)).where(Module.deleted_at.is_(None)).scalar_subquery(),
+                select(func.count(Lesson.id)).where(Lesson.deleted_at.is_(None)).scalar_subquery(),
+                select(func.count(Quiz.id)).where(Quiz.deleted_at.is_(None)).scalar_subquery(),
+                select(func.count(Payment.id)).where(Payment.status == "pending").scalar_subquery(),
+                select(func.coalesce(func.sum(RevenueMonthly.revenue), 0)).scalar_subquery(),
+            )
+            self._dirty = False
+            async with async_session() as db:
+                row = (await db.execute(stmt)).one()
+            self._counts = {name: value or 0 for name, value in zip(COUNTERS, row)}
+            self._refreshed_at = datetime.utcnow()
+
+    def bump(self, **deltas: int):
+        """Commit dan keyin: bump(users_total=1), bump(payments_pending=-3, revenue=...)"""
+        if self._counts is None:
+            return
+        for name, delta in deltas.items():
+            self._counts[name] += delta
+
+    def invalidate(self):
+        """Ta'siri oldindan noma'lum o'zgarish (cascade delete) - keyingi o'qishda qayta hisoblanadi"""
+        self._dirty = True
+
+    async def _active_today(self) -> int:
+        """Bugun faol bo'lganlar - ix_users_last_activity bo'yicha diapazon"""
+        today_start = _day_start(datetime.utcnow().date())
+        async with async_session() as db:
+            return await db.scalar(
+                select(func.count(User.id)).where(User.last_activity >= today_start)
+            ) or 0
+
+    async def snapshot(self) -> dict:
+        if self._counts is None or self._dirty:
+            await self.refresh()
+        active_today = await self._active_today()
+        c = self._counts
+        return {
+            "users": {
+                "total": c["users_total"],
+                "premium": c["users_premium"],
+                "free": c["users_total"] - c["users_premium"],
+                "active_today": active_today
+            },
+            "content": {
+                "modules": c["modules"],
+                "lessons": c["lessons"],
+                "quizzes": c["quizzes"]
+            },
+            "payments": {
+                "pending": c["payments_pending"],
+                "total_revenue": c["revenue"]
+            },
+            "refreshed_at": self._refreshed_at.isoformat()
+        }
+
+
+dashboard_stats = DashboardStats()
@@ -0,0 +1,205 @@
+"""
+AI explain cache - xotiradagi LRU + SQLite jadval
+
+Key = sha256(prompt_version | lesson_id | normalized text). Concurrent misses
+for the same key share one upstream call (single-flight).
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select, delete, desc
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import settings
+from app.database import async_session
+from app.models.ai_chat import AIExplainCache
+
+
+def normalize_text(text: str) -> str:
+    """Bo'sh joylar va registr farqini olib tashlash"""
+    return " ".join(text.split()).casefold()
+
+
+class ExplainCache:
+    """Two-tier TTL cache for AI explanations"""
+
+    def __init__(self, prompt_version: str, max_entries: int, ttl_sec: int, db_max_entries: int):
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.db_max_entries = db_max_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self._miss_latency_total = 0.0
+
+    def make_key(self, text: str, lesson_id: Optional[int]) -> str:
+        raw = f"{self.prompt_version}|{lesson_id or 0}|{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ─── Memory tier ──────────────────────────────────────────────────────────
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl_sec:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: str, stored_at: Optional[float] = None):
+        self._memory[key] = (stored_at or time.time(), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ─── Public API ───────────────────────────────────────────────────────────
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._memory_get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_sec)
+        async with async_session() as db:
+            result = await db.execute(
+                select(AIExplainCache.response, AIExplainCache.created_at)
+                .where(
+                    AIExplainCache.cache_key == key,
+                    AIExplainCache.created_at >= cutoff
+                )
+            )
+            row = result.first()
+        if row is None:
+            return None
+
+        self.db_hits += 1
+        stored_at = time.time() - (datetime.utcnow() - row.created_at).total_seconds()
+        self._memory_set(key, row.response, stored_at)
+        return row.response
+
+    async def put(self, key: str, lesson_id: Optional[int], value: str):
+        self._memory_set(key, value)
+        stmt = sqlite_insert(AIExplainCache).values(
+            cache_key=key,
+            lesson_id=lesson_id,
+            prompt_version=self.prompt_version,
+            response=value,
+            created_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AIExplainCache.cache_key],
+            set_={"response": stmt.excluded.response, "created_at": stmt.excluded.created_at}
+        )
+        async with async_session() as db:
+            await db.execute(stmt)
+            await db.commit()
+
+    async def get_or_load(
+        self,
+        key: str,
+        lesson_id: Optional[int],
+        loader: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Keshdan olish yoki loader() orqali yaratish
+
+        Bir xil key uchun parallel so'rovlar bitta upstream chaqiruvni kutadi.
+        Loader alohida task da ishlaydi - birinchi klient uzilsa ham boshqalar
+        natijani oladi va u keshga yoziladi. Xatolar keshlanmaydi.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._load(key, lesson_id, loader))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, lesson_id: Optional[int], loader) -> str:
+        started = time.monotonic()
+        try:
+            value = await loader()
+            self._memory_set(key, value)
+        finally:
+            self._inflight.pop(key, None)
+        self.misses += 1
+        self._miss_latency_total += time.monotonic() - started
+        try:
+            await self.put(key, lesson_id, value)
+        except Exception as e:
+            # Javob tayyor va xotirada - DB yozilmasa ham so'rov muvaffaqiyatli
+            print(f"⚠️ AI explain cache DB ga yozilmadi: {e}")
+        return value
+
+    async def prune(self) -> int:
+        """DB dagi eskirgan va limitdan ortiq yozuvlarni o'chirish"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_sec)
+        async with async_session() as db:
+            expired = await db.execute(
+                delete(AIExplainCache).where(AIExplainCache.created_at < cutoff)
+            )
+            overflow_ids = (
+                select(AIExplainCache.id)
+                .order_by(desc(AIExplainCache.created_at))
+                .offset(self.db_max_entries)
+                .scalar_subquery()
+            )
+            overflow = await db.execute(
+                delete(AIExplainCache).where(AIExplainCache.id.in_(overflow_ids))
+            )
+            await db.commit()
+        return (expired.rowcount or 0) + (overflow.rowcount or 0)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.db_hits + self.coalesced
+        total = hits + self.misses
+        avg_latency = self._miss_latency_total / self.misses if self.misses else 0.0
+        return {
+            "prompt_version": self.prompt_version,
+            "memory_entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "avg_upstream_latency_sec": round(avg_latency, 3),
+            "saved_latency_sec": round(hits * avg_latency, 1),
+        }
+
+
+# Prompt o'zgarsa versiyani oshiring - eski kesh avtomatik ishlatilmay qoladi
+EXPLAIN_PROMPT_VERSION = "v1"
+
+explain_cache = ExplainCache(
+    prompt_version=EXPLAIN_PROMPT_VERSION,
+    max_entries=settings.AI_CACHE_MAX_ENTRIES,
+    ttl_sec=settings.AI_CACHE_TTL_SEC,
+    db_max_entries=settings.AI_CACHE_DB_MAX_ENTRIES,
+)
+
+
+async def prune_explain_cache():
+    """Scheduler job"""
+    removed = await explain_cache.prune()
+    if removed:
+        print(f"🧹 AI explain cache: {removed} ta yozuv o'chirildi")
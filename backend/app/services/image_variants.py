@@ -0,0 +1,258 @@
+"""
+Image variants - resize/WebP on demand, size-bounded disk LRU
+
+Variants are keyed by (source, width, format). Widths snap to a fixed ladder,
+so the number of variants per image is bounded. Pillow runs in a thread pool
+because decode/resize/encode release the GIL. The on-disk cache is indexed in
+memory (OrderedDict in access order) and the least recently used files are
+evicted once the total exceeds ``IMAGE_CACHE_MAX_MB``. Telegram avatars are
+fetched once, stored in the same cache and resized from the local copy.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.config import settings
+
+WIDTHS = (64, 96, 128, 192, 256, 384, 512, 768, 1024)
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "jfif", "png", "gif", "webp"}
+AVATAR_HOSTS = ("t.me", "telegram.org", "telegram-cdn.org", "cdn-telegram.org")
+AVATAR_MAX_BYTES = 5 * 1024 * 1024
+AVATAR_MAX_REDIRECTS = 3
+
+
+def snap_width(width: int) -> int:
+    for step in WIDTHS:
+        if width <= step:
+            return step
+    return WIDTHS[-1]
+
+
+def _render(src: str, dst: str, width: int, fmt: str):
+    """Blocking - thread pool ichida"""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(src) as im:
+            im.seek(0)  # GIF/animated WebP - birinchi kadr
+            im = ImageOps.exif_transpose(im)
+            if fmt == "jpeg":
+                if im.mode != "RGB":
+                    im = im.convert("RGB")
+            elif im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA")
+            if im.width > width:
+                height = max(1, round(im.height * width / im.width))
+                im = im.resize((width, height), Image.LANCZOS)
+            if fmt == "webp":
+                im.save(dst, "WEBP", quality=80, method=4)
+            else:
+                im.save(dst, "JPEG", quality=82, optimize=True, progressive=True)
+    except Image.DecompressionBombError as e:
+        # Endpoint OSError ni 415 ga aylantiradi
+        raise OSError(str(e))
+
+
+def is_avatar_url(url: Optional[str]) -> bool:
+    """Faqat Telegram https rasmlari proxy qilinadi (ixtiyoriy URL - SSRF)"""
+    if not url:
+        return False
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    return parsed.scheme == "https" and any(host == h or host.endswith("." + h) for h in AVATAR_HOSTS)
+
+
+def avatar_url(user_id: int, photo_url: Optional[str], width: int = 96) -> Optional[str]:
+    """API javoblari uchun: Telegram avatar -> lokal proxy URL"""
+    if is_avatar_url(photo_url):
+        return f"api/media/avatar/{user_id}?w={width}&fmt=webp"
+    return photo_url
+
+
+class ImageVariantCache:
+    def __init__(self, cache_dir: str, max_bytes: int, workers: int = 2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> size
+        self._total = 0
+        self._loaded = False
+        self._loading: Optional[asyncio.Future] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ─── LRU index ────────────────────────────────────────────────────────────
+
+    def _scan(self) -> list:
+        """Blocking - diskdagi fayllar (thread ichida)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_atime, path, stat.st_size))
+        return files
+
+    async def _ensure_loaded(self):
+        """Restartdan keyin diskdagi fayllar (eng eski atime birinchi) - skan event loop dan tashqarida"""
+        if self._loaded:
+            return
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(asyncio.to_thread(self._scan))
+        files = await asyncio.shield(self._loading)
+        if self._loaded:
+            return
+        self._loaded = True
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._total += size
+        self._evict()
+
+    def _touch(self, path: str) -> bool:
+        if path in self._entries:
+            self._entries.move_to_end(path)
+            return True
+        return False
+
+    def _add(self, path: str):
+        size = os.path.getsize(path)
+        self._total += size - self._entries.get(path, 0)
+        self._entries[path] = size
+        self._entries.move_to_end(path)
+        self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{ext}")
+
+    async def _single_flight(self, path: str, factory) -> str:
+        await self._ensure_loaded()
+        if self._touch(path):
+            self.hits += 1
+            return path
+        task = self._inflight.get(path)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(factory())
+            self._inflight[path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(path, None))
+        await asyncio.shield(task)
+        return path
+
+    # ─── Variants ─────────────────────────────────────────────────────────────
+
+    async def variant(self, source_key: str, source_path: str, width: int, fmt: str) -> str:
+        """Tayyor variant fayl yo'li (kerak bo'lsa yaratadi)"""
+        path = self._path(f"{source_key}_{width}", fmt)
+
+        async def build():
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="img")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._executor, _render, source_path, tmp, width, fmt)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._add(path)
+
+        return await self._single_flight(path, build)
+
+    async def avatar_variant(self, photo_url: str, width: int, fmt: str) -> str:
+        """Telegram avatar varianti (manba bir marta yuklanadi)"""
+        key = f"avatar_{hashlib.sha256(photo_url.encode('utf-8')).hexdigest()}"
+        source = await self._avatar_source(key, photo_url)
+        return await self.variant(key, source, width, fmt)
+
+    async def _avatar_source(self, key: str, photo_url: str) -> str:
+        path = self._path(key, "src")
+
+        async def fetch():
+            if self._http is None:
+                # Redirectlar qo'lda - har bir qadam AVATAR_HOSTS bo'yicha qayta tekshiriladi (SSRF)
+                self._http = httpx.AsyncClient(timeout=10.0, follow_redirects=False)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            url = photo_url
+            try:
+                for _ in range(AVATAR_MAX_REDIRECTS + 1):
+                    async with self._http.stream("GET", url) as response:
+                        if response.is_redirect:
+                            url = str(response.url.join(response.headers["location"]))
+                            if not is_avatar_url(url):
+                                raise ValueError("Avatar redirect ruxsat etilmagan hostga")
+                            continue
+                        response.raise_for_status()
+                        size = 0
+                        with open(tmp, "wb") as f:
+                            async for chunk in response.aiter_bytes():
+                                size += len(chunk)
+                                if size > AVATAR_MAX_BYTES:
+                                    raise ValueError("Avatar juda katta")
+                                f.write(chunk)
+                        break
+                else:
+                    raise ValueError("Avatar redirectlari juda ko'p")
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._add(path)
+
+        return await self._single_flight(path, fetch)
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def stats(self) -> dict:
+        await self._ensure_loaded()
+        return {
+            "entries": len(self._entries),
+            "total_mb": round(self._total / 1024 / 1024, 1),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+image_cache = ImageVariantCache(
+    cache_dir=settings.IMAGE_CACHE_DIR,
+    max_bytes=settings.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    workers=settings.IMAGE_WORKERS,
+)
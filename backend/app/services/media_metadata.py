@@ -0,0 +1,98 @@
+"""
+Media metadata - process pool + fayl hash bo'yicha kesh
+
+Extraction runs in a small spawn-context process pool, so parsing a large
+PDF or probing audio never blocks the event loop. Results are cached on the
+``media_blobs`` row (``meta``), so a file is probed once no matter how many
+times it is uploaded or attached. Concurrent requests for the same blob share
+one extraction. An extracted cover image is stored as its own media blob.
+"""
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from app.config import settings
+from app.database import async_session
+from app.models.media_blob import MediaBlob
+from app.services.media_probe import extract_metadata
+from app.services.media_store import hash_from_url, store_blob
+from app.services.uploads import TMP_DIR, hash_file
+
+# Admin create endpointlariga qaytariladigan maydonlar
+META_FIELDS = ("duration_sec", "bitrate_kbps", "pages", "cover_url")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[str, "asyncio.Task[Dict]"] = {}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.MEDIA_METADATA_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_metadata_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _extract(sha256: str, path: str, kind: str, ext: str) -> Dict:
+    os.makedirs(TMP_DIR, exist_ok=True)
+    cover_tmp = os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.jpg")
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(_get_pool(), extract_metadata, kind, ext, path, cover_tmp)
+        if result.pop("cover", False):
+            cover_sha = await asyncio.to_thread(hash_file, cover_tmp)
+            cover_path, _ = await store_blob(cover_tmp, cover_sha, os.path.getsize(cover_tmp), "jpg", "cover")
+            result["cover_url"] = cover_path
+    except Exception as e:
+        # Keshlanmaydi - vaqtinchalik xato (pool to'xtagan, timeout) keyingi create da qayta uriniladi
+        print(f"⚠️ Metadata xatosi ({path}): {e}")
+        return {}
+    finally:
+        if os.path.exists(cover_tmp):
+            os.remove(cover_tmp)
+
+    async with async_session() as db:
+        blob = await db.get(MediaBlob, sha256)
+        if blob:
+            blob.meta = result
+            await db.commit()
+    return result
+
+
+async def get_metadata(url: Optional[str], kind: str) -> Dict:
+    """
+    Media store dagi fayl uchun metadata (keshdan yoki yangi)
+    Tashqi URL yoki eski fayl bo'lsa {}
+    """
+    sha256 = hash_from_url(url)
+    if not sha256:
+        return {}
+
+    async with async_session() as db:
+        blob = await db.get(MediaBlob, sha256)
+    if not blob:
+        return {}
+    # Eski versiya keshlagan {"error": ...} - qayta o'qiladi
+    if blob.meta is not None and "error" not in blob.meta:
+        return {k: v for k, v in blob.meta.items() if k in META_FIELDS}
+
+    task = _inflight.get(sha256)
+    if task is None:
+        task = asyncio.create_task(_extract(sha256, blob.path, kind, blob.ext))
+        _inflight[sha256] = task
+        task.add_done_callback(lambda _: _inflight.pop(sha256, None))
+    # Bitta so'rov uzilsa ham boshqalar uchun extraction davom etadi
+    result = await asyncio.shield(task)
+    return {k: v for k, v in result.items() if k in META_FIELDS}
@@ -0,0 +1,85 @@
+"""
+Media metadata extraction (blocking)
+
+Runs inside a worker process. Audio is read with ``ffprobe`` (duration,
+bitrate, embedded cover art via ``ffmpeg``); PDFs with poppler's ``pdfinfo``
+(page count) and ``pdftoppm`` (first page rendered as a JPEG cover). Missing
+tools simply yield fewer fields.
+"""
+import json
+import os
+import shutil
+import subprocess
+from typing import Dict, List
+
+TOOL_TIMEOUT_SEC = 120
+COVER_WIDTH = 600
+
+
+def _run(cmd: List[str]) -> bytes:
+    result = subprocess.run(cmd, capture_output=True, timeout=TOOL_TIMEOUT_SEC)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"{os.path.basename(cmd[0])}: {stderr[-300:]}")
+    return result.stdout
+
+
+def probe_audio(src: str, cover_path: str) -> Dict:
+    if not shutil.which("ffprobe"):
+        return {}
+    data = json.loads(_run([
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration,bit_rate:stream=codec_type",
+        "-of", "json", src,
+    ]))
+    fmt = data.get("format") or {}
+    result = {}
+    if fmt.get("duration"):
+        result["duration_sec"] = int(round(float(fmt["duration"])))
+    if fmt.get("bit_rate"):
+        result["bitrate_kbps"] = int(fmt["bit_rate"]) // 1000
+
+    # mp3/m4a ichidagi muqova rasmi video oqim sifatida ko'rinadi
+    has_picture = any(s.get("codec_type") == "video" for s in data.get("streams") or [])
+    if has_picture and shutil.which("ffmpeg"):
+        _run([
+            "ffmpeg", "-y", "-v", "error", "-i", src,
+            "-an", "-frames:v", "1",
+            "-vf", f"scale='min({COVER_WIDTH},iw)':-2", "-q:v", "3",
+            cover_path,
+        ])
+    return result
+
+
+def probe_pdf(src: str, cover_path: str) -> Dict:
+    result = {}
+    if shutil.which("pdfinfo"):
+        for line in _run(["pdfinfo", src]).decode("utf-8", "replace").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip() == "Pages":
+                result["pages"] = int(value.strip())
+                break
+    if shutil.which("pdftoppm"):
+        # pdftoppm kengaytmani o'zi qo'shadi
+        _run([
+            "pdftoppm", "-jpeg", "-jpegopt", "quality=85",
+            "-f", "1", "-l", "1", "-singlefile",
+            "-scale-to-x", str(COVER_WIDTH), "-scale-to-y", "-1",
+            src, os.path.splitext(cover_path)[0],
+        ])
+    return result
+
+
+def extract_metadata(kind: str, ext: str, src: str, cover_path: str) -> Dict:
+    """
+    Returns: {"duration_sec", "bitrate_kbps"} | {"pages"} + "cover": bool
+    cover_path ga muqova yoziladi (bo'lsa)
+    """
+    if kind == "audio":
+        result = probe_audio(src, cover_path)
+    elif kind == "book" and ext == "pdf":
+        result = probe_pdf(src, cover_path)
+    else:
+        result = {}
+    result["cover"] = os.path.exists(cover_path) and os.path.getsize(cover_path) > 0
+    return result
@@ -0,0 +1,212 @@
+"""
+Media fayllarni yuborish - nginx X-Accel-Redirect yoki Python fallback
+
+With ``MEDIA_ACCEL_PREFIX`` set the endpoint only authorizes and returns an
+``X-Accel-Redirect`` header; nginx then streams the file from an internal
+location. Without it the file is sent here: conditional requests are answered
+from ``ETag``/``Last-Modified`` with a 304, a single ``Range`` is honoured with
+a 206 starting at the requested offset, and the body uses the ASGI zero-copy
+extension when the server provides it (otherwise seek + chunked reads).
+"""
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote, urlparse
+
+import aiofiles
+from fastapi import HTTPException, Request
+from starlette.responses import Response
+
+from app.config import settings
+from app.services.media_store import hash_from_url
+
+UPLOADS_ROOT = os.path.realpath("uploads")
+CHUNK_SIZE = 256 * 1024
+PRIVATE_CACHE = "private, max-age=3600"
+
+# HLS segmentlari (mimetypes .ts ni boshqa tur deb biladi)
+mimetypes.add_type("video/mp2t", ".ts")
+
+
+def media_url(kind: str, item_id: int, stored_url: Optional[str], token: str) -> Optional[str]:
+    """
+    API javobidagi URL: lokal fayl bo'lsa /api/media orqali, tashqi (YouTube va h.k.) bo'lsa o'zi
+    """
+    if not stored_url:
+        return None
+    if stored_url.startswith(("http://", "https://")):
+        return stored_url
+    return f"api/media/{kind}/{item_id}?token={token}"
+
+
+def hls_urls(lesson_id: int, token: str) -> dict:
+    """
+    HLS URL lari - token yo'l ichida, chunki playlistlar segmentlarga nisbiy
+    URL bilan murojaat qiladi (query string keyingi so'rovlarga o'tmaydi)
+    """
+    base = f"api/media/hls/{lesson_id}/{token}"
+    return {
+        "hls_url": f"{base}/master.m3u8",
+        "poster_url": f"{base}/poster.jpg",
+        "thumbnails_url": f"{base}/thumbnails.vtt",
+    }
+
+
+def file_extension(stored_url: Optional[str]) -> Optional[str]:
+    """Media URL token bilan yashirilgani uchun - frontend fayl turini shundan biladi"""
+    if not stored_url:
+        return None
+    ext = os.path.splitext(urlparse(stored_url).path)[1]
+    return ext[1:].lower() or None
+
+
+def _resolve_path(stored_url: str) -> str:
+    """DB dagi URL -> uploads ichidagi haqiqiy yo'l (tashqariga chiqib bo'lmaydi)"""
+    relative = stored_url.lstrip("/")
+    if relative.startswith("uploads/"):
+        relative = relative[len("uploads/"):]
+    full_path = os.path.realpath(os.path.join(UPLOADS_ROOT, relative))
+    if not full_path.startswith(UPLOADS_ROOT + os.sep):
+        raise HTTPException(404, "Fayl topilmadi")
+    return full_path
+
+
+def _etag(full_path: str, stat: os.stat_result) -> str:
+    # Content-addressed blob - hash ning o'zi kuchli ETag
+    sha256 = hash_from_url(full_path.replace(os.sep, "/"))
+    if sha256:
+        return f'"{sha256}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    "bytes=start-end" -> (start, end) (end inclusive)
+    Bir nechta diapazon - e'tiborsiz (to'liq fayl), noto'g'ri/qoniqtirib bo'lmaydigan - 416
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if not start_str:
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+            end = min(end, size - 1)
+    except ValueError:
+        start, end = size, -1
+    if start > end or start >= size:
+        raise HTTPException(
+            416, "Range noto'g'ri",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """Fayl bo'lagini offset dan boshlab yuborish (zero-copy bo'lsa sendfile)"""
+
+    def __init__(self, path: str, start: int, length: int, status_code: int, headers: dict, media_type: str):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**headers, "content-length": str(length)})
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"] == "HEAD" or not self.length:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                })
+            return
+
+        remaining = self.length
+        async with aiofiles.open(self.path, "rb") as f:
+            await f.seek(self.start)
+            while remaining:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+        if remaining:
+            # Fayl yuborish davomida qisqargan
+            await send({"type": "http.response.body", "body": b""})
+
+
+def serve_media(request: Request, stored_url: str) -> Response:
+    """Ruxsat tekshirilgandan keyin chaqiriladi"""
+    full_path = _resolve_path(stored_url)
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise HTTPException(404, "Fayl topilmadi")
+
+    if settings.MEDIA_ACCEL_PREFIX:
+        relative = os.path.relpath(full_path, UPLOADS_ROOT).replace(os.sep, "/")
+        return Response(headers={
+            "X-Accel-Redirect": settings.MEDIA_ACCEL_PREFIX + quote(relative),
+            "Cache-Control": PRIVATE_CACHE,
+        })
+
+    etag = _etag(full_path, stat)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": PRIVATE_CACHE,
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and size:
+        if_range = request.headers.get("if-range")
+        if not if_range or if_range in (etag, last_modified):
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range is None:
+        return FileRangeResponse(full_path, 0, size, 200, headers, media_type)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return FileRangeResponse(full_path, start, end - start + 1, 206, headers, media_type)
@@ -0,0 +1,163 @@
+"""
+Content-addressed media storage
+
+Blobs are stored once under ``uploads/media/<aa>/<bb>/<sha256>.<ext>``: an
+upload whose bytes already exist returns the existing URL instead of writing a
+second copy. A blob path never changes content, so it is served with
+``Cache-Control: immutable``. ``media_blobs`` holds one row per blob; its
+``ref_count`` is recomputed by the GC job from the URL columns that point at it.
+
+A duplicate upload keeps the blob's first ``kind``, so whether a blob is public
+is decided from its references, not from that kind alone: see
+``is_public_blob``.
+"""
+import asyncio
+import errno
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import aiofiles.os
+from fastapi import HTTPException
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models.media_blob import MediaBlob
+from app.models.audio import Audio
+from app.models.book import Book
+from app.models.payment import Payment
+
+MEDIA_ROOT = "uploads/media"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+_HASH_RE = re.compile(r"media/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.")
+
+# Blob yozish va GC o'chirishi bir vaqtda bo'lmasligi uchun
+media_lock = asyncio.Lock()
+
+PUBLIC_KINDS = ("cover",)
+# Ochiq e'lon qilingan muqovalar
+PUBLIC_REFERENCES = (Audio.cover_url, Book.cover_url)
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    return os.path.join(MEDIA_ROOT, sha256[:2], sha256[2:4], f"{sha256}.{ext}")
+
+
+def hash_from_url(url: Optional[str]) -> Optional[str]:
+    """Media URL dan sha256 ni ajratib olish (boshqa URL bo'lsa None)"""
+    if not url:
+        return None
+    match = _HASH_RE.search(url)
+    return match.group(1) if match else None
+
+
+async def _referenced(db, sha256: str, columns) -> bool:
+    """Shu blob URL i ustunlardan birida bormi"""
+    for col in columns:
+        result = await db.execute(select(1).where(col.like(f"%{sha256}%")).limit(1))
+        if result.first() is not None:
+            return True
+    return False
+
+
+async def is_public_blob(db, blob: MediaBlob) -> bool:
+    """
+    Ochiq (ruxsatsiz) berilishi mumkinmi:
+    - audio/kitob muqovasi sifatida e'lon qilingan bo'lsa - ha (blob qaysi tur bilan birinchi yuklangani muhim emas)
+    - aks holda faqat hali e'lon qilinmagan ajratilgan muqova (admin preview) va u to'lov skrinshoti bo'lmasa
+    """
+    if await _referenced(db, blob.sha256, PUBLIC_REFERENCES):
+        return True
+    return blob.kind in PUBLIC_KINDS and not await _referenced(db, blob.sha256, (Payment.screenshot_url,))
+
+
+async def store_blob(tmp_path: str, sha256: str, size: int, ext: str, kind: str) -> Tuple[str, str]:
+    """
+    Tayyor temp faylni blob sifatida saqlash
+    Bir xil kontent allaqachon bo'lsa temp fayl o'chiriladi
+    Returns: (path, ext) - mavjud blob bo'lsa uning kengaytmasi
+    """
+    async with media_lock:
+        async with async_session() as db:
+            blob = await db.get(MediaBlob, sha256)
+            now = datetime.utcnow()
+
+            if blob and os.path.exists(blob.path):
+                await aiofiles.os.remove(tmp_path)
+                blob.last_uploaded_at = now
+                await db.commit()
+                return blob.path, blob.ext
+
+            path = blob_path(sha256, ext)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                await aiofiles.os.replace(tmp_path, path)
+            except OSError as e:
+                # UPLOAD_TMP_DIR boshqa fayl tizimida (masalan alohida docker volume)
+                if e.errno != errno.EXDEV:
+                    raise
+                await asyncio.to_thread(shutil.move, tmp_path, path)
+
+            if blob:
+                # Qator bor, fayl yo'qolgan - qayta tiklash
+                blob.path = path
+                blob.ext = ext
+                blob.last_uploaded_at = now
+            else:
+                db.add(MediaBlob(
+                    sha256=sha256,
+                    path=path,
+                    ext=ext,
+                    kind=kind,
+                    size=size,
+                    ref_count=0,
+                    created_at=now,
+                    last_uploaded_at=now
+                ))
+            await db.commit()
+            return path, ext
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    /uploads mount - faqat ochiq rasm blob lar (muqovalar), immutable cache header bilan
+    Audio, kitob, video, HLS va to'lov skrinshotlari faqat ruxsat tekshiruvi bilan /api/media orqali
+    """
+
+    _PUBLIC_PATH_RE = re.compile(r"media/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+")
+    _CACHE_MAX = 10000
+    _CACHE_TTL = 60  # muqova qo'shilishi/olib tashlanishi shu vaqtda ko'rinadi
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # sha256 -> (ochiqmi, muddati)
+        self._public: Dict[str, Tuple[bool, float]] = {}
+
+    async def _is_public(self, sha256: str) -> bool:
+        now = time.monotonic()
+        cached = self._public.get(sha256)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        async with async_session() as db:
+            blob = await db.get(MediaBlob, sha256)
+            public = bool(blob) and await is_public_blob(db, blob)
+        if len(self._public) >= self._CACHE_MAX:
+            self._public.clear()
+        self._public[sha256] = (public, now + self._CACHE_TTL)
+        return public
+
+    async def get_response(self, path, scope):
+        match = self._PUBLIC_PATH_RE.fullmatch(path.replace(os.sep, "/"))
+        if not match or not await self._is_public(match.group(1)):
+            raise HTTPException(404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        return response
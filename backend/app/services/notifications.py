@@ -0,0 +1,272 @@
+"""
+User notifications - transactional outbox + bot dispatcher
+
+Handlers never talk to Telegram. They add a row to ``notifications`` in the
+same transaction as the change that caused it: a payment review, a friend
+request, a battle join or a premium expiry. So a notification exists exactly
+when the change was committed. One dispatcher task drains due rows in
+batches. Rows of a coalescing kind for the same user are merged into one
+digest message (friend requests wait ``COALESCE_SEC`` so a burst becomes one
+message). Messages are sent through ``bot_notifier`` (shared rate limiter)
+and the outcome of every row is recorded with one bulk UPDATE by primary key.
+Transient errors are retried with exponential backoff. A 403 (bot blocked) or
+a 400 is final.
+"""
+import asyncio
+import html
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.models.notification import Notification
+from app.models.user import User
+from app.services.bot_notify import bot_notifier
+
+BATCH_SIZE = 200
+SEND_CONCURRENCY = 10
+POLL_SEC = 5.0
+MAX_ATTEMPTS = 5
+RETRY_BASE_SEC = 30
+RETENTION_DAYS = 7
+PRUNE_BATCH = 1000
+FINAL_STATUSES = ("sent", "failed", "skipped")
+DIGEST_NAMES = 5
+
+# kind -> yuborishdan oldin kutish (shu oynada kelganlar bitta xabarga birlashadi)
+COALESCE_SEC = {"friend_request": 60}
+
+
+# ─── Outbox (handler tranzaksiyasi ichida) ────────────────────────────────────
+
+def _row(user_id: int, kind: str, payload: dict, now: datetime) -> dict:
+    return {
+        "user_id": user_id,
+        "kind": kind,
+        "payload": payload,
+        "status": "pending",
+        "attempts": 0,
+        "available_at": now + timedelta(seconds=COALESCE_SEC.get(kind, 0)),
+        "created_at": now,
+    }
+
+
+def add_notification(db: AsyncSession, user_id: int, kind: str, **payload):
+    """Commit qilmaydi - chaqiruvchining tranzaksiyasi bilan birga yoziladi"""
+    db.add(Notification(**_row(user_id, kind, payload, datetime.utcnow())))
+
+
+async def add_notifications(db: AsyncSession, items: Iterable[Tuple[int, str, dict]]):
+    """(user_id, kind, payload) lar - bitta multi-row INSERT, commit qilmaydi"""
+    now = datetime.utcnow()
+    rows = [_row(user_id, kind, payload, now) for user_id, kind, payload in items]
+    if rows:
+        await db.execute(insert(Notification), rows)
+
+
+# ─── Xabar matnlari ───────────────────────────────────────────────────────────
+
+def _payment_reviewed(payloads: List[dict]) -> str:
+    p = payloads[-1]
+    if p["status"] == "approved":
+        until = datetime.fromisoformat(p["premium_until"])
+        return (
+            f"✅ To'lovingiz tasdiqlandi!\n\n"
+            f"⭐ Premium ({p['plan_type']}) {until:%d.%m.%Y} gacha faol."
+        )
+    text = "❌ To'lovingiz rad etildi."
+    if p.get("note"):
+        text += f"\n\nSabab: {html.escape(p['note'])}"
+    return text
+
+
+def _friend_request(payloads: List[dict]) -> str:
+    names = [html.escape(p.get("requester_name") or "Foydalanuvchi") for p in payloads]
+    if len(names) == 1:
+        return f"👥 <b>{names[0]}</b> sizga do'stlik so'rovi yubordi."
+    shown = ", ".join(names[:DIGEST_NAMES])
+    more = f" va yana {len(names) - DIGEST_NAMES} ta" if len(names) > DIGEST_NAMES else ""
+    return f"👥 Sizga {len(names)} ta yangi do'stlik so'rovi: {shown}{more}."
+
+
+def _battle_joined(payloads: List[dict]) -> str:
+    p = payloads[-1]
+    name = html.escape(p.get("opponent_name") or "Raqib")
+    return f"⚔️ <b>{name}</b> battle lobbyingizga qo'shildi - battle boshlandi!"
+
+
+def _premium_expired(payloads: List[dict]) -> str:
+    return "⏳ Premium obunangiz muddati tugadi. Davom ettirish uchun ilovada yangi to'lov yuboring."
+
+
+RENDERERS = {
+    "payment_reviewed": _payment_reviewed,
+    "friend_request": _friend_request,
+    "battle_joined": _battle_joined,
+    "premium_expired": _premium_expired,
+}
+
+
+# ─── Dispatcher ───────────────────────────────────────────────────────────────
+
+class NotificationDispatcher:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    async def start(self):
+        """bot_notifier.start() dan keyin; bot o'chiq bo'lsa xabarlar pending bo'lib qoladi"""
+        if not bot_notifier.enabled:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self):
+        """Commit dan keyin - dispatcher ni darhol uyg'otish"""
+        self._wake.set()
+
+    async def _loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                processed = await self._dispatch_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Notification dispatcher xatosi: {e}")
+                processed = 0
+            if processed >= BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), POLL_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, semaphore: asyncio.Semaphore, group: list) -> Tuple[str, Optional[str]]:
+        """Returns: (sent | retry | failed | skipped, xato)"""
+        first = group[0]
+        if not first.telegram_id:
+            return "skipped", "telegram_id yo'q"
+        renderer = RENDERERS.get(first.kind)
+        if renderer is None:
+            return "skipped", f"noma'lum kind: {first.kind}"
+        async with semaphore:
+            try:
+                await bot_notifier.send(first.telegram_id, renderer([row.payload or {} for row in group]))
+                return "sent", None
+            except httpx.HTTPStatusError as e:
+                final = e.response.status_code in (400, 403)
+                return ("failed" if final else "retry"), e.response.text[:300]
+            except httpx.HTTPError as e:
+                return "retry", str(e)[:300]
+
+    async def _dispatch_batch(self) -> int:
+        now = datetime.utcnow()
+        async with async_session() as db:
+            result = await db.execute(
+                select(
+                    Notification.id, Notification.user_id, Notification.kind,
+                    Notification.payload, Notification.attempts, User.telegram_id
+                )
+                .outerjoin(User, User.id == Notification.user_id)
+                .where(Notification.status == "pending", Notification.available_at <= now)
+                .order_by(Notification.available_at, Notification.id)
+                .limit(BATCH_SIZE)
+            )
+            rows = result.all()
+        if not rows:
+            return 0
+
+        # Coalescing: bir user ga bir xil turdagi xabarlar - bitta digest
+        groups: Dict[tuple, list] = {}
+        for row in rows:
+            key = (row.user_id, row.kind) if row.kind in COALESCE_SEC else (row.id,)
+            groups.setdefault(key, []).append(row)
+
+        semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+        outcomes = await asyncio.gather(*(self._deliver(semaphore, group) for group in groups.values()))
+
+        finished = datetime.utcnow()
+        updates = []
+        for group, (status, error) in zip(groups.values(), outcomes):
+            for row in group:
+                attempts = (row.attempts or 0) + 1
+                values = {"id": row.id, "attempts": attempts, "error": error}
+                if status == "sent":
+                    values.update(status="sent", sent_at=finished)
+                elif status == "retry" and attempts < MAX_ATTEMPTS:
+                    values["available_at"] = finished + timedelta(seconds=RETRY_BASE_SEC * 2 ** (attempts - 1))
+                else:
+                    values["status"] = "failed" if status == "retry" else status
+                updates.append(values)
+
+        async with async_session() as db:
+            # ORM bulk UPDATE by primary key
+            await db.execute(update(Notification), updates)
+            await db.commit()
+        return len(rows)
+
+
+async def prune_notifications():
+    """
+    RETENTION_DAYS dan eski yakunlangan yozuvlarni bo'lib o'chirish (kunlik)
+    pending lar o'chirilmaydi - bot o'chiq bo'lsa ham yoqilganda yuboriladi
+    """
+    cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+    total = 0
+    while True:
+        async with async_session() as db:
+            batch = (
+                select(Notification.id)
+                .where(Notification.status.in_(FINAL_STATUSES), Notification.created_at < cutoff)
+                .limit(PRUNE_BATCH)
+                .scalar_subquery()
+            )
+            result = await db.execute(delete(Notification).where(Notification.id.in_(batch)))
+            await db.commit()
+        total += result.rowcount
+        if result.rowcount < PRUNE_BATCH:
+            break
+    if total:
+        print(f"🧹 {total} ta eski notification o'chirildi")
+
+
+async def notification_stats() -> dict:
+    """Yetkazish holati - tur va status bo'yicha, oxirgi xatolar"""
+    async with async_session() as db:
+        result = await db.execute(
+            select(Notification.kind, Notification.status, func.count(Notification.id))
+            .group_by(Notification.kind, Notification.status)
+        )
+        counts: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in result.all():
+            counts.setdefault(kind, {})[status] = count
+
+        result = await db.execute(
+            select(Notification.id, Notification.kind, Notification.user_id, Notification.error, Notification.created_at)
+            .where(Notification.status == "failed")
+            .order_by(Notification.id.desc())
+            .limit(20)
+        )
+        failures = [
+            {
+                "id": row.id,
+                "kind": row.kind,
+                "user_id": row.user_id,
+                "error": row.error,
+                "created_at": row.created_at.isoformat(),
+            }
+            for row in result.all()
+        ]
+    return {"counts": counts, "recent_failures": failures}
+
+
+notification_dispatcher = NotificationDispatcher()
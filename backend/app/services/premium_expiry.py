@@ -0,0 +1,116 @@
+"""
+Premium expiry - bulk UPDATE + in-process timer wheel
+
+Every user with a future ``premium_until`` sits in a hierarchical timer wheel
+(seeded from the database at startup, updated on grant/revoke), so the
+``is_premium`` flag is flipped at the expiry instant instead of at the next
+daily run. Each tick's due users are expired with one ``UPDATE``; the
+``premium_until <= now`` guard makes a stale timer (premium extended since it
+was scheduled) a no-op. Entitlement checks do not depend on the flag being
+flipped - see ``app.core.entitlement``.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import select, update
+
+from app.core.timer_wheel import TimerWheel
+from app.database import async_session
+from app.models.user import User
+from app.services.revenue import record_premium
+from app.services.dashboard_stats import dashboard_stats
+from app.services.notifications import add_notifications, notification_dispatcher
+
+
+def _timestamp(dt: datetime) -> float:
+    # premium_until - naive UTC
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def expire_premiums(user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Muddati o'tgan premiumlarni bitta UPDATE bilan o'chirish (user_ids bo'lsa - faqat ular)
+    Foydalanuvchilarga xabar - shu tranzaksiyada outbox ga
+    """
+    now = datetime.utcnow()
+    stmt = (
+        update(User)
+        .where(User.is_premium == True, User.premium_until.is_not(None), User.premium_until <= now)
+        .values(is_premium=False)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    if user_ids is not None:
+        stmt = stmt.where(User.id.in_(list(user_ids)))
+    async with async_session() as db:
+        result = await db.execute(stmt)
+        expired_ids = result.scalars().all()
+        await record_premium(db, churned=len(expired_ids), when=now)
+        await add_notifications(db, [(user_id, "premium_expired", {}) for user_id in expired_ids])
+        await db.commit()
+    if expired_ids:
+        notification_dispatcher.notify()
+    dashboard_stats.bump(users_premium=-len(expired_ids))
+    return len(expired_ids)
+
+
+class PremiumExpiryWheel:
+    def __init__(self, tick_sec: float = 1.0):
+        self.tick_sec = tick_sec
+        self._wheel: Optional[TimerWheel] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._wheel = TimerWheel(origin=time.time(), tick_sec=self.tick_sec)
+        expired = await expire_premiums()
+        if expired:
+            print(f"⏰ {expired} ta userning premiumi o'chirildi")
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(User.id, User.premium_until)
+                .where(User.is_premium == True, User.premium_until.is_not(None))
+            )
+            rows = result.all()
+        for user_id, premium_until in rows:
+            self._wheel.schedule(user_id, _timestamp(premium_until))
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ Premium expiry: {len(rows)} ta timer")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def schedule(self, user_id: int, premium_until: Optional[datetime]):
+        """Premium berilganda/uzaytirilganda (commit dan keyin)"""
+        if self._wheel is None:
+            return
+        if premium_until is None:
+            self._wheel.cancel(user_id)
+        else:
+            self._wheel.schedule(user_id, _timestamp(premium_until))
+
+    def cancel(self, user_id: int):
+        if self._wheel is not None:
+            self._wheel.cancel(user_id)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_sec)
+            due = self._wheel.advance(time.time())
+            if not due:
+                continue
+            try:
+                expired = await expire_premiums(due)
+                if expired:
+                    print(f"⏰ Premium tugadi: {expired} ta user")
+            except Exception as e:
+                # Keyingi soatlik tekshiruv baribir tuzatadi
+                print(f"⚠️ Premium expiry xatosi: {e}")
+
+
+premium_expiry = PremiumExpiryWheel()
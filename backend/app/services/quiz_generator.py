@@ -0,0 +1,144 @@
+"""
+AI quiz generator - dars matnidan test savollari yaratish
+"""
+import json
+import re
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.lesson import Lesson
+from app.models.module import Module
+from app.services.ai_client import ai_client
+
+DIFFICULTY_LABELS = {
+    "easy": "oson — asosiy ta'riflar va tushunchalar",
+    "medium": "o'rtacha — tushunish va qo'llash",
+    "hard": "qiyin — tahlil va chuqur bilim"
+}
+
+
+class QuizGenerationError(Exception):
+    """Savol yaratib bo'lmadi (status_code - HTTP javob uchun)"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def build_prompt(lesson: Lesson, module_title: str, question_count: int, difficulty: str, extra_context: Optional[str]) -> str:
+    parts = []
+    if module_title:
+        parts.append(f"Kurs: {module_title}")
+    parts.append(f"Dars: {lesson.title}")
+    if lesson.description:
+        parts.append(f"Tavsif: {lesson.description}")
+    if lesson.content:
+        parts.append(f"Dars matni:\n{lesson.content[:3000]}")
+    if extra_context:
+        parts.append(f"Qo'shimcha ma'lumot: {extra_context}")
+
+    context = "\n\n".join(parts)
+    diff_label = DIFFICULTY_LABELS.get(difficulty, "o'rtacha")
+
+    return f"""Quyidagi dars mavzusiga oid {question_count} ta test savoli yarating.
+
+Kontekst:
+{context}
+
+Talablar:
+- Qiyinlik: {diff_label}
+- Har bir savolda 4 ta javob varianti
+- Faqat 1 ta to'g'ri javob
+- O'zbek tilida
+
+FAQAT quyidagi JSON formatida javob bering, boshqa matn bo'lmasin:
+[
+  {{
+    "question": "Savol matni?",
+    "options": ["A varianti", "B varianti", "C varianti", "D varianti"],
+    "correct_index": 0,
+    "explanation": "Nima uchun A to'g'ri"
+  }}
+]"""
+
+
+def parse_questions(raw_text: str, question_count: int) -> list:
+    """AI javobidan JSON massivni ajratib, tekshirish"""
+    try:
+        match = re.search(r'\[[\s\S]*\]', raw_text)
+        questions_raw = json.loads(match.group() if match else raw_text.strip())
+    except json.JSONDecodeError:
+        raise QuizGenerationError("AI javobini o'qishda xato. Qayta urinib ko'ring.")
+
+    validated = []
+    for i, q in enumerate(questions_raw[:question_count]):
+        if not isinstance(q, dict):
+            continue
+        opts = [str(o) for o in q.get("options", [])[:4]]
+        if len(opts) < 2:
+            continue
+        correct_idx = int(q.get("correct_index", 0))
+        correct_idx = max(0, min(correct_idx, len(opts) - 1))
+        validated.append({
+            "id": i + 1,
+            "question": str(q.get("question", "")),
+            "options": opts,
+            "correct_index": correct_idx,
+            "explanation": str(q.get("explanation", ""))
+        })
+
+    if not validated:
+        raise QuizGenerationError("AI savollar yarata olmadi. Qayta urinib ko'ring.")
+    return validated
+
+
+async def generate_questions(
+    db: AsyncSession,
+    lesson_id: int,
+    question_count: int = 5,
+    difficulty: str = "medium",
+    extra_context: Optional[str] = None
+) -> tuple:
+    """
+    Returns: (questions, lesson_title)
+    Raises: QuizGenerationError
+    """
+    if not ai_client.enabled:
+        raise QuizGenerationError("AI xizmati sozlanmagan (ANTHROPIC_API_KEY yo'q)", 503)
+
+    lesson = await db.get(Lesson, lesson_id)
+    if not lesson:
+        raise QuizGenerationError("Dars topilmadi", 404)
+
+    module_title = ""
+    if lesson.module_id:
+        module = await db.get(Module, lesson.module_id)
+        if module:
+            module_title = module.title
+
+    prompt = build_prompt(lesson, module_title, question_count, difficulty, extra_context)
+
+    try:
+        result = await ai_client.post_messages(
+            {
+                "model": settings.AI_MODEL,
+                "max_tokens": 4096,
+                "messages": [{"role": "user", "content": prompt}]
+            },
+            timeout=60.0
+        )
+    except Exception as e:
+        raise QuizGenerationError(f"AI ga ulanishda xato: {str(e)}")
+
+    if "error" in result:
+        err_msg = result["error"].get("message", "Noma'lum")
+        raise QuizGenerationError(f"AI xatosi: {err_msg}")
+    try:
+        raw_text = result["content"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        raise QuizGenerationError("Javob olishda xato yuz berdi.")
+
+    return parse_questions(raw_text, question_count), lesson.title
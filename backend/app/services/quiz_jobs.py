@@ -0,0 +1,136 @@
+"""
+AI quiz generation job queue
+
+Jobs are rows in ``quiz_gen_jobs``; the in-memory queue only holds ids, so a
+restart loses nothing: ``start()`` re-queues pending jobs and resets jobs that
+were running when the process stopped. A fixed pool of worker tasks bounds
+concurrent generations.
+"""
+import asyncio
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import async_session
+from app.models.quiz_job import QuizGenJob
+from app.services.quiz_generator import generate_questions, QuizGenerationError
+
+TERMINAL_STATUSES = {"done", "failed", "approved", "rejected"}
+
+
+class QuizJobQueue:
+    def __init__(self, workers: int = 3):
+        self.workers = workers
+        self._queue: "asyncio.Queue[int]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._changed = asyncio.Event()
+
+    async def start(self):
+        async with async_session() as db:
+            # Restartda yarim qolgan joblar qaytadan navbatga
+            await db.execute(
+                update(QuizGenJob)
+                .where(QuizGenJob.status == "running")
+                .values(status="pending")
+            )
+            await db.commit()
+            result = await db.execute(
+                select(QuizGenJob.id)
+                .where(QuizGenJob.status == "pending")
+                .order_by(QuizGenJob.id)
+            )
+            pending = [row[0] for row in result.all()]
+
+        self.enqueue(pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if pending:
+            print(f"🧠 Quiz job queue: {len(pending)} ta job qayta navbatga qo'yildi")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, job_ids: Iterable[int]):
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+
+    def notify(self):
+        """Job holati o'zgardi - stream kutayotganlarni uyg'otish"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Quiz job #{job_id} xatosi: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: int):
+        async with async_session() as db:
+            job = await db.get(QuizGenJob, job_id)
+            if not job or job.status != "pending":
+                return
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job.attempts = (job.attempts or 0) + 1
+            await db.commit()
+            self.notify()
+
+            try:
+                questions, _ = await generate_questions(
+                    db, job.lesson_id, job.question_count, job.difficulty, job.extra_context
+                )
+                job.questions = questions
+                job.status = "done"
+                job.error = None
+            except QuizGenerationError as e:
+                job.status = "failed"
+                job.error = e.message
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            self.notify()
+
+
+def job_dict(job: QuizGenJob, include_questions: bool = False) -> dict:
+    data = {
+        "id": job.id,
+        "batch_id": job.batch_id,
+        "lesson_id": job.lesson_id,
+        "module_id": job.module_id,
+        "status": job.status,
+        "question_count": job.question_count,
+        "difficulty": job.difficulty,
+        "generated": len(job.questions or []),
+        "error": job.error,
+        "quiz_id": job.quiz_id,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if include_questions:
+        data["questions"] = job.questions or []
+    return data
+
+
+quiz_job_queue = QuizJobQueue(workers=settings.AI_QUIZ_JOB_WORKERS)
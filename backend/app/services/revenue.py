@@ -0,0 +1,280 @@
+"""
+Revenue reporting - incremental monthly aggregates
+
+Payment reviews, premium grants/revocations and expiries upsert their deltas
+into ``revenue_monthly`` / ``premium_monthly`` inside the same transaction as
+the change itself, so reports read a handful of rows instead of scanning
+``payments``. ``premium_monthly.active_end`` is a running gauge carried over
+from the previous month and reconciled against ``users`` by the hourly
+premium job. Aggregates are backfilled from history on first start.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select, func, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.models.payment import Payment
+from app.models.revenue import RevenueMonthly, PremiumMonthly
+from app.models.user import User
+
+EXPORT_BATCH = 1000
+EXPORT_COLUMNS = (
+    "id", "created_at", "reviewed_at", "user_id", "username", "full_name",
+    "plan_type", "amount", "status", "reviewed_by", "admin_note",
+)
+# Spreadsheet shu belgilar bilan boshlangan katakni formula deb bajaradi
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def month_key(dt: Optional[datetime] = None) -> str:
+    return (dt or datetime.utcnow()).strftime("%Y-%m")
+
+
+def month_start(month: str) -> datetime:
+    """YYYY-MM -> oyning birinchi kuni (ValueError - noto'g'ri format)"""
+    return datetime.strptime(month, "%Y-%m")
+
+
+def next_month(month: str) -> str:
+    year, mon = map(int, month.split("-"))
+    return f"{year + mon // 12}-{mon % 12 + 1:02d}"
+
+
+async def record_reviews(db: AsyncSession, reviews: Iterable[Tuple[str, str, int]], when: Optional[datetime] = None):
+    """
+    (plan_type, status, amount) lar - commit ni chaqiruvchi qiladi
+    """
+    month = month_key(when)
+    deltas: Dict[str, Dict[str, int]] = {}
+    for plan_type, status, amount in reviews:
+        delta = deltas.setdefault(plan_type, {"revenue": 0, "approvals": 0, "rejections": 0})
+        if status == "approved":
+            delta["revenue"] += amount
+            delta["approvals"] += 1
+        else:
+            delta["rejections"] += 1
+    if not deltas:
+        return
+
+    stmt = sqlite_insert(RevenueMonthly)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RevenueMonthly.month, RevenueMonthly.plan_type],
+        set_={
+            field: getattr(RevenueMonthly, field) + getattr(stmt.excluded, field)
+            for field in ("revenue", "approvals", "rejections")
+        }
+    )
+    await db.execute(stmt, [
+        {"month": month, "plan_type": plan_type, **delta}
+        for plan_type, delta in deltas.items()
+    ])
+
+
+async def record_premium(
+    db: AsyncSession,
+    activated: int = 0,
+    renewed: int = 0,
+    churned: int = 0,
+    when: Optional[datetime] = None
+):
+    """Premium oqimi deltasi - commit ni chaqiruvchi qiladi"""
+    if not (activated or renewed or churned):
+        return
+    month = month_key(when)
+    change = activated - churned
+    # Yangi oy qatori oldingi oyning gauge idan boshlanadi
+    previous = (
+        select(func.coalesce(PremiumMonthly.active_end, 0))
+        .where(PremiumMonthly.month < month)
+        .order_by(PremiumMonthly.month.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = sqlite_insert(PremiumMonthly).values(
+        month=month,
+        activated=activated,
+        renewed=renewed,
+        churned=churned,
+        active_end=func.coalesce(previous, 0) + change,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PremiumMonthly.month],
+        set_={
+            "activated": PremiumMonthly.activated + activated,
+            "renewed": PremiumMonthly.renewed + renewed,
+            "churned": PremiumMonthly.churned + churned,
+            "active_end": func.coalesce(PremiumMonthly.active_end, 0) + change,
+        }
+    )
+    await db.execute(stmt)
+
+
+async def reconcile_active_premium():
+    """Joriy oy gauge ini users jadvalidagi haqiqiy son bilan tenglash"""
+    now = datetime.utcnow()
+    async with async_session() as db:
+        result = await db.execute(
+            select(func.count(User.id))
+            .where(User.is_premium == True, func.coalesce(User.premium_until > now, True))
+        )
+        active = result.scalar() or 0
+        stmt = sqlite_insert(PremiumMonthly).values(month=month_key(now), active_end=active)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PremiumMonthly.month],
+            set_={"active_end": stmt.excluded.active_end}
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def backfill_revenue_aggregates():
+    """Birinchi ishga tushishda to'lovlar tarixidan (jadval bo'sh bo'lsa)"""
+    async with async_session() as db:
+        result = await db.execute(select(RevenueMonthly.month).limit(1))
+        if result.first():
+            return
+
+        month = func.strftime("%Y-%m", Payment.reviewed_at)
+        result = await db.execute(
+            select(
+                month.label("month"),
+                Payment.plan_type,
+                func.sum(Payment.amount).filter(Payment.status == "approved"),
+                func.count().filter(Payment.status == "approved"),
+                func.count().filter(Payment.status == "rejected"),
+            )
+            .where(Payment.status.in_(("approved", "rejected")), Payment.reviewed_at.is_not(None))
+            .group_by(month, Payment.plan_type)
+        )
+        rows = result.all()
+        if not rows:
+            return
+        await db.execute(sqlite_insert(RevenueMonthly), [
+            {
+                "month": m, "plan_type": plan_type,
+                "revenue": revenue or 0, "approvals": approvals, "rejections": rejections,
+            }
+            for m, plan_type, revenue, approvals, rejections in rows
+        ])
+
+        # Tarixda yangi/uzaytirish farqi yo'q - tasdiqlanganlar "activated" deb olinadi
+        activated: Dict[str, int] = {}
+        for m, _, _, approvals, _ in rows:
+            activated[m] = activated.get(m, 0) + approvals
+        # Grant/expiry allaqachon yozgan oylar - tarixiy aktivatsiyalar qo'shiladi
+        stmt = sqlite_insert(PremiumMonthly)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PremiumMonthly.month],
+            set_={"activated": func.coalesce(PremiumMonthly.activated, 0) + stmt.excluded.activated}
+        )
+        await db.execute(
+            stmt,
+            [{"month": m, "activated": n, "renewed": 0, "churned": 0} for m, n in activated.items()]
+        )
+        await db.commit()
+    print(f"📊 Revenue aggregatlari tiklandi: {len(rows)} qator")
+    await reconcile_active_premium()
+
+
+async def revenue_report(db: AsyncSession, start: str, end: str) -> dict:
+    """[start, end] oylar (YYYY-MM) bo'yicha hisobot"""
+    result = await db.execute(
+        select(RevenueMonthly)
+        .where(RevenueMonthly.month >= start, RevenueMonthly.month <= end)
+    )
+    revenue_rows = result.scalars().all()
+    result = await db.execute(
+        select(PremiumMonthly)
+        .where(PremiumMonthly.month >= start, PremiumMonthly.month <= end)
+    )
+    premium_rows = {row.month: row for row in result.scalars().all()}
+    result = await db.execute(
+        select(PremiumMonthly.active_end)
+        .where(PremiumMonthly.month < start, PremiumMonthly.active_end.is_not(None))
+        .order_by(PremiumMonthly.month.desc())
+        .limit(1)
+    )
+    previous_active = result.scalar()
+
+    by_month: Dict[str, dict] = {}
+    for row in revenue_rows:
+        entry = by_month.setdefault(row.month, {"revenue": 0, "approvals": 0, "rejections": 0, "by_plan": {}})
+        entry["revenue"] += row.revenue or 0
+        entry["approvals"] += row.approvals or 0
+        entry["rejections"] += row.rejections or 0
+        entry["by_plan"][row.plan_type] = {
+            "revenue": row.revenue or 0,
+            "approvals": row.approvals or 0,
+            "rejections": row.rejections or 0,
+        }
+
+    months = []
+    totals = {"revenue": 0, "approvals": 0, "rejections": 0, "activated": 0, "renewed": 0, "churned": 0}
+    month = start
+    while month <= end:
+        entry = by_month.get(month, {"revenue": 0, "approvals": 0, "rejections": 0, "by_plan": {}})
+        premium = premium_rows.get(month) or PremiumMonthly()
+        churned = premium.churned or 0
+        active_end = premium.active_end
+        entry.update({
+            "month": month,
+            "activated": premium.activated or 0,
+            "renewed": premium.renewed or 0,
+            "churned": churned,
+            "active_premium": active_end,
+            "churn_rate": round(churned / previous_active, 4) if previous_active else None,
+        })
+        for field in totals:
+            totals[field] += entry[field]
+        months.append(entry)
+        if active_end is not None:
+            previous_active = active_end
+        month = next_month(month)
+
+    return {"start": start, "end": end, "months": months, "totals": totals}
+
+
+def csv_cell(value):
+    """CSV katagi - datetime ISO, formula bilan boshlangan matn ' bilan"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # username / full_name / admin_note - CSV formula injection
+        return "'" + value
+    return value
+
+
+async def iter_payments_csv(start: datetime, end: datetime) -> AsyncIterator[str]:
+    """
+    [start, end) oralig'ida ko'rib chiqilgan to'lovlar CSV - server-side cursor
+    bilan EXPORT_BATCH tadan o'qiladi, butun jadval xotiraga yuklanmaydi
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    query = (
+        select(
+            Payment.id, Payment.created_at, Payment.reviewed_at, Payment.user_id,
+            User.username, User.full_name, Payment.plan_type, Payment.amount,
+            Payment.status, Payment.reviewed_by, Payment.admin_note,
+        )
+        .outerjoin(User, User.id == Payment.user_id)
+        .where(and_(Payment.reviewed_at >= start, Payment.reviewed_at < end))
+        .order_by(Payment.reviewed_at, Payment.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    async with async_session() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            for row in rows:
+                writer.writerow([csv_cell(value) for value in row])
+            yield buffer.getvalue()
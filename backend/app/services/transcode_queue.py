@@ -0,0 +1,147 @@
+"""
+Lesson video transcode queue
+
+Each source video is transcoded once into ``uploads/hls/<key>/`` (key = the
+content hash for media-store blobs; served only through ``/api/media/hls``
+after an access check) by a spawn-context process pool, so the
+event loop and the API workers never run ffmpeg. Status lives on ``Lesson``:
+every lesson pointing at the video is updated when the job starts and ends,
+and ``start()`` re-queues lessons left pending/processing by a restart.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Set
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import async_session
+from app.models.lesson import Lesson
+from app.services.video_transcode import ffmpeg_available, transcode_video
+
+HLS_ROOT = "uploads/hls"
+PENDING_STATUSES = ("pending", "processing")
+
+
+def is_local_video(video_url: Optional[str]) -> bool:
+    return bool(video_url) and not video_url.startswith(("http://", "https://"))
+
+
+def source_path(video_url: str) -> str:
+    relative = video_url.lstrip("/")
+    return relative if relative.startswith("uploads/") else os.path.join("uploads", relative)
+
+
+def output_dir(video_url: str) -> str:
+    key = os.path.splitext(os.path.basename(video_url))[0]
+    return os.path.join(HLS_ROOT, key)
+
+
+def is_transcoded(video_url: str) -> bool:
+    return os.path.exists(os.path.join(output_dir(video_url), "master.m3u8"))
+
+
+class TranscodeQueue:
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+        self.enabled = False
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._queued: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self.enabled = ffmpeg_available()
+        if not self.enabled:
+            print("⚠️ ffmpeg topilmadi - video transcoding o'chirilgan")
+            return
+
+        # fork emas: event loop va SQLite ulanishlari bolaga o'tmasin
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(Lesson.video_url)
+                .where(Lesson.transcode_status.in_(PENDING_STATUSES))
+                .distinct()
+            )
+            pending = [row[0] for row in result.all() if is_local_video(row[0])]
+        for video_url in pending:
+            self.enqueue(video_url)
+        if pending:
+            print(f"🎬 Transcode queue: {len(pending)} ta video qayta navbatga qo'yildi")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def enqueue(self, video_url: str):
+        if not self.enabled or not is_local_video(video_url) or video_url in self._queued:
+            return
+        self._queued.add(video_url)
+        self._queue.put_nowait(video_url)
+
+    def initial_status(self, video_url: Optional[str]) -> Optional[str]:
+        """
+        Yangi/yangilangan dars uchun boshlang'ich holat - navbatga qo'ymaydi
+        "pending" bo'lsa chaqiruvchi commitdan keyin enqueue() qiladi; navbat
+        ishlamayotgan bo'lsa (CLI) start() uni keyin qayta navbatga qo'yadi
+        """
+        if not is_local_video(video_url):
+            return None
+        if is_transcoded(video_url):
+            return "ready"
+        return "pending"
+
+    async def _set_status(self, video_url: str, **values):
+        async with async_session() as db:
+            await db.execute(
+                update(Lesson)
+                .where(Lesson.video_url == video_url)
+                .values(**values)
+            )
+            await db.commit()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            video_url = await self._queue.get()
+            try:
+                if is_transcoded(video_url):
+                    await self._set_status(video_url, transcode_status="ready", transcode_error=None)
+                    continue
+
+                await self._set_status(video_url, transcode_status="processing", transcode_error=None)
+                started = datetime.utcnow()
+                result = await loop.run_in_executor(
+                    self._pool, transcode_video, source_path(video_url), output_dir(video_url)
+                )
+                await self._set_status(video_url, transcode_status="ready", transcode_error=None)
+                took = (datetime.utcnow() - started).total_seconds()
+                print(f"🎬 HLS tayyor: {video_url} ({', '.join(result['renditions'])}, {took:.0f}s)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Transcode xatosi ({video_url}): {e}")
+                try:
+                    await self._set_status(video_url, transcode_status="failed", transcode_error=str(e)[:1000])
+                except Exception:
+                    pass
+            finally:
+                self._queued.discard(video_url)
+                self._queue.task_done()
+
+
+transcode_queue = TranscodeQueue(workers=settings.TRANSCODE_WORKERS)
@@ -0,0 +1,275 @@
+"""
+Upload service - fayllarni oqim (chunk) bilan diskka yozish
+
+The multipart body is parsed straight from ``request.stream()`` (no
+``UploadFile`` spooling) and the file part is written with ``aiofiles`` to a
+temp file under ``UPLOAD_TMP_DIR`` (outside the public ``uploads/`` tree). A declared ``Content-Length`` above the
+limit is rejected before the body is read; otherwise the limit is enforced
+and the SHA-256 is computed while streaming. The finished file is then handed
+to the content-addressed media store. Peak memory is one chunk regardless of
+file size and the file is written to disk exactly once.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, FrozenSet, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+import multipart
+from fastapi import HTTPException, Request
+from multipart.multipart import parse_options_header
+
+from app.config import settings
+from app.services.media_store import store_blob
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+TMP_DIR = settings.UPLOAD_TMP_DIR
+MULTIPART_OVERHEAD = 64 * 1024  # boundary, part headerlari
+
+# Fayl boshidagi "magic" baytlar - Content-Type ga ishonmaslik uchun
+MAGIC = {
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "gif": (b"GIF87a", b"GIF89a"),
+    "webp": (b"RIFF",),
+    "pdf": (b"%PDF",),
+}
+
+
+@dataclass(frozen=True)
+class UploadPolicy:
+    extensions: FrozenSet[str]
+    mime_prefixes: Tuple[str, ...]
+    max_bytes: int
+    error_message: str
+    default_ext: Optional[str] = None
+    allow_octet_stream: bool = True
+    sniff: bool = True
+
+
+MB = 1024 * 1024
+
+UPLOAD_POLICIES = {
+    "video": UploadPolicy(
+        extensions=frozenset({"mp4", "webm", "mov", "avi", "mkv"}),
+        mime_prefixes=("video/",),
+        max_bytes=settings.UPLOAD_MAX_VIDEO_MB * MB,
+        error_message="Faqat video fayllar qabul qilinadi (mp4, webm, mov, avi, mkv)",
+    ),
+    "audio": UploadPolicy(
+        extensions=frozenset({"mp3", "wav", "ogg", "m4a", "aac", "flac"}),
+        mime_prefixes=("audio/",),
+        max_bytes=settings.UPLOAD_MAX_AUDIO_MB * MB,
+        error_message="Faqat audio fayllar qabul qilinadi (mp3, wav, ogg, m4a, aac)",
+    ),
+    "book": UploadPolicy(
+        extensions=frozenset({"pdf", "epub", "fb2", "djvu", "doc", "docx"}),
+        mime_prefixes=("application/", "image/vnd.djvu", "text/xml"),
+        max_bytes=settings.UPLOAD_MAX_BOOK_MB * MB,
+        error_message="Faqat kitob fayllar qabul qilinadi (pdf, epub, fb2)",
+    ),
+    "payment": UploadPolicy(
+        extensions=frozenset({"jpg", "jpeg", "jfif", "png", "gif", "webp", "heic"}),
+        mime_prefixes=("image/",),
+        max_bytes=settings.UPLOAD_MAX_IMAGE_MB * MB,
+        error_message="Faqat rasm yuklash mumkin",
+        default_ext="jpg",
+        allow_octet_stream=False,
+    ),
+}
+
+
+@dataclass
+class StoredFile:
+    url: str
+    path: str
+    size: int
+    sha256: str
+    ext: str
+
+
+def _extension(filename: Optional[str], policy: UploadPolicy) -> str:
+    ext = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+    if not ext and policy.default_ext:
+        ext = policy.default_ext
+    return ext
+
+
+def _check_type(content_type: str, ext: str, policy: UploadPolicy):
+    if ext not in policy.extensions:
+        raise HTTPException(400, policy.error_message)
+    content_type = content_type.lower()
+    if content_type.startswith(policy.mime_prefixes):
+        return
+    if policy.allow_octet_stream and content_type in ("", "application/octet-stream"):
+        return
+    raise HTTPException(400, policy.error_message)
+
+
+def _check_magic(first_chunk: bytes, ext: str, policy: UploadPolicy):
+    signatures = MAGIC.get(ext)
+    if policy.sniff and signatures and not first_chunk.startswith(signatures):
+        raise HTTPException(400, policy.error_message)
+
+
+def _too_large(policy: UploadPolicy) -> HTTPException:
+    return HTTPException(413, f"Fayl juda katta (maksimal {policy.max_bytes // MB} MB)")
+
+
+async def _iter_file_part(request: Request, field: str, limit: int) -> AsyncIterator[Tuple[str, object]]:
+    """
+    multipart/form-data body dan `field` nomli fayl qismi:
+    ("start", (filename, content_type)), keyin ("data", bytes) lar, oxirida ("end", None)
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(400, "multipart/form-data kutilgan")
+
+    events = []
+    state = {"field": b"", "value": b"", "headers": {}, "active": False}
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        state["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"] = state["value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["active"] = options.get(b"name") == field.encode() and b"filename" in options
+        if state["active"]:
+            filename = options[b"filename"].decode("utf-8", "replace")
+            events.append(("start", (filename, state["headers"].get(b"content-type", b"").decode("latin-1"))))
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if state["active"]:
+            events.append(("data", data[start:end]))
+
+    def on_part_end():
+        if state["active"]:
+            events.append(("end", None))
+            state["active"] = False
+
+    parser = multipart.MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise HTTPException(413, f"So'rov juda katta (maksimal {limit // MB} MB)")
+        parser.write(chunk)
+        pending, events[:] = events[:], []
+        for event in pending:
+            yield event
+    parser.finalize()
+
+
+async def save_upload(request: Request, kind: str, field: str = "file") -> StoredFile:
+    """
+    multipart so'rovdagi faylni policy bo'yicha tekshirib, oqim bilan saqlash
+    Raises: HTTPException 400 (tur), 413 (hajm - Content-Length bo'yicha body o'qilmasdan)
+    """
+    policy = UPLOAD_POLICIES[kind]
+    limit = policy.max_bytes + MULTIPART_OVERHEAD
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise _too_large(policy)
+
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    out = None
+    try:
+        async for event, value in _iter_file_part(request, field, limit):
+            if event == "start" and ext is None:
+                filename, content_type = value
+                ext = _extension(filename, policy)
+                _check_type(content_type, ext, policy)
+                out = await aiofiles.open(tmp_path, "wb")
+            elif event == "data" and out is not None:
+                if size == 0:
+                    _check_magic(value, ext, policy)
+                size += len(value)
+                if size > policy.max_bytes:
+                    raise _too_large(policy)
+                digest.update(value)
+                await out.write(value)
+            elif event == "end" and out is not None:
+                await out.close()
+                out = None
+        if ext is None:
+            raise HTTPException(400, "Fayl yuborilmagan")
+        if out is not None:
+            raise HTTPException(400, "Fayl to'liq yuborilmadi")
+        if size == 0:
+            raise HTTPException(400, "Fayl bo'sh")
+        sha256 = digest.hexdigest()
+        path, ext = await store_blob(tmp_path, sha256, size, ext, kind)
+    except BaseException:
+        if out is not None:
+            await out.close()
+        try:
+            await aiofiles.os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return StoredFile(url=path, path=path, size=size, sha256=sha256, ext=ext)
+
+
+def check_type(filename: Optional[str], content_type: str, kind: str) -> str:
+    """Fayl nomi va Content-Type ni policy bo'yicha tekshirish, kengaytmani qaytaradi"""
+    policy = UPLOAD_POLICIES[kind]
+    ext = _extension(filename, policy)
+    _check_type(content_type, ext, policy)
+    return ext
+
+
+def hash_file(path: str) -> str:
+    """Blocking - asyncio.to_thread orqali chaqiring"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def finalize_file(tmp_path: str, kind: str, ext: str) -> StoredFile:
+    """
+    Tayyor temp faylni (masalan chunked upload) media store ga o'tkazish
+    save_upload dagi kabi magic baytlar tekshiriladi; mos kelmasa temp fayl o'chiriladi
+    Raises: HTTPException 400
+    """
+    policy = UPLOAD_POLICIES[kind]
+    try:
+        async with aiofiles.open(tmp_path, "rb") as f:
+            _check_magic(await f.read(16), ext, policy)
+    except HTTPException:
+        await aiofiles.os.remove(tmp_path)
+        raise
+    size = os.path.getsize(tmp_path)
+    sha256 = await asyncio.to_thread(hash_file, tmp_path)
+    path, ext = await store_blob(tmp_path, sha256, size, ext, kind)
+    return StoredFile(url=path, path=path, size=size, sha256=sha256, ext=ext)
@@ -0,0 +1,169 @@
+"""
+Video -> HLS (ffmpeg)
+
+Pure, blocking functions meant to run in a worker process: probe the source,
+encode one H.264/AAC HLS rendition per ladder step that does not upscale,
+write the master playlist, grab a poster frame and build a thumbnail sprite
+with a WebVTT index. Output is written to ``<out_dir>.tmp`` and renamed into
+place, so a half-finished transcode is never visible.
+"""
+import json
+import math
+import os
+import shutil
+import subprocess
+from typing import Dict, List
+
+# (height, video kbps, audio kbps)
+LADDER = [
+    (360, 800, 96),
+    (480, 1400, 128),
+    (720, 2800, 128),
+    (1080, 5000, 192),
+]
+
+SEGMENT_SEC = 6
+SPRITE_INTERVAL_SEC = 10
+SPRITE_WIDTH = 160
+SPRITE_COLUMNS = 10
+FFMPEG_TIMEOUT_SEC = 3 * 3600
+
+
+def ffmpeg_available() -> bool:
+    return bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+
+
+def _run(cmd: List[str]):
+    result = subprocess.run(cmd, capture_output=True, timeout=FFMPEG_TIMEOUT_SEC)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"{os.path.basename(cmd[0])}: {stderr[-500:]}")
+    return result.stdout
+
+
+def probe(src: str) -> Dict:
+    out = _run([
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:format=duration",
+        "-of", "json", src,
+    ])
+    data = json.loads(out)
+    streams = data.get("streams") or []
+    if not streams:
+        raise RuntimeError("Video oqimi topilmadi")
+    return {
+        "width": int(streams[0]["width"]),
+        "height": int(streams[0]["height"]),
+        "duration": float(data.get("format", {}).get("duration") or 0),
+    }
+
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2)) * 2)
+
+
+def _renditions(width: int, height: int) -> List[Dict]:
+    steps = [step for step in LADDER if step[0] <= height] or [(_even(height), LADDER[0][1], LADDER[0][2])]
+    return [
+        {"height": h, "width": _even(width * h / height), "video_kbps": v, "audio_kbps": a}
+        for h, v, a in steps
+    ]
+
+
+def _encode_rendition(src: str, out_dir: str, r: Dict):
+    name = f"{r['height']}p"
+    _run([
+        "ffmpeg", "-y", "-v", "error", "-i", src,
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", f"scale={r['width']}:{r['height']}",
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main",
+        "-b:v", f"{r['video_kbps']}k",
+        "-maxrate", f"{int(r['video_kbps'] * 1.07)}k",
+        "-bufsize", f"{int(r['video_kbps'] * 1.5)}k",
+        # Segment chegarasida keyframe (fps dan qat'i nazar)
+        "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SEC})", "-sc_threshold", "0",
+        "-c:a", "aac", "-b:a", f"{r['audio_kbps']}k", "-ac", "2",
+        "-f", "hls",
+        "-hls_time", str(SEGMENT_SEC),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(out_dir, f"{name}_%04d.ts"),
+        os.path.join(out_dir, f"{name}.m3u8"),
+    ])
+
+
+def _write_master(out_dir: str, renditions: List[Dict]):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for r in renditions:
+        bandwidth = (r["video_kbps"] + r["audio_kbps"]) * 1000
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={r['width']}x{r['height']}")
+        lines.append(f"{r['height']}p.m3u8")
+    with open(os.path.join(out_dir, "master.m3u8"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _poster(src: str, out_dir: str, duration: float):
+    _run([
+        "ffmpeg", "-y", "-v", "error",
+        "-ss", f"{min(1.0, duration / 2):.2f}", "-i", src,
+        "-frames:v", "1", "-vf", "scale=-2:720", "-q:v", "3",
+        os.path.join(out_dir, "poster.jpg"),
+    ])
+
+
+def _vtt_time(seconds: float) -> str:
+    h, rem = divmod(int(seconds), 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}.000"
+
+
+def _sprite(src: str, out_dir: str, width: int, height: int, duration: float):
+    count = max(1, math.ceil(duration / SPRITE_INTERVAL_SEC))
+    rows = math.ceil(count / SPRITE_COLUMNS)
+    tile_h = _even(SPRITE_WIDTH * height / width)
+    _run([
+        "ffmpeg", "-y", "-v", "error", "-i", src,
+        "-vf", (
+            f"fps=1/{SPRITE_INTERVAL_SEC},scale={SPRITE_WIDTH}:{tile_h},"
+            f"tile={SPRITE_COLUMNS}x{rows}"
+        ),
+        "-frames:v", "1", "-q:v", "5",
+        os.path.join(out_dir, "sprite.jpg"),
+    ])
+
+    lines = ["WEBVTT", ""]
+    for i in range(count):
+        start = i * SPRITE_INTERVAL_SEC
+        end = min(start + SPRITE_INTERVAL_SEC, max(duration, start + 1))
+        x = (i % SPRITE_COLUMNS) * SPRITE_WIDTH
+        y = (i // SPRITE_COLUMNS) * tile_h
+        lines.append(f"{_vtt_time(start)} --> {_vtt_time(end)}")
+        lines.append(f"sprite.jpg#xywh={x},{y},{SPRITE_WIDTH},{tile_h}")
+        lines.append("")
+    with open(os.path.join(out_dir, "thumbnails.vtt"), "w") as f:
+        f.write("\n".join(lines))
+
+
+def transcode_video(src: str, out_dir: str) -> Dict:
+    """
+    Worker process ichida ishlaydi (blocking)
+    Returns: {"renditions": [...], "duration": sec}
+    """
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        info = probe(src)
+        renditions = _renditions(info["width"], info["height"])
+        for r in renditions:
+            _encode_rendition(src, tmp_dir, r)
+        _write_master(tmp_dir, renditions)
+        _poster(src, tmp_dir, info["duration"])
+        _sprite(src, tmp_dir, info["width"], info["height"], info["duration"])
+
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return {"renditions": [f"{r['height']}p" for r in renditions], "duration": info["duration"]}
@@ -0,0 +1,72 @@
+"""
+Tungi analytics: Parquet eksport + DAU/WAU/MAU, retention, funnel, quiz hisoblash
+
+The export streams SQLite tables into Parquet partitions; the metrics are then
+computed from those files in a one-off spawn worker process, so neither step
+runs ad-hoc aggregate SQL against the production database or blocks the event
+loop. Results are written to ``results.json`` next to the partitions and served
+to the admin endpoints from memory.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from app.config import settings
+from app.services.analytics_engine import compute_analytics
+from app.services.analytics_export import export_snapshots
+
+_running = False
+_results: Optional[dict] = None
+
+
+def _results_path() -> str:
+    return os.path.join(settings.ANALYTICS_DIR, "results.json")
+
+
+def get_analytics_results() -> Optional[dict]:
+    """Oxirgi hisoblangan natijalar (restartdan keyin diskdan)"""
+    global _results
+    if _results is None and os.path.exists(_results_path()):
+        with open(_results_path(), encoding="utf-8") as f:
+            _results = json.load(f)
+    return _results
+
+
+def is_running() -> bool:
+    return _running
+
+
+async def run_analytics():
+    """Scheduler (har kuni 02:30) va admin qo'lda ishga tushiradi"""
+    global _running, _results
+    if _running:
+        return
+    _running = True
+
+    try:
+        started = datetime.utcnow()
+        exported = await export_snapshots(started.date())
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = await loop.run_in_executor(
+                pool, compute_analytics, settings.ANALYTICS_DIR, started.date().isoformat()
+            )
+        results["generated_at"] = datetime.utcnow().isoformat()
+        results["exported_rows"] = exported
+
+        os.makedirs(settings.ANALYTICS_DIR, exist_ok=True)
+        tmp = f"{_results_path()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False)
+        os.replace(tmp, _results_path())
+        _results = results
+        print(f"📈 Analytics tayyor ({(datetime.utcnow() - started).total_seconds():.1f}s)")
+    except Exception as e:
+        print(f"⚠️ Analytics xatosi: {e}")
+    finally:
+        _running = False
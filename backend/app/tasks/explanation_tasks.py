@@ -0,0 +1,134 @@
+"""
+Quiz savollari uchun AI izohlarini oldindan yaratish
+
+Questions without an explanation are fetched in id-ordered pages, sent to the
+model several at a time (one JSON array per call) with bounded concurrency,
+and written back with a single executemany UPDATE per page.
+"""
+import asyncio
+import json
+import re
+
+from sqlalchemy import select, update, or_
+
+from app.config import settings
+from app.database import async_session
+from app.models.quiz import Question
+from app.services.ai_client import ai_client
+
+QUESTIONS_PER_CALL = 10
+PAGE_SIZE = 50
+
+_running = False
+
+
+def _build_prompt(questions: list) -> str:
+    items = [
+        {
+            "id": q.id,
+            "question": q.question_text,
+            "options": q.options,
+            "correct_answer": q.correct_answer,
+        }
+        for q in questions
+    ]
+    return (
+        "Quyidagi test savollarining har biri uchun to'g'ri javob nima uchun to'g'ri "
+        "ekanini 1-3 gapda o'zbek tilida tushuntiring.\n\n"
+        f"{json.dumps(items, ensure_ascii=False)}\n\n"
+        "FAQAT quyidagi JSON formatida javob bering, boshqa matn bo'lmasin:\n"
+        '[{"id": 1, "explanation": "..."}]'
+    )
+
+
+async def _explain_chunk(questions: list) -> dict:
+    """Returns: {question_id: explanation}"""
+    data = await ai_client.post_messages({
+        "model": settings.AI_MODEL,
+        "max_tokens": 2048,
+        "messages": [{"role": "user", "content": _build_prompt(questions)}]
+    }, timeout=60.0)
+    if not data.get("content"):
+        return {}
+
+    raw_text = data["content"][0]["text"]
+    try:
+        match = re.search(r'\[[\s\S]*\]', raw_text)
+        items = json.loads(match.group() if match else raw_text.strip())
+    except json.JSONDecodeError:
+        return {}
+
+    wanted = {q.id for q in questions}
+    result = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            qid = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        text = str(item.get("explanation") or "").strip()
+        if qid in wanted and text:
+            result[qid] = text
+    return result
+
+
+async def fill_missing_explanations():
+    """
+    Izohsiz savollar uchun izoh yaratish
+    Scheduler va admin trigger orqali ishga tushadi
+    """
+    global _running
+    if _running or not ai_client.enabled:
+        return
+    _running = True
+
+    semaphore = asyncio.Semaphore(settings.AI_EXPLANATION_CONCURRENCY)
+
+    async def run_chunk(chunk: list) -> dict:
+        async with semaphore:
+            try:
+                return await _explain_chunk(chunk)
+            except Exception as e:
+                print(f"⚠️ Izoh yaratishda xato: {e}")
+                return {}
+
+    total = 0
+    last_id = 0
+    try:
+        while True:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(Question)
+                    .where(
+                        Question.id > last_id,
+                        or_(Question.explanation.is_(None), Question.explanation == "")
+                    )
+                    .order_by(Question.id)
+                    .limit(PAGE_SIZE)
+                )
+                page = result.scalars().all()
+            if not page:
+                break
+            last_id = page[-1].id
+
+            chunks = [page[i:i + QUESTIONS_PER_CALL] for i in range(0, len(page), QUESTIONS_PER_CALL)]
+            explanations = {}
+            for found in await asyncio.gather(*(run_chunk(c) for c in chunks)):
+                explanations.update(found)
+            if not explanations:
+                continue
+
+            async with async_session() as db:
+                # ORM bulk UPDATE by primary key (executemany)
+                await db.execute(
+                    update(Question),
+                    [{"id": qid, "explanation": text} for qid, text in explanations.items()]
+                )
+                await db.commit()
+            total += len(explanations)
+    finally:
+        _running = False
+
+    if total:
+        print(f"💡 {total} ta savolga AI izoh qo'shildi")
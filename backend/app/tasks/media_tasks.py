@@ -0,0 +1,103 @@
+"""
+Media blob garbage collection
+"""
+import os
+import shutil
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import select, update, delete, func
+
+from app.config import settings
+from app.database import async_session
+from app.models.media_blob import MediaBlob
+from app.models.lesson import Lesson
+from app.models.module import Module
+from app.models.audio import Audio
+from app.models.book import Book
+from app.models.news import News
+from app.models.payment import Payment
+from app.services.media_store import MEDIA_ROOT, media_lock, hash_from_url
+from app.services.transcode_queue import output_dir
+
+# Media URL saqlaydigan ustunlar
+REFERENCES = [
+    (Lesson, "video_url"),
+    (Module, "image_url"),
+    (Audio, "audio_url"),
+    (Audio, "cover_url"),
+    (Book, "file_url"),
+    (Book, "cover_url"),
+    (News, "media_url"),
+    (Payment, "screenshot_url"),
+]
+
+_running = False
+
+
+async def _count_references(db) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for model, column in REFERENCES:
+        col = getattr(model, column)
+        result = await db.execute(
+            select(col, func.count())
+            .where(col.like(f"%{MEDIA_ROOT}/%"))
+            .group_by(col)
+        )
+        for url, n in result.all():
+            sha256 = hash_from_url(url)
+            if sha256:
+                counts[sha256] = counts.get(sha256, 0) + n
+    return counts
+
+
+async def collect_media_garbage():
+    """
+    Reference count larni qayta hisoblab, hech kim ishlatmayotgan blob larni o'chirish
+    Scheduler va lesson/audio/book o'chirilganda ishga tushadi
+    Yangi yuklangan (hali biror qatorga biriktirilmagan) blob lar MEDIA_GC_GRACE_HOURS davomida saqlanadi
+    """
+    global _running
+    if _running:
+        return
+    _running = True
+
+    try:
+        async with async_session() as db:
+            counts = await _count_references(db)
+            result = await db.execute(select(MediaBlob.sha256, MediaBlob.ref_count))
+            changed = [
+                {"sha256": sha256, "ref_count": counts.get(sha256, 0)}
+                for sha256, ref_count in result.all()
+                if ref_count != counts.get(sha256, 0)
+            ]
+            if changed:
+                # ORM bulk UPDATE by primary key
+                await db.execute(update(MediaBlob), changed)
+                await db.commit()
+
+        cutoff = datetime.utcnow() - timedelta(hours=settings.MEDIA_GC_GRACE_HOURS)
+        async with media_lock:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(MediaBlob.sha256, MediaBlob.path)
+                    .where(MediaBlob.ref_count == 0, MediaBlob.last_uploaded_at < cutoff)
+                )
+                orphans = result.all()
+                if not orphans:
+                    return
+
+                for _, path in orphans:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    # Video bo'lsa HLS renditionlari ham
+                    shutil.rmtree(output_dir(path), ignore_errors=True)
+                await db.execute(
+                    delete(MediaBlob).where(MediaBlob.sha256.in_([row.sha256 for row in orphans]))
+                )
+                await db.commit()
+        print(f"🧹 {len(orphans)} ta ishlatilmagan media fayl o'chirildi")
+    finally:
+        _running = False
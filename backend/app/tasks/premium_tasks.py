@@ -1,33 +1,17 @@
 """
 Premium background tasks
 """
-from datetime import datetime, timedelta
-from sqlalchemy import select, and_
-from app.database import async_session
-from app.models.user import User
+from app.services.premium_expiry import expire_premiums
+from app.services.revenue import reconcile_active_premium
 
 
 async def check_premium_expiry():
     """
-    Premium muddati tugayotganlarni tekshirish
-    Har kuni 1 marta ishga tushadi
+    Premium muddati tugaganlarni o'chirish (bitta bulk UPDATE)
+    Aniq vaqtda timer wheel o'chiradi, bu - restart/xato holatlari uchun zaxira
+    Keyin hisobotdagi faol premium soni users bilan tenglashtiriladi
     """
-    print("🔄 Premium expiry check boshlandi...")
-    
-    async with async_session() as db:
-        # Muddati tugaganlar
-        result = await db.execute(
-            select(User)
-            .where(and_(
-                User.is_premium == True,
-                User.premium_until < datetime.utcnow()
-            ))
-        )
-        expired_users = result.scalars().all()
-        
-        for user in expired_users:
-            user.is_premium = False
-            print(f"⏰ Premium tugadi: {user.full_name} (ID: {user.id})")
-        
-        await db.commit()
-        print(f"✅ {len(expired_users)} ta userning premiumi o'chirildi")
+    expired = await expire_premiums()
+    if expired:
+        print(f"✅ {expired} ta userning premiumi o'chirildi")
+    await reconcile_active_premium()
@@ -0,0 +1,93 @@
+"""
+Soft-delete qilingan kontentni fonda o'chirish
+"""
+import asyncio
+
+from sqlalchemy import select, delete, or_
+
+from app.database import async_session
+from app.models.module import Module
+from app.models.lesson import Lesson
+from app.models.quiz import Quiz, Question
+from app.models.progress import UserProgress
+from app.models.battle import Battle, BattleAnswer
+from app.models.ai_chat import AIChatHistory
+from app.services.dashboard_stats import dashboard_stats
+
+# Bitta DELETE - bitta qisqa yozish tranzaksiyasi
+PURGE_BATCH = 500
+
+_running = False
+
+
+def _dead_modules():
+    return select(Module.id).where(Module.deleted_at.is_not(None))
+
+
+def _dead_lessons():
+    return select(Lesson.id).where(or_(
+        Lesson.deleted_at.is_not(None),
+        Lesson.module_id.in_(_dead_modules()),
+    ))
+
+
+def _dead_quizzes():
+    return select(Quiz.id).where(or_(
+        Quiz.deleted_at.is_not(None),
+        Quiz.lesson_id.in_(_dead_lessons()),
+    ))
+
+
+def _purge_plan():
+    """Barglardan ildizga: ko'p qatorli bog'liq tablalar avval, keyin o'chirilgan qatorning o'zi"""
+    dead_questions = select(Question.id).where(Question.quiz_id.in_(_dead_quizzes()))
+    dead_battles = select(Battle.id).where(Battle.module_id.in_(_dead_modules()))
+    return [
+        (BattleAnswer, or_(BattleAnswer.question_id.in_(dead_questions), BattleAnswer.battle_id.in_(dead_battles))),
+        (Battle, Battle.id.in_(dead_battles)),
+        (UserProgress, UserProgress.lesson_id.in_(_dead_lessons())),
+        (AIChatHistory, AIChatHistory.lesson_id.in_(_dead_lessons())),
+        (Question, Question.id.in_(dead_questions)),
+        # Qolgan kichik bog'liqlar (AI job) - ON DELETE CASCADE / SET NULL; sertifikat qoladi (module_id NULL)
+        (Quiz, Quiz.id.in_(_dead_quizzes())),
+        (Lesson, Lesson.id.in_(_dead_lessons())),
+        (Module, Module.deleted_at.is_not(None)),
+    ]
+
+
+async def _delete_in_batches(model, condition) -> int:
+    total = 0
+    while True:
+        async with async_session() as db:
+            batch = select(model.id).where(condition).limit(PURGE_BATCH).scalar_subquery()
+            result = await db.execute(delete(model).where(model.id.in_(batch)))
+            await db.commit()
+        total += result.rowcount
+        if result.rowcount < PURGE_BATCH:
+            return total
+        # Batchlar orasida boshqa yozuvchilarga navbat
+        await asyncio.sleep(0.05)
+
+
+async def purge_deleted_content():
+    """
+    Admin o'chirgan modul/dars/quiz (deleted_at) va ularga bog'liq qatorlarni
+    PURGE_BATCH dan bo'lib o'chirish - yozish lock i hech qachon uzoq ushlanmaydi
+    Admin delete dan keyin va scheduler orqali (restartdan keyin davom etadi) ishga tushadi
+    """
+    global _running
+    if _running:
+        return
+    _running = True
+
+    try:
+        removed = {}
+        for model, condition in _purge_plan():
+            count = await _delete_in_batches(model, condition)
+            if count:
+                removed[model.__tablename__] = count
+        if removed:
+            dashboard_stats.invalidate()
+            print(f"🧹 O'chirilgan kontent tozalandi: {removed}")
+    finally:
+        _running = False
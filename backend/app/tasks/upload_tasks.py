@@ -0,0 +1,42 @@
+"""
+Resumable upload background tasks
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import async_session
+from app.models.upload_session import UploadSession
+
+
+async def cleanup_upload_sessions():
+    """
+    Tashlab ketilgan (uzoq vaqt yangilanmagan) uploadlarni tozalash
+    Har soatda ishga tushadi
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+    async with async_session() as db:
+        result = await db.execute(
+            select(UploadSession.id, UploadSession.temp_path)
+            .where(UploadSession.status == "active", UploadSession.updated_at < cutoff)
+        )
+        stale = result.all()
+        if not stale:
+            return
+
+        for _, temp_path in stale:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+        await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id.in_([row.id for row in stale]))
+            .values(status="expired")
+        )
+        await db.commit()
+        print(f"🧹 {len(stale)} ta tugallanmagan upload tozalandi")
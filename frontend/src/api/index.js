@@ -12,6 +12,13 @@ export const getMediaUrl = (url) => {
   return `${base}/${url.startsWith('/') ? url.slice(1) : url}`
 }
 
+// Helper: media store rasmi → kichraytirilgan WebP varianti (ro'yxatlar uchun)
+export const getImageUrl = (url, width = 128) => {
+  const match = url?.match(/media\/[0-9a-f]{2}\/[0-9a-f]{2}\/([0-9a-f]{64})\./)
+  if (!match) return getMediaUrl(url)
+  return getMediaUrl(`api/media/img/${match[1]}?w=${width}&fmt=webp`)
+}
+
 const api = axios.create({
   baseURL: API_URL,
   headers: { 'Content-Type': 'application/json' }
@@ -126,8 +133,8 @@ export const challengesAPI = {
 
 // AI API
 export const aiAPI = {
-  chat: (message, history = [], lessonId = null) =>
-    api.post('/ai/chat', { message, history, lesson_id: lessonId }),
+  chat: (message, lessonId = null) =>
+    api.post('/ai/chat', { message, lesson_id: lessonId }),
   explain: (text, lessonId = null) =>
     api.post('/ai/explain', { text, lesson_id: lessonId }),
   getHistory: (lessonId = null) =>
@@ -164,7 +171,9 @@ export const booksAPI = {
 // Admin API
 export const adminAPI = {
   getStats: () => api.get('/admin/stats'),
-  getUsers: (skip = 0, limit = 50) => api.get(`/admin/users?skip=${skip}&limit=${limit}`),
+  getUsers: (params = {}) => api.get('/admin/users', { params }),
+  exportUsers: (params = {}, format = 'csv') =>
+    api.get('/admin/users/export', { params: { ...params, format }, responseType: 'blob' }),
   grantPremium: (userId, days) => api.post(`/admin/users/${userId}/grant-premium`, { days }),
   revokePremium: (userId) => api.post(`/admin/users/${userId}/revoke-premium`),
   toggleAdmin: (userId) => api.post(`/admin/users/${userId}/toggle-admin`),
@@ -193,9 +202,11 @@ export const adminAPI = {
   deleteNews: (id) => api.delete(`/news/${id}`),
   toggleNewsPin: (id) => api.post(`/news/${id}/pin`),
   // Payments
-  getPendingPayments: () => api.get('/payment/admin/pending'),
+  getPendingPayments: (cursor = null, limit = 50) =>
+    api.get('/payment/admin/pending', { params: { cursor, limit } }),
   reviewPayment: (id, approved, note) =>
     api.post(`/payment/admin/${id}/review`, { approved, note }),
+  reviewPaymentsBulk: (reviews) => api.post('/payment/admin/review-bulk', { reviews }),
   // Challenges admin
   createChallenge: (data) => api.post('/admin/challenges', data),
   deleteChallenge: (id) => api.delete(`/admin/challenges/${id}`),
@@ -40,8 +40,7 @@ export default function AIChat() {
     setMessages(newMessages)
     setLoading(true)
     try {
-      const history = newMessages.slice(-8).map(m => ({ role: m.role, content: m.content }))
-      const res = await aiAPI.chat(text, history.slice(0, -1))
+      const res = await aiAPI.chat(text)
       setMessages([...newMessages, { role: 'assistant', content: res.data.response }])
     } catch {
       setMessages([...newMessages, { role: 'assistant', content: "⚠️ Xato yuz berdi. Qayta urinib ko'ring." }])
@@ -40,7 +40,7 @@ export default function BookDetail() {
 
   const fileUrl = getMediaUrl(book.file_url)
   const coverUrl = getMediaUrl(book.cover_url)
-  const isPdf = book.file_url?.toLowerCase().includes('.pdf')
+  const isPdf = book.file_type === 'pdf'
 
   return (
     <div className="page">
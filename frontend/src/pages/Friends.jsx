@@ -1,11 +1,11 @@
 import { useState, useEffect, useRef } from 'react'
-import { friendsAPI } from '../api'
+import { friendsAPI, getMediaUrl } from '../api'
 
 function Avatar({ user, size = 44 }) {
   return (
     <div style={{ width: size, height: size, borderRadius: '50%', background: 'var(--primary-dim)', display: 'flex', alignItems: 'center', justifyContent: 'center', fontWeight: 700, color: 'var(--primary-light)', fontSize: size * 0.4, flexShrink: 0, overflow: 'hidden' }}>
       {user.photo_url
-        ? <img src={user.photo_url} alt="" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
+        ? <img src={getMediaUrl(user.photo_url)} alt="" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
         : user.full_name?.[0] || '?'
       }
     </div>
@@ -41,6 +41,10 @@ export default function Lesson() {
     return url
   }
 
+  // Safari / iOS WebView HLS ni o'zi o'ynaydi, qolganlarida asl fayl
+  const canPlayHls = typeof document !== 'undefined' &&
+    document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== ''
+
   const getLocalVideoUrl = (url) => {
     if (!url) return null
     if (url.startsWith('http')) return url
@@ -113,7 +117,8 @@ export default function Lesson() {
         ) : (
           <div style={{ background: '#000' }}>
             <video
-              src={getLocalVideoUrl(lesson.video_url)}
+              src={getLocalVideoUrl(canPlayHls && lesson.hls_url ? lesson.hls_url : lesson.video_url)}
+              poster={lesson.poster_url ? getLocalVideoUrl(lesson.poster_url) : undefined}
               controls
               style={{ width: '100%', maxHeight: 320, display: 'block' }}
             />
@@ -1,7 +1,7 @@
 import { useState, useCallback } from 'react'
 import { Link } from 'react-router-dom'
 import { Search as SearchIcon, BookOpen, FileText, Newspaper, Users, Crown, Lock } from 'lucide-react'
-import { searchAPI } from '../api'
+import { searchAPI, getMediaUrl } from '../api'
 
 function debounce(fn, ms) {
   let t
@@ -172,7 +172,7 @@ export default function Search() {
                       fontWeight: 700, fontSize: 16, color: 'var(--primary)', overflow: 'hidden',
                     }}>
                       {u.photo_url
-                        ? <img src={u.photo_url} alt="" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
+                        ? <img src={getMediaUrl(u.photo_url)} alt="" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
                         : u.full_name?.[0] || '?'
                       }
                     </div>
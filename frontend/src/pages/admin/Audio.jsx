@@ -90,7 +90,12 @@ export default function AdminAudio() {
       const res = await adminAPI.uploadAudio(file, (evt) => {
         if (evt.total) setAudioProgress(Math.round((evt.loaded / evt.total) * 100))
       })
-      setAudioForm(f => ({ ...f, audio_url: res.data.url }))
+      setAudioForm(f => ({
+        ...f,
+        audio_url: res.data.url,
+        duration_sec: f.duration_sec || res.data.duration_sec || 0,
+        cover_url: f.cover_url || res.data.cover_url || '',
+      }))
     } catch {
       alert("Audio yuklashda xatolik")
       setAudioFile(null)
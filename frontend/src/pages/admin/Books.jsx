@@ -90,7 +90,12 @@ export default function AdminBooks() {
       const res = await adminAPI.uploadBook(file, (evt) => {
         if (evt.total) setBookProgress(Math.round((evt.loaded / evt.total) * 100))
       })
-      setBookForm(f => ({ ...f, file_url: res.data.url }))
+      setBookForm(f => ({
+        ...f,
+        file_url: res.data.url,
+        pages: f.pages || res.data.pages || '',
+        cover_url: f.cover_url || res.data.cover_url || '',
+      }))
     } catch {
       alert("Fayl yuklab bo'lmadi")
       setBookFile(null)
@@ -5,6 +5,8 @@ import { adminAPI } from '../../api'
 import { useAuth } from '../../context/AuthContext'
 import Loader from '../../components/common/Loader'
 
+const BULK_REVIEW_MAX = 200
+
 const getScreenshotUrl = (url) => {
   if (!url) return null
   if (url.startsWith('http')) return url
@@ -16,14 +18,17 @@ export default function AdminPayments() {
   const { user } = useAuth()
   const navigate = useNavigate()
   const [payments, setPayments] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [busy, setBusy] = useState(false)
 
   useEffect(() => { loadPayments() }, [])
 
-  const loadPayments = async () => {
+  const loadPayments = async (cursor = null) => {
     try {
-      const res = await adminAPI.getPendingPayments()
-      setPayments(res.data)
+      const res = await adminAPI.getPendingPayments(cursor)
+      setPayments(prev => cursor ? [...prev, ...res.data.items] : res.data.items)
+      setNextCursor(res.data.next_cursor)
     } catch (error) {
       console.error('Error:', error)
     } finally {
@@ -31,6 +36,27 @@ export default function AdminPayments() {
     }
   }
 
+  const approveAll = async () => {
+    if (!confirm(`${payments.length} ta to'lovni tasdiqlaysizmi?`)) return
+    setBusy(true)
+    try {
+      // Backend bir so'rovda ko'pi bilan BULK_REVIEW_MAX ta qabul qiladi
+      let approved = 0
+      for (let i = 0; i < payments.length; i += BULK_REVIEW_MAX) {
+        const chunk = payments.slice(i, i + BULK_REVIEW_MAX)
+        const res = await adminAPI.reviewPaymentsBulk(chunk.map(p => ({ payment_id: p.id, approved: true })))
+        approved += res.data.approved
+      }
+      alert(`✅ ${approved} ta to'lov tasdiqlandi`)
+    } catch (error) {
+      alert('Xatolik: ' + (error.response?.data?.detail || 'Server xatosi'))
+    } finally {
+      // Xato bo'lsa ham - oldingi bo'laklar allaqachon tasdiqlangan
+      loadPayments()
+      setBusy(false)
+    }
+  }
+
   const reviewPayment = async (id, approved) => {
     const note = approved ? '' : prompt('Rad etish sababi:')
     if (!approved && note === null) return
@@ -58,8 +84,13 @@ export default function AdminPayments() {
         </button>
         <div>
           <h1 style={{ fontSize: 20, fontWeight: 800, color: 'var(--text)' }}>💳 Kutilayotgan to'lovlar</h1>
-          <p style={{ fontSize: 13, color: 'var(--text3)' }}>{payments.length} ta so'rov</p>
+          <p style={{ fontSize: 13, color: 'var(--text3)' }}>{payments.length}{nextCursor ? '+' : ''} ta so'rov</p>
         </div>
+        {payments.length > 1 && (
+          <button onClick={approveAll} disabled={busy} className="btn btn-primary" style={{ marginLeft: 'auto' }}>
+            <Check size={16} /> Hammasini tasdiqlash
+          </button>
+        )}
       </div>
 
       {payments.length === 0 ? (
@@ -125,6 +156,11 @@ export default function AdminPayments() {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button onClick={() => loadPayments(nextCursor)} className="btn btn-secondary">
+              Yana yuklash
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -9,14 +9,26 @@ export default function AdminUsers() {
   const { user } = useAuth()
   const navigate = useNavigate()
   const [users, setUsers] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [query, setQuery] = useState('')
+  const [premium, setPremium] = useState('')
 
-  useEffect(() => { loadUsers() }, [])
+  const filters = () => ({
+    q: query.trim() || undefined,
+    premium: premium === '' ? undefined : premium === 'yes',
+  })
 
-  const loadUsers = async () => {
+  useEffect(() => {
+    const timer = setTimeout(() => loadUsers(), 300)
+    return () => clearTimeout(timer)
+  }, [query, premium])
+
+  const loadUsers = async (cursor = null) => {
     try {
-      const res = await adminAPI.getUsers()
-      setUsers(res.data)
+      const res = await adminAPI.getUsers({ ...filters(), cursor })
+      setUsers(prev => cursor ? [...prev, ...res.data.items] : res.data.items)
+      setNextCursor(res.data.next_cursor)
     } catch (error) {
       console.error('Error:', error)
     } finally {
@@ -24,6 +36,18 @@ export default function AdminUsers() {
     }
   }
 
+  const exportUsers = async (format) => {
+    try {
+      const res = await adminAPI.exportUsers(filters(), format)
+      const url = URL.createObjectURL(res.data)
+      const link = document.createElement('a')
+      link.href = url
+      link.download = `users.${format}`
+      link.click()
+      URL.revokeObjectURL(url)
+    } catch { alert('Xatolik') }
+  }
+
   const grantPremium = async (userId) => {
     const days = prompt('Necha kun?', '30')
     if (!days) return
@@ -64,10 +88,29 @@ export default function AdminUsers() {
         </button>
         <div>
           <h1 style={{ fontSize: 20, fontWeight: 800, color: 'var(--text)' }}>👥 Foydalanuvchilar</h1>
-          <p style={{ fontSize: 13, color: 'var(--text3)' }}>{users.length} ta foydalanuvchi</p>
+          <p style={{ fontSize: 13, color: 'var(--text3)' }}>{users.length}{nextCursor ? '+' : ''} ta foydalanuvchi</p>
+        </div>
+        <div style={{ marginLeft: 'auto', display: 'flex', gap: 6 }}>
+          <button onClick={() => exportUsers('csv')} className="btn btn-secondary btn-sm">CSV</button>
+          <button onClick={() => exportUsers('jsonl')} className="btn btn-secondary btn-sm">JSONL</button>
         </div>
       </div>
 
+      <div style={{ display: 'flex', gap: 8, marginBottom: 14 }}>
+        <input
+          className="input"
+          placeholder="Ism, @username yoki ID"
+          value={query}
+          onChange={e => setQuery(e.target.value)}
+          style={{ flex: 1 }}
+        />
+        <select className="input" value={premium} onChange={e => setPremium(e.target.value)} style={{ width: 120 }}>
+          <option value="">Hammasi</option>
+          <option value="yes">Premium</option>
+          <option value="no">Oddiy</option>
+        </select>
+      </div>
+
       <div style={{ display: 'flex', flexDirection: 'column', gap: 8 }}>
         {users.map(u => (
           <div key={u.id} className="card card-sm">
@@ -104,6 +147,11 @@ export default function AdminUsers() {
             </div>
           </div>
         ))}
+        {nextCursor && (
+          <button onClick={() => loadUsers(nextCursor)} className="btn btn-secondary">
+            Yana yuklash
+          </button>
+        )}
       </div>
     </div>
   )